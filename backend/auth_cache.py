@@ -0,0 +1,87 @@
+"""Bounded TTL/LRU cache of validated sessions for the auth dependency"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+
+class SessionCache:
+    """Maps bearer tokens to their already-validated user documents
+
+    Entries live for at most `ttl_seconds` (and never past the session's own
+    expiry), so changes made by another worker are picked up without an
+    explicit invalidation. Local writes invalidate by token or by user id.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry["cached_until"] < time.monotonic() or entry["expires_at"] < datetime.utcnow():
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry["user"]
+
+    def put(self, token: str, user: Dict[str, Any], expires_at: datetime):
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = {
+            "user": user,
+            "expires_at": expires_at,
+            "cached_until": time.monotonic() + self.ttl_seconds,
+        }
+        self._tokens_by_user.setdefault(user["id"], set()).add(token)
+        while len(self._entries) > self.max_entries:
+            oldest_token = next(iter(self._entries))
+            self._remove(oldest_token)
+            self.evictions += 1
+
+    def invalidate_token(self, token: str):
+        if token in self._entries:
+            self._remove(token)
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached session belonging to a user"""
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self._remove(token)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token)
+        user_tokens = self._tokens_by_user.get(entry["user"]["id"])
+        if user_tokens is not None:
+            user_tokens.discard(token)
+            if not user_tokens:
+                del self._tokens_by_user[entry["user"]["id"]]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
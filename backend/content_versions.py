@@ -0,0 +1,54 @@
+"""Shared version counters behind the ETags of conditional GETs
+
+Every write advances the counter of each resource it changed (a roster month,
+the staff list, shift templates, settings). Counters live in Mongo so every
+API process and background worker agrees on them, and a reader can answer
+If-None-Match with one indexed lookup instead of re-reading the data.
+"""
+import hashlib
+import uuid
+from typing import Dict, Iterable, Optional
+
+from pymongo import UpdateOne
+
+
+def roster_month_key(month: str) -> str:
+    return f"roster:{month}"
+
+
+async def bump_versions(db, keys: Iterable[str]):
+    """Advance the version of every key; a counter's epoch is fixed when it is first created"""
+    requests = [
+        UpdateOne({"id": key}, {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex}}, upsert=True)
+        for key in sorted(set(keys))
+    ]
+    if requests:
+        await db.content_versions.bulk_write(requests, ordered=False)
+
+
+async def current_versions(db, keys: Iterable[str]) -> Dict[str, str]:
+    """Version token per key; keys that were never written share the initial token "0" """
+    keys = sorted(set(keys))
+    found = await db.content_versions.find({"id": {"$in": keys}}, {"_id": 0, "id": 1, "version": 1, "epoch": 1})
+    tokens = {doc["id"]: f"{doc['epoch']}.{doc['version']}" for doc in found}
+    return {key: tokens.get(key, "0") for key in keys}
+
+
+def make_etag(resource: str, versions: Dict[str, str], variant: str = "") -> str:
+    """Strong ETag for one representation of a resource at the given versions
+
+    variant distinguishes representations of the same data, e.g. pay masked
+    for one staff member versus visible to admins.
+    """
+    parts = [resource, variant] + [f"{key}={token}" for key, token in sorted(versions.items())]
+    return '"' + hashlib.sha1("|".join(parts).encode()).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 9110), including the * wildcard"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
@@ -0,0 +1,85 @@
+"""Projected wages and NDIS revenue for rostering a horizon from templates, computed in memory
+
+The generation planners expand the templates month by month against empty
+snapshots, so the forecast holds exactly the shifts generation would create
+on an unrostered horizon, with the same duplicate and overlap rules. Nothing
+is written: the planned entries stay plain documents until they are priced
+together by the batch pay engine, then folded into daily, weekly and monthly
+totals.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from roster_generation import DateWindow, EntryFactory, GenerationPlan, MonthSnapshot, month_range
+from timesheets import FIRST_WEEKDAY
+
+# Plans one month: (month, snapshot, make_entry, date_window) -> plan
+MonthPlanner = Callable[[str, MonthSnapshot, EntryFactory, DateWindow], GenerationPlan]
+
+FORECAST_FIELDS = ("shifts", "hours", "wages", "ndis_revenue", "margin")
+
+
+def forecast_entry_factory() -> EntryFactory:
+    """Planner entry factory for unpriced, never-stored entry documents"""
+    counter = count(1)
+
+    def make_entry(**fields) -> Dict[str, Any]:
+        return dict({"id": f"forecast-{next(counter)}", "is_sleepover": False, "is_public_holiday": False}, **fields)
+    return make_entry
+
+
+def expand_horizon(start_date: str, end_date: str, plan_month: MonthPlanner) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Every entry the planner would create from start_date to end_date inclusive, and counts of what it skipped"""
+    make_entry = forecast_entry_factory()
+    entries: List[Dict[str, Any]] = []
+    skipped = {"overlaps_detected": 0, "duplicates_prevented": 0}
+    for month in month_range(start_date[:7], end_date[:7]):
+        plan = plan_month(month, MonthSnapshot([]), make_entry, (start_date, end_date))
+        entries.extend(plan.inserts)
+        skipped["overlaps_detected"] += len(plan.overlaps_detected)
+        skipped["duplicates_prevented"] += len(plan.duplicates_prevented)
+    return entries, skipped
+
+
+def week_start(date_str: str, first_day_of_week: str = "monday") -> str:
+    day = date.fromisoformat(date_str)
+    return (day - timedelta(days=(day.weekday() - FIRST_WEEKDAY.get(first_day_of_week, 0)) % 7)).isoformat()
+
+
+def _rounded(totals: Dict[str, float]) -> Dict[str, float]:
+    return {field: round(value, 2) for field, value in totals.items()}
+
+
+def forecast_totals(entries: List[Dict[str, Any]], pay_rows: Iterable[Optional[Dict[str, Any]]],
+                    first_day_of_week: str = "monday") -> Dict[str, Any]:
+    """Shifts, hours, wages, NDIS revenue and margin per day, week, month and overall; unpriced rows are left out"""
+    daily: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(FORECAST_FIELDS, 0))
+    for entry, pay in zip(entries, pay_rows):
+        if pay is None:
+            continue
+        totals = daily[entry["date"]]
+        totals["shifts"] += 1
+        totals["hours"] += pay["hours_worked"]
+        totals["wages"] += pay["total_pay"]
+        totals["ndis_revenue"] += pay["ndis_total_charge"]
+
+    weekly: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(FORECAST_FIELDS, 0))
+    monthly: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(FORECAST_FIELDS, 0))
+    overall = dict.fromkeys(FORECAST_FIELDS, 0)
+    for date_str, totals in daily.items():
+        totals["margin"] = totals["ndis_revenue"] - totals["wages"]
+        for bucket in (weekly[week_start(date_str, first_day_of_week)], monthly[date_str[:7]], overall):
+            for field in FORECAST_FIELDS:
+                bucket[field] += totals[field]
+
+    def rows(buckets: Dict[str, Dict[str, float]], key: str) -> List[Dict[str, Any]]:
+        return [dict({key: bucket_key}, **_rounded(buckets[bucket_key])) for bucket_key in sorted(buckets)]
+
+    return {
+        "totals": _rounded(overall),
+        "daily": rows(daily, "date"),
+        "weekly": rows(weekly, "week_start"),
+        "monthly": rows(monthly, "month"),
+    }
@@ -0,0 +1,162 @@
+"""Australian public holiday calendar: national and state rules plus admin-added dates
+
+Each (state, year) is expanded once into a hashed set of ISO date strings,
+so is_holiday is a set lookup on every pay path.
+"""
+from datetime import date, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+MON, TUE, WED, THU, FRI, SAT, SUN = range(7)
+
+AU_STATES = ("ACT", "NSW", "NT", "QLD", "SA", "TAS", "VIC", "WA")
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The n-th given weekday of a month (n starts at 1)"""
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def last_weekday(year: int, month: int, weekday: int) -> date:
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def next_weekday_on_or_after(day: date, weekday: int) -> date:
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+
+def _monday_if_weekend(day: date) -> date:
+    return next_weekday_on_or_after(day, MON) if day.weekday() in (SAT, SUN) else day
+
+
+def _christmas_period(year: int) -> List[Tuple[date, str]]:
+    """Christmas and Boxing Day, with the following weekdays added when they fall on a weekend"""
+    christmas = date(year, 12, 25)
+    holidays = [(christmas, "Christmas Day"), (date(year, 12, 26), "Boxing Day")]
+    if christmas.weekday() == FRI:
+        holidays.append((date(year, 12, 28), "Boxing Day (additional)"))
+    elif christmas.weekday() == SAT:
+        holidays.append((date(year, 12, 27), "Christmas Day (additional)"))
+        holidays.append((date(year, 12, 28), "Boxing Day (additional)"))
+    elif christmas.weekday() == SUN:
+        holidays.append((date(year, 12, 27), "Christmas Day (additional)"))
+    return holidays
+
+
+def national_holidays(year: int) -> List[Tuple[date, str]]:
+    easter = easter_sunday(year)
+    new_year = date(year, 1, 1)
+    holidays = [
+        (new_year, "New Year's Day"),
+        (_monday_if_weekend(date(year, 1, 26)), "Australia Day"),
+        (easter - timedelta(days=2), "Good Friday"),
+        (easter + timedelta(days=1), "Easter Monday"),
+        (date(year, 4, 25), "Anzac Day"),
+    ]
+    if new_year.weekday() in (SAT, SUN):
+        holidays.append((_monday_if_weekend(new_year), "New Year's Day (additional)"))
+    return holidays + _christmas_period(year)
+
+
+def _kings_birthday(year: int, state: str) -> date:
+    if state == "WA":
+        return last_weekday(year, 9, MON)
+    if state == "QLD":
+        return nth_weekday(year, 10, MON, 1)
+    return nth_weekday(year, 6, MON, 2)
+
+
+def _labour_day(year: int, state: str) -> date:
+    if state in ("NSW", "ACT", "SA"):
+        return nth_weekday(year, 10, MON, 1)
+    if state in ("VIC", "TAS"):
+        return nth_weekday(year, 3, MON, 2)
+    if state in ("QLD", "NT"):
+        return nth_weekday(year, 5, MON, 1)
+    return nth_weekday(year, 3, MON, 1)  # WA
+
+
+def state_holidays(year: int, state: str) -> List[Tuple[date, str]]:
+    """Statewide holidays beyond the national set (regional show days are left to admin-added dates)"""
+    easter = easter_sunday(year)
+    holidays = [
+        (_kings_birthday(year, state), "King's Birthday"),
+        (_labour_day(year, state), "May Day" if state == "NT" else "Labour Day"),
+    ]
+    if state not in ("TAS", "WA"):
+        holidays.append((easter - timedelta(days=1), "Easter Saturday"))
+    if state in ("NSW", "VIC", "QLD", "ACT", "WA"):
+        holidays.append((easter, "Easter Sunday"))
+    if state == "WA":
+        anzac = date(year, 4, 25)
+        if anzac.weekday() in (SAT, SUN):
+            holidays.append((_monday_if_weekend(anzac), "Anzac Day (additional)"))
+        holidays.append((nth_weekday(year, 6, MON, 1), "Western Australia Day"))
+    if state == "ACT":
+        holidays.append((nth_weekday(year, 3, MON, 2), "Canberra Day"))
+        holidays.append((next_weekday_on_or_after(date(year, 5, 27), MON), "Reconciliation Day"))
+    if state == "SA":
+        holidays.append((nth_weekday(year, 3, MON, 2), "Adelaide Cup Day"))
+    if state == "VIC":
+        holidays.append((nth_weekday(year, 11, TUE, 1), "Melbourne Cup Day"))
+    if state == "NT":
+        holidays.append((nth_weekday(year, 8, MON, 1), "Picnic Day"))
+    return holidays
+
+
+class HolidayCalendar:
+    """Holiday date sets per (state, year), expanded on first use and shared by every pay path"""
+
+    def __init__(self):
+        self._custom: Dict[Tuple[Optional[str], int], Dict[str, str]] = {}
+        self._years: Dict[Tuple[Optional[str], int], Dict[str, str]] = {}
+        self._date_sets: Dict[Tuple[Optional[str], int], FrozenSet[str]] = {}
+
+    def load_custom(self, holidays: Iterable[Dict]):
+        """Replace admin-added holidays ({date, name, state}; state None applies everywhere)"""
+        custom: Dict[Tuple[Optional[str], int], Dict[str, str]] = {}
+        for holiday in holidays:
+            key = (holiday.get("state"), int(holiday["date"][:4]))
+            custom.setdefault(key, {})[holiday["date"]] = holiday.get("name") or "Public Holiday"
+        self._custom = custom
+        self._years.clear()
+        self._date_sets.clear()
+
+    def holidays_for_year(self, year: int, state: Optional[str]) -> Dict[str, str]:
+        """ISO date -> holiday name for a state's year; with no state, only admin-added holidays for everywhere"""
+        key = (state, year)
+        if key not in self._years:
+            holidays: Dict[str, str] = {}
+            if state is not None:
+                for day, name in national_holidays(year) + state_holidays(year, state):
+                    holidays.setdefault(day.isoformat(), name)
+            holidays.update(self._custom.get((None, year), {}))
+            holidays.update(self._custom.get((state, year), {}))
+            self._years[key] = dict(sorted(holidays.items()))
+            self._date_sets[key] = frozenset(holidays)
+        return self._years[key]
+
+    def is_holiday(self, date_str: str, state: Optional[str]) -> bool:
+        key = (state, int(date_str[:4]))
+        date_set = self._date_sets.get(key)
+        if date_set is None:
+            self.holidays_for_year(key[1], state)
+            date_set = self._date_sets[key]
+        return date_str in date_set
@@ -0,0 +1,184 @@
+"""Declarative index registry, startup reconciliation and explain-plan audit"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from roster_changes import CHANGE_RETENTION_DAYS
+
+# Unique indexes on `id` are sparse so legacy documents without an id don't collide
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "roster": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("date", ASCENDING), ("start_time", ASCENDING), ("end_time", ASCENDING)]),
+        IndexModel([("staff_id", ASCENDING), ("date", ASCENDING)]),
+        IndexModel([("month", ASCENDING), ("date", ASCENDING)]),
+        IndexModel([("week", ASCENDING)]),
+    ],
+    "staff": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("active", ASCENDING), ("name", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("username", ASCENDING)]),
+        IndexModel([("staff_id", ASCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+    ],
+    "sessions": [
+        IndexModel([("token", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "shift_requests": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("staff_id", ASCENDING), ("request_date", DESCENDING)]),
+        IndexModel([("roster_entry_id", ASCENDING), ("staff_id", ASCENDING)]),
+    ],
+    "staff_availability": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("staff_id", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "clients": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("full_name", ASCENDING)]),
+    ],
+    "notifications": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "calendar_events": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("is_active", ASCENDING), ("date", ASCENDING)]),
+    ],
+    "shift_templates": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("day_of_week", ASCENDING)]),
+    ],
+    "day_templates": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("day_of_week", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "roster_templates": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+    ],
+    "public_holidays": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("date", ASCENDING), ("state", ASCENDING)]),
+    ],
+    "jobs": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("type", ASCENDING), ("status", ASCENDING), ("run_after", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)]),
+        IndexModel([("dedupe_key", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "settings_versions": [
+        IndexModel([("id", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("version", ASCENDING)], unique=True),
+        IndexModel([("effective_from", ASCENDING), ("version", ASCENDING)]),
+    ],
+    "roster_month_summary": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("month", ASCENDING), ("staff_id", ASCENDING)]),
+    ],
+    "content_versions": [
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "roster_changes": [
+        IndexModel([("seq", ASCENDING)], unique=True),
+        IndexModel([("month", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=CHANGE_RETENTION_DAYS * 24 * 3600),
+    ],
+    "generation_plans": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+# Representative filters for the queries the API runs most often: (label, collection, filter, sort)
+HOT_QUERY_SHAPES: List[Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, int]]]]] = [
+    ("roster_by_date", "roster", {"date": "2025-01-01"}, None),
+    ("roster_by_month", "roster", {"month": "2025-01"}, None),
+    ("roster_by_week", "roster", {"week": "2025-W01"}, None),
+    ("roster_duplicate_check", "roster", {"date": "2025-01-01", "start_time": "07:30", "end_time": "15:30"}, None),
+    ("roster_export_range", "roster", {"date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, [("date", ASCENDING)]),
+    ("roster_by_staff", "roster", {"staff_id": "staff-id", "date": {"$gte": "2025-01-01"}}, None),
+    ("roster_timesheet", "roster", {"staff_id": {"$gt": ""}, "date": {"$gte": "2025-01-06", "$lt": "2025-01-20"}}, None),
+    ("roster_by_id", "roster", {"id": "entry-id"}, None),
+    ("session_by_token", "sessions", {"token": "token", "is_active": True}, None),
+    ("user_by_username", "users", {"username": "Admin", "is_active": True}, None),
+    ("user_by_id", "users", {"id": "user-id", "is_active": True}, None),
+    ("availability_by_staff", "staff_availability", {"staff_id": "staff-id", "is_active": True}, None),
+    ("notifications_by_user", "notifications", {"user_id": "user-id"}, None),
+    ("shift_requests_by_staff", "shift_requests", {"staff_id": "staff-id"}, None),
+    ("active_staff", "staff", {"active": True}, None),
+    ("job_claim", "jobs", {"type": "send_email", "status": "queued", "run_after": {"$lte": datetime(2025, 1, 1)}},
+     [("run_after", ASCENDING)]),
+]
+
+
+def _key_of(key_spec) -> Tuple[Tuple[str, Any], ...]:
+    """Normalise an index key spec to a comparable tuple"""
+    if isinstance(key_spec, dict):
+        key_spec = key_spec.items()
+    return tuple((field, direction) for field, direction in key_spec)
+
+
+async def reconcile_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Create registered indexes that are missing and report indexes that aren't registered"""
+    report = {}
+    for collection_name, models in INDEX_REGISTRY.items():
+        repository = getattr(db, collection_name)
+        existing = await repository.index_information()
+        existing_keys = {_key_of(info["key"]): name for name, info in existing.items()}
+        registered_keys = set()
+        created, present, failed = [], [], []
+
+        for model in models:
+            spec = model.document
+            key = _key_of(spec["key"])
+            registered_keys.add(key)
+            if key in existing_keys:
+                present.append(existing_keys[key])
+                continue
+            try:
+                created.extend(await repository.create_indexes([model]))
+            except OperationFailure as e:
+                failed.append(f"{spec['name']}: {e}")
+
+        extra = [name for key, name in existing_keys.items() if key not in registered_keys and name != "_id_"]
+        report[collection_name] = {"created": created, "present": present, "extra": extra, "failed": failed}
+    return report
+
+
+def _collect_plan_stages(plan, stages: List[str], index_names: List[str]):
+    """Walk an explain winning plan collecting stage names and the indexes used"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if plan.get("indexName"):
+            index_names.append(plan["indexName"])
+        for value in plan.values():
+            _collect_plan_stages(value, stages, index_names)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_plan_stages(item, stages, index_names)
+
+
+async def audit_query_plans(db) -> List[Dict[str, Any]]:
+    """Run explain() on every hot query shape and flag collection scans"""
+    results = []
+    for label, collection_name, query, sort in HOT_QUERY_SHAPES:
+        plan = await getattr(db, collection_name).explain(query, sort=sort)
+        stages, index_names = [], []
+        _collect_plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}), stages, index_names)
+        results.append({
+            "query": label,
+            "collection": collection_name,
+            "filter": query,
+            "stages": stages,
+            "indexes_used": index_names,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return results
@@ -0,0 +1,276 @@
+"""Mongo-backed background jobs: a worker pool with per-type limits, heartbeats, retries and cancellation
+
+Jobs are claimed atomically from the `jobs` collection, so any API process
+can run any queued job. A running job refreshes `heartbeat_at`; one whose
+heartbeat goes stale (its process died) is put back in the queue and
+resumed by whichever worker claims it next.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when cancellation was requested"""
+
+
+class JobContext:
+    """Handle passed to job handlers for progress reporting and cancellation checks
+
+    Step-based jobs declare a list of named steps up front. Completed steps
+    are recorded as they finish, so a resumed job only runs the steps left.
+    """
+
+    def __init__(self, db, job: Dict[str, Any], worker_id: str):
+        self.db = db
+        self.job = job
+        self.job_id = job["id"]
+        self.worker_id = worker_id
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.job.get("params", {})
+
+    @property
+    def attempt(self) -> int:
+        return self.job.get("attempts", 1)
+
+    def pending_steps(self) -> List[str]:
+        done = set(self.job.get("completed_steps", []))
+        return [step for step in self.job.get("steps", []) if step not in done]
+
+    async def _update(self, update: Dict[str, Any]):
+        now = datetime.utcnow()
+        update.setdefault("$set", {}).update({"heartbeat_at": now, "updated_at": now})
+        await self.db.jobs.update_one({"id": self.job_id, "worker_id": self.worker_id}, update)
+
+    async def check_cancelled(self):
+        job = await self.db.jobs.find_one({"id": self.job_id}, {"_id": 0, "cancel_requested": 1})
+        if job and job.get("cancel_requested"):
+            raise JobCancelled()
+
+    async def progress(self, completed: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Report progress for jobs that aren't split into steps"""
+        fields: Dict[str, Any] = {"progress.completed": completed}
+        if total is not None:
+            fields["progress.total"] = total
+        if message is not None:
+            fields["progress.message"] = message
+        await self._update({"$set": fields})
+
+    async def step_done(self, step: str, result: Any = None):
+        await self._update({
+            "$addToSet": {"completed_steps": step},
+            "$set": {f"results.{step}": result},
+            "$inc": {"progress.completed": 1},
+        })
+        self.job.setdefault("completed_steps", []).append(step)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+
+class JobType(NamedTuple):
+    handler: JobHandler
+    concurrency: int
+    max_attempts: int
+    backoff_seconds: float
+
+
+class JobRunner:
+    """Claims queued jobs for registered types and runs them within each type's concurrency limit"""
+
+    def __init__(self, db, poll_interval: float = 5.0, heartbeat_interval: float = 10.0,
+                 lease_seconds: float = 60.0):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.types: Dict[str, JobType] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running_by_type: Dict[str, int] = defaultdict(int)
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def register(self, job_type: str, handler: JobHandler, concurrency: int = 1, max_attempts: int = 1,
+                 backoff_seconds: float = 30.0):
+        """Register a handler; failed attempts are retried after backoff_seconds, doubling each time"""
+        self.types[job_type] = JobType(handler, concurrency, max_attempts, backoff_seconds)
+
+    async def submit(self, job_type: str, params: Dict[str, Any], steps: Optional[List[str]] = None,
+                     dedupe_key: Optional[str] = None, created_by: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Queue a job; returns None if a job with the same dedupe_key is queued, running or completed
+
+        Failed and cancelled jobs give up their dedupe_key, so the same work can be submitted again.
+        """
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type: {job_type}")
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "status": JOB_QUEUED,
+            "params": params,
+            "steps": steps or [],
+            "completed_steps": [],
+            "results": {},
+            "result": None,
+            "progress": {"completed": 0, "total": len(steps) if steps else None},
+            "attempts": 0,
+            "max_attempts": self.types[job_type].max_attempts,
+            "run_after": now,
+            "cancel_requested": False,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if dedupe_key:
+            job["dedupe_key"] = dedupe_key
+        try:
+            await self.db.jobs.insert_one(job)
+        except DuplicateKeyError:
+            return None
+        job.pop("_id", None)
+        if self._wake:
+            self._wake.set()
+        return job
+
+    def start(self):
+        """Start the dispatcher on the running event loop"""
+        if self._dispatcher is None:
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stop claiming work; jobs still running are recovered by another worker once their lease lapses"""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                await self._requeue_stale()
+                await self._claim_available()
+            except Exception as e:
+                print(f"❌ Job dispatcher error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _requeue_stale(self):
+        """Put running jobs whose worker stopped heartbeating back in the queue"""
+        now = datetime.utcnow()
+        result = await self.db.jobs.update_many(
+            {"status": JOB_RUNNING, "heartbeat_at": {"$not": {"$gte": now - timedelta(seconds=self.lease_seconds)}}},
+            {"$set": {"status": JOB_QUEUED, "run_after": now, "worker_id": None, "updated_at": now}}
+        )
+        if result.modified_count:
+            print(f"🔁 Requeued {result.modified_count} interrupted background jobs")
+
+    async def _claim_available(self):
+        for job_type, config in self.types.items():
+            while self._running_by_type[job_type] < config.concurrency:
+                now = datetime.utcnow()
+                job = await self.db.jobs.find_one_and_update(
+                    {"type": job_type, "status": JOB_QUEUED, "run_after": {"$not": {"$gt": now}}},
+                    {
+                        "$set": {
+                            "status": JOB_RUNNING,
+                            "worker_id": self.worker_id,
+                            "started_at": now,
+                            "heartbeat_at": now,
+                            "updated_at": now,
+                        },
+                        "$inc": {"attempts": 1},
+                    },
+                    projection={"_id": 0},
+                    sort=[("run_after", 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if not job:
+                    break
+                self._running_by_type[job_type] += 1
+                self._tasks[job["id"]] = asyncio.create_task(self._run(job, config))
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.db.jobs.update_one(
+                {"id": job_id, "worker_id": self.worker_id},
+                {"$set": {"heartbeat_at": datetime.utcnow()}}
+            )
+
+    async def _finish(self, job_id: str, fields: Dict[str, Any], release_dedupe_key: bool = False):
+        """Write a job's outcome, unless its lease was lost and another worker took it over"""
+        fields["updated_at"] = datetime.utcnow()
+        update: Dict[str, Any] = {"$set": fields}
+        if release_dedupe_key:
+            update["$unset"] = {"dedupe_key": ""}
+        await self.db.jobs.update_one({"id": job_id, "worker_id": self.worker_id}, update)
+
+    async def _run(self, job: Dict[str, Any], config: JobType):
+        job_id = job["id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await config.handler(JobContext(self.db, job, self.worker_id))
+        except JobCancelled:
+            await self._finish(job_id, {"status": JOB_CANCELLED, "finished_at": datetime.utcnow()}, release_dedupe_key=True)
+        except Exception as e:
+            attempts = job.get("attempts", 1)
+            if attempts < job.get("max_attempts", config.max_attempts):
+                delay = config.backoff_seconds * 2 ** (attempts - 1)
+                print(f"⚠️ Job {job_id} ({job['type']}) attempt {attempts} failed, retrying in {delay:.0f}s: {e}")
+                await self._finish(job_id, {
+                    "status": JOB_QUEUED,
+                    "run_after": datetime.utcnow() + timedelta(seconds=delay),
+                    "last_error": str(e),
+                    "worker_id": None,
+                })
+            else:
+                print(f"❌ Job {job_id} ({job['type']}) failed: {e}")
+                await self._finish(
+                    job_id, {"status": JOB_FAILED, "error": str(e), "finished_at": datetime.utcnow()}, release_dedupe_key=True
+                )
+        else:
+            await self._finish(job_id, {"status": JOB_COMPLETED, "result": result, "finished_at": datetime.utcnow()})
+        finally:
+            heartbeat.cancel()
+            self._tasks.pop(job_id, None)
+            self._running_by_type[job["type"]] -= 1
+            self._wake.set()
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job outright, or ask a running one to stop at its next check"""
+        now = datetime.utcnow()
+        result = await self.db.jobs.update_one(
+            {"id": job_id, "status": JOB_QUEUED},
+            {"$set": {"status": JOB_CANCELLED, "cancel_requested": True, "finished_at": now, "updated_at": now},
+             "$unset": {"dedupe_key": ""}}
+        )
+        if result.matched_count:
+            return True
+        result = await self.db.jobs.update_one(
+            {"id": job_id, "status": JOB_RUNNING},
+            {"$set": {"cancel_requested": True, "updated_at": now}}
+        )
+        return result.matched_count > 0
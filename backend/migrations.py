@@ -0,0 +1,54 @@
+"""Resumable data migrations with checkpoints stored in the `migrations` collection"""
+from datetime import datetime
+from typing import Any, Dict
+
+from pymongo import UpdateOne
+
+from repository import roster_date_keys
+from roster_writes import invalidate_roster_months
+
+ROSTER_DATE_KEYS_MIGRATION = "roster_month_week_keys"
+
+
+async def backfill_roster_date_keys(db, batch_size: int = 1000) -> Dict[str, Any]:
+    """Populate month/week bucket keys on roster entries written before they existed
+
+    Work is committed in `_id` order one batch at a time and the last `_id`
+    is checkpointed, so an interrupted run picks up where it stopped.
+    """
+    checkpoint = await db.migrations.find_one({"name": ROSTER_DATE_KEYS_MIGRATION}) or {}
+    if checkpoint.get("completed"):
+        last_id, updated = None, 0
+    else:
+        last_id, updated = checkpoint.get("last_id"), checkpoint.get("updated", 0)
+
+    while True:
+        query = {"month": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.roster.find(query, {"_id": 1, "date": 1}, sort=[("_id", 1)], limit=batch_size)
+        if not batch:
+            break
+
+        await db.roster.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": roster_date_keys(doc.get("date"))})
+            for doc in batch
+        ], ordered=False)
+        # Entries without a month key were invisible to month reads until now
+        await invalidate_roster_months(db, {doc["date"][:7] for doc in batch if doc.get("date")})
+        last_id = batch[-1]["_id"]
+        updated += len(batch)
+        await db.migrations.update_one(
+            {"name": ROSTER_DATE_KEYS_MIGRATION},
+            {"$set": {"last_id": last_id, "updated": updated, "completed": False, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    # Clear the checkpoint so a later run rescans from the start
+    await db.migrations.update_one(
+        {"name": ROSTER_DATE_KEYS_MIGRATION},
+        {"$set": {"last_id": None, "updated": updated, "completed": True, "completed_at": datetime.utcnow()}},
+        upsert=True
+    )
+    remaining = await db.roster.count_documents({"month": {"$exists": False}})
+    return {"migration": ROSTER_DATE_KEYS_MIGRATION, "entries_updated": updated, "remaining": remaining}
@@ -0,0 +1,171 @@
+"""Materialised per-month, per-staff, per-shift-type roster totals kept current with $inc deltas
+
+Every roster write passes the affected documents as they were before and
+after the write; the difference in their contributions is applied as one
+unordered bulk of upserts. rebuild_month recomputes a month from scratch and
+verify_month reports any drift between the two.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from payrules import SHIFT_TYPE_KEYS, classify_one, time_to_minutes, weekday_of
+
+SLEEPOVER = "sleepover"
+UNASSIGNED = "unassigned"
+
+# Summary field -> roster entry field it totals
+SUMMARY_TOTALS = {
+    "hours": "hours_worked",
+    "base_pay": "base_pay",
+    "sleepover_allowance": "sleepover_allowance",
+    "total_pay": "total_pay",
+    "ndis_charge": "ndis_total_charge",
+}
+SUMMARY_FIELDS = tuple(SUMMARY_TOTALS) + ("count",)
+
+# $inc deltas accumulate float rounding, so verification allows half a cent (or hundredth of an hour)
+VERIFY_TOLERANCE = 0.005
+
+SummaryKey = Tuple[str, Optional[str], str]
+
+
+def is_holiday_entry(entry: Dict[str, Any]) -> bool:
+    """Flagged as a public holiday by hand, or by the holiday calendar when its pay was last calculated"""
+    return bool(entry.get("is_public_holiday") or entry.get("calendar_holiday"))
+
+
+def entry_shift_type(entry: Dict[str, Any]) -> str:
+    """Shift type an entry is summarised under: sleepover, its manual type, else its classified (first-day) type"""
+    is_sleepover = entry.get("manual_sleepover")
+    if is_sleepover is None:
+        is_sleepover = entry.get("is_sleepover", False)
+    if is_sleepover:
+        return SLEEPOVER
+    if entry.get("manual_shift_type"):
+        return entry["manual_shift_type"]
+    try:
+        start = time_to_minutes(entry["start_time"])
+        end = time_to_minutes(entry["end_time"])
+        if end <= start:
+            end = 24 * 60 - 1  # Overnight shifts are typed by their first day
+        return SHIFT_TYPE_KEYS[classify_one(weekday_of(entry["date"]), is_holiday_entry(entry), start, end)]
+    except (KeyError, ValueError, TypeError):
+        return SHIFT_TYPE_KEYS[0]
+
+
+def summary_key(entry: Dict[str, Any]) -> Optional[SummaryKey]:
+    month = entry.get("month") or (entry.get("date") or "")[:7]
+    if not month:
+        return None
+    return month, entry.get("staff_id") or None, entry_shift_type(entry)
+
+
+def summary_id(key: SummaryKey) -> str:
+    month, staff_id, shift_type = key
+    return f"{month}|{staff_id or UNASSIGNED}|{shift_type}"
+
+
+def contribution(entry: Dict[str, Any]) -> Dict[str, float]:
+    totals = {field: float(entry.get(source) or 0.0) for field, source in SUMMARY_TOTALS.items()}
+    totals["count"] = 1
+    return totals
+
+
+class SummaryDeltas:
+    """Accumulates the summary change for a batch of roster writes"""
+
+    def __init__(self):
+        self._deltas: Dict[SummaryKey, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(SUMMARY_FIELDS, 0))
+        self._staff_names: Dict[SummaryKey, Optional[str]] = {}
+
+    def add(self, entry: Dict[str, Any], sign: int = 1):
+        key = summary_key(entry)
+        if key is None:
+            return
+        delta = self._deltas[key]
+        for field, value in contribution(entry).items():
+            delta[field] += sign * value
+        if sign > 0 and key[1]:
+            self._staff_names[key] = entry.get("staff_name")
+
+    def change(self, before: Iterable[Dict[str, Any]] = (), after: Iterable[Dict[str, Any]] = ()) -> "SummaryDeltas":
+        for entry in before:
+            self.add(entry, -1)
+        for entry in after:
+            self.add(entry, 1)
+        return self
+
+    def requests(self) -> List[UpdateOne]:
+        requests = []
+        for key, delta in self._deltas.items():
+            increments = {field: value for field, value in delta.items() if value}
+            if not increments:
+                continue
+            month, staff_id, shift_type = key
+            update: Dict[str, Any] = {
+                "$inc": increments,
+                "$setOnInsert": {"month": month, "staff_id": staff_id, "shift_type": shift_type},
+            }
+            if key in self._staff_names:
+                update["$set"] = {"staff_name": self._staff_names[key]}
+            requests.append(UpdateOne({"id": summary_id(key)}, update, upsert=True))
+        return requests
+
+
+async def apply_summary_change(db, before: Iterable[Dict[str, Any]] = (), after: Iterable[Dict[str, Any]] = ()) -> int:
+    """Apply the summary difference between roster documents before and after a write"""
+    requests = SummaryDeltas().change(before, after).requests()
+    if requests:
+        await db.roster_month_summary.bulk_write(requests, ordered=False)
+    return len(requests)
+
+
+def summarise(entries: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Summary documents by id for a set of roster entries"""
+    summaries: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        key = summary_key(entry)
+        if key is None:
+            continue
+        doc_id = summary_id(key)
+        if doc_id not in summaries:
+            month, staff_id, shift_type = key
+            summaries[doc_id] = dict(
+                {"id": doc_id, "month": month, "staff_id": staff_id, "staff_name": None, "shift_type": shift_type},
+                **dict.fromkeys(SUMMARY_FIELDS, 0)
+            )
+        summary = summaries[doc_id]
+        for field, value in contribution(entry).items():
+            summary[field] += value
+        if summary["staff_id"] and entry.get("staff_name"):
+            summary["staff_name"] = entry["staff_name"]
+    return summaries
+
+
+async def rebuild_month(db, month: str) -> int:
+    """Recompute a month's summary documents from its roster entries"""
+    summaries = summarise(await db.roster.find_month(month, {"_id": 0}))
+    await db.roster_month_summary.delete_many({"month": month})
+    if summaries:
+        await db.roster_month_summary.insert_many(list(summaries.values()), ordered=False)
+    return len(summaries)
+
+
+async def verify_month(db, month: str) -> Dict[str, Any]:
+    """Compare the maintained summary for a month against one recomputed from its entries"""
+    expected = summarise(await db.roster.find_month(month, {"_id": 0}))
+    stored = {doc["id"]: doc for doc in await db.roster_month_summary.find({"month": month}, {"_id": 0})}
+    mismatches = []
+    for doc_id in sorted(set(expected) | set(stored)):
+        want = expected.get(doc_id, {})
+        have = stored.get(doc_id, {})
+        differences = {
+            field: {"expected": round(want.get(field, 0), 2), "stored": round(have.get(field, 0), 2)}
+            for field in SUMMARY_FIELDS
+            if abs(want.get(field, 0) - have.get(field, 0)) >= VERIFY_TOLERANCE
+        }
+        if differences:
+            mismatches.append({"id": doc_id, "differences": differences})
+    return {"month": month, "summaries": len(expected), "consistent": not mismatches, "mismatches": mismatches}
@@ -0,0 +1,124 @@
+"""Per-date interval index for shift overlap detection"""
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def time_to_minutes(time_str: str) -> int:
+    hours, minutes = map(int, time_str.split(":"))
+    return hours * 60 + minutes
+
+
+def shift_interval(start_time: str, end_time: str) -> Tuple[int, int]:
+    """Return (start, end) minutes, pushing the end past midnight for overnight shifts"""
+    start = time_to_minutes(start_time)
+    end = time_to_minutes(end_time)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def is_2_1_shift(shift_name: Optional[str]) -> bool:
+    return bool(shift_name) and "2:1" in shift_name.lower()
+
+
+def entry_shift_name(entry: Dict[str, Any], template_names: Dict[str, str]) -> str:
+    """Name of a roster entry's shift: its template's name, else the entry's own name"""
+    name = ""
+    if entry.get("shift_template_id"):
+        name = template_names.get(entry["shift_template_id"], "")
+    return name or entry.get("name") or ""
+
+
+class DayIntervalIndex:
+    """Shifts on one date kept sorted by start minute
+
+    A running maximum of end minutes over the sorted starts answers "does
+    anything overlap [start, end)" with one bisect. Overnight shifts are
+    stored with their end pushed past midnight, as on the same date.
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self._entries: List[Dict[str, Any]] = list(entries)
+        # The sequence number keeps ties stable and points back at the entry
+        self._intervals: List[Tuple[int, int, int]] = sorted(
+            shift_interval(entry["start_time"], entry["end_time"]) + (seq,)
+            for seq, entry in enumerate(self._entries)
+        )
+        self._max_end: List[int] = []
+        self._refresh_max_end(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _refresh_max_end(self, position: int):
+        """Recompute the running end maximum from a sorted position onwards"""
+        del self._max_end[position:]
+        running = self._max_end[-1] if self._max_end else -1
+        for _, end, _ in self._intervals[position:]:
+            running = max(running, end)
+            self._max_end.append(running)
+
+    def add(self, entry: Dict[str, Any]):
+        interval = shift_interval(entry["start_time"], entry["end_time"]) + (len(self._entries),)
+        position = bisect_left(self._intervals, interval)
+        self._intervals.insert(position, interval)
+        self._entries.append(entry)
+        self._refresh_max_end(position)
+
+    def _candidates(self, end: int) -> int:
+        """Number of sorted intervals that start before `end`"""
+        return bisect_left(self._intervals, (end, -1, -1))
+
+    def has_overlap(self, start_time: str, end_time: str, exclude_id: Optional[str] = None) -> bool:
+        start, end = shift_interval(start_time, end_time)
+        count = self._candidates(end)
+        if not count or self._max_end[count - 1] <= start:
+            return False
+        if exclude_id is None:
+            return True
+        return any(entry.get("id") != exclude_id for entry in self.overlapping(start_time, end_time))
+
+    def overlapping(self, start_time: str, end_time: str, exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entries whose interval intersects [start_time, end_time)"""
+        start, end = shift_interval(start_time, end_time)
+        count = self._candidates(end)
+        if not count or self._max_end[count - 1] <= start:
+            return []
+        return [
+            self._entries[seq] for _, existing_end, seq in self._intervals[:count]
+            if existing_end > start and (exclude_id is None or self._entries[seq].get("id") != exclude_id)
+        ]
+
+    def conflicts(self, start_time: str, end_time: str, shift_name: Optional[str] = None,
+                  exclude_id: Optional[str] = None) -> bool:
+        """True if the shift would overlap and isn't allowed to: only 2:1 shifts may overlap others"""
+        if is_2_1_shift(shift_name):
+            return False
+        return self.has_overlap(start_time, end_time, exclude_id=exclude_id)
+
+
+class RosterIntervalIndex:
+    """Interval indexes for many dates, built lazily from one batch of entries"""
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._days: Dict[str, DayIntervalIndex] = {}
+        for entry in entries:
+            self._pending[entry["date"]].append(entry)
+
+    def day(self, date_str: str) -> DayIntervalIndex:
+        index = self._days.get(date_str)
+        if index is None:
+            index = DayIntervalIndex(self._pending.pop(date_str, ()))
+            self._days[date_str] = index
+        return index
+
+    def add(self, entry: Dict[str, Any]):
+        self.day(entry["date"]).add(entry)
+
+    def conflicts(self, date_str: str, start_time: str, end_time: str, shift_name: Optional[str] = None,
+                  exclude_id: Optional[str] = None) -> bool:
+        return self.day(date_str).conflicts(start_time, end_time, shift_name=shift_name, exclude_id=exclude_id)
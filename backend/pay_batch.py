@@ -0,0 +1,294 @@
+"""Vectorised pay and NDIS charge calculation for many roster entries at once
+
+Mirrors payrules.evaluate operation for operation, so every float comes out
+bit-identical to the scalar path (verify_against_scalar checks this).
+"""
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from payrules import PAY_RESULT_FIELDS, RuleSet
+from payrules.classify import (
+    END_BY_EVENING,
+    MINUTES_PER_DAY,
+    SHIFT_TYPE_CODES,
+    SHIFT_TYPE_KEYS,
+    START_NORMAL,
+    WEEKDAY_DAY,
+    next_date_of,
+    shift_minutes,
+    weekday_of,
+)
+from payrules.rules import SLEEPOVER_NDIS_KEY
+from shift_classifier import SHIFT_TYPE_TABLE, classify, classify_post_midnight
+
+NO_OVERRIDE = -1
+
+
+class PayColumns:
+    """Columnar pay inputs for a batch of roster entries
+
+    Manual shift type overrides are dictionary-encoded twice because the
+    scalar path treats them differently: pay looks the exact value up in the
+    shift type map (defaulting to weekday_day), NDIS lowercases it and looks
+    it up in the NDIS rate table.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.weekday = np.zeros(size, dtype=np.int8)
+        self.next_weekday = np.zeros(size, dtype=np.int8)
+        self.holiday = np.zeros(size, dtype=bool)
+        self.calendar_holiday = np.zeros(size, dtype=bool)
+        self.next_day_holiday = np.zeros(size, dtype=bool)
+        self.start_minute = np.zeros(size, dtype=np.int32)
+        self.end_minute = np.zeros(size, dtype=np.int32)
+        self.sleepover = np.zeros(size, dtype=bool)
+        self.wake_hours = np.zeros(size, dtype=np.float64)
+        self.manual_hourly_rate = np.full(size, np.nan, dtype=np.float64)
+        self.manual_pay_type = np.full(size, NO_OVERRIDE, dtype=np.int8)
+        self.manual_ndis_key: List[Optional[str]] = [None] * size
+
+
+def build_pay_columns(entries: List[Dict[str, Any]],
+                      is_holiday: Optional[Callable[[str], bool]] = None) -> Tuple[PayColumns, List[Tuple[int, str]]]:
+    """Encode roster entry documents as pay columns
+
+    `is_holiday` is the holiday calendar lookup, as in payrules.evaluate: it adds to the entry's own flag and decides whether the day
+    after a cross-midnight shift is a holiday. The manual flag is only read; the calendar's answer is kept in its own column.
+    Returns the columns and (row, error) pairs for rows that couldn't be
+    parsed; those rows are left as zero-hour placeholders.
+    """
+    columns = PayColumns(len(entries))
+    errors: List[Tuple[int, str]] = []
+
+    for row, entry in enumerate(entries):
+        try:
+            date_str = entry["date"]
+            weekday = weekday_of(date_str)
+            start_minute, end_minute = shift_minutes(entry["start_time"], entry["end_time"])
+        except (KeyError, TypeError, ValueError) as e:
+            errors.append((row, str(e)))
+            continue
+
+        columns.weekday[row] = weekday
+        columns.next_weekday[row] = (weekday + 1) % 7
+        columns.calendar_holiday[row] = is_holiday is not None and is_holiday(date_str)
+        columns.holiday[row] = bool(entry.get("is_public_holiday")) or columns.calendar_holiday[row]
+        if is_holiday is not None and end_minute <= start_minute:
+            columns.next_day_holiday[row] = is_holiday(next_date_of(date_str))
+        columns.start_minute[row] = start_minute
+        columns.end_minute[row] = end_minute
+
+        manual_sleepover = entry.get("manual_sleepover")
+        columns.sleepover[row] = bool(manual_sleepover if manual_sleepover is not None else entry.get("is_sleepover"))
+        columns.wake_hours[row] = entry.get("wake_hours") or 0
+
+        if entry.get("manual_hourly_rate"):
+            columns.manual_hourly_rate[row] = entry["manual_hourly_rate"]
+        manual_shift_type = entry.get("manual_shift_type")
+        if manual_shift_type:
+            columns.manual_pay_type[row] = (
+                SHIFT_TYPE_CODES.get(manual_shift_type, WEEKDAY_DAY)
+            )
+            columns.manual_ndis_key[row] = manual_shift_type.lower()
+
+    return columns, errors
+
+
+class NdisRateTable:
+    """NDIS line items keyed by position for fancy indexing"""
+
+    def __init__(self, rules: RuleSet):
+        line_items = list(rules.ndis_line_items.values())
+        self.keys = [item.key for item in line_items]
+        self.position = {key: index for index, key in enumerate(self.keys)}
+        self.rates = np.array([item.rate for item in line_items], dtype=np.float64)
+        self.line_item_codes = np.array([item.line_item_code for item in line_items], dtype=object)
+        self.descriptions = np.array([item.description for item in line_items], dtype=object)
+        self.default = self.position["weekday_day"]
+        # Hourly billing falls back to weekday_day for unknown shift types
+        self.shift_type_position = np.array(
+            [self.position.get(key, self.default) for key in SHIFT_TYPE_KEYS], dtype=np.int32
+        )
+
+    def lookup(self, key: str) -> int:
+        return self.position.get(key, self.default)
+
+
+def calculate_pay_batch(columns: PayColumns, rules: RuleSet) -> Dict[str, np.ndarray]:
+    """Calculate hours, pay and NDIS charges for every row in one pass"""
+    rates = np.array(rules.hourly_rates, dtype=np.float64)
+    ndis = NdisRateTable(rules)
+
+    start = columns.start_minute
+    end = columns.end_minute
+    sleepover = columns.sleepover
+    crosses_midnight = (end <= start) & ~sleepover
+
+    # Regular (and sleepover) shifts: one span, overnight ends pushed past midnight
+    end_span = np.where(end <= start, end + MINUTES_PER_DAY, end)
+    regular_hours = (end_span - start) / 60.0
+    regular_type = classify(columns.weekday, columns.holiday, start, end)
+    has_manual_type = columns.manual_pay_type != NO_OVERRIDE
+    pay_type = np.where(has_manual_type, columns.manual_pay_type, regular_type)
+    has_manual_rate = ~np.isnan(columns.manual_hourly_rate)
+    hourly_rate = np.where(has_manual_rate, columns.manual_hourly_rate, rates[pay_type])
+
+    # Cross-midnight shifts: split at midnight, each side paid at its own day's rate
+    first_hours = (MINUTES_PER_DAY - start) / 60.0
+    second_hours = end / 60.0
+    first_type = classify(columns.weekday, columns.holiday, start, np.full_like(end, MINUTES_PER_DAY - 1))
+    second_type = classify_post_midnight(columns.next_weekday, columns.next_day_holiday, end)
+    split_pay = first_hours * rates[first_type] + second_hours * rates[second_type]
+
+    included_wake_hours = rules.sleepover_included_wake_hours
+    extra_wake_hours = np.where(columns.wake_hours > included_wake_hours, columns.wake_hours - included_wake_hours, 0.0)
+    has_extra_wake = extra_wake_hours > 0
+
+    hours_worked = np.where(crosses_midnight, first_hours + second_hours, regular_hours)
+    base_pay = np.select(
+        [crosses_midnight, sleepover],
+        [split_pay, np.where(has_extra_wake, extra_wake_hours * hourly_rate, 0.0)],
+        default=regular_hours * hourly_rate,
+    )
+    sleepover_allowance = np.where(sleepover, rules.sleepover_allowance, 0.0)
+    total_pay = np.where(crosses_midnight, base_pay, base_pay + sleepover_allowance)
+
+    # NDIS hourly billing key: manual override, else the (first segment's) shift type
+    auto_type = np.where(crosses_midnight, first_type, regular_type)
+    ndis_position = ndis.shift_type_position[auto_type]
+    for row, key in enumerate(columns.manual_ndis_key):
+        if key is not None:
+            ndis_position[row] = ndis.lookup(key)
+    hourly_charge = ndis.rates[ndis_position]
+
+    # Sleepovers bill a flat rate plus wake hours beyond the included two at the day's hourly rate
+    sleepover_position = ndis.position.get(SLEEPOVER_NDIS_KEY, ndis.default)
+    sleepover_charge = ndis.rates[sleepover_position]
+    # Wake hours bill as a plain daytime shift on that day: weekday_day, weekend or public holiday
+    wake_type = SHIFT_TYPE_TABLE[columns.weekday, columns.holiday.astype(np.int8), START_NORMAL, END_BY_EVENING, 1]
+    wake_type_keys = np.array([key in ndis.position for key in SHIFT_TYPE_KEYS])
+    wake_charge = ndis.rates[ndis.shift_type_position[wake_type]]
+    bills_extra_wake = has_extra_wake & wake_type_keys[wake_type]
+    sleepover_total = np.where(bills_extra_wake, sleepover_charge + extra_wake_hours * wake_charge, sleepover_charge)
+
+    charge_position = np.where(sleepover, sleepover_position, ndis_position)
+    return {
+        "calendar_holiday": columns.calendar_holiday.copy(),
+        "hours_worked": hours_worked,
+        "base_pay": base_pay,
+        "sleepover_allowance": sleepover_allowance,
+        "total_pay": total_pay,
+        "ndis_hourly_charge": np.where(sleepover, 0.0, hourly_charge),
+        "ndis_shift_charge": np.where(sleepover, sleepover_charge, 0.0),
+        "ndis_total_charge": np.where(sleepover, sleepover_total, hours_worked * hourly_charge),
+        "ndis_line_item_code": ndis.line_item_codes[charge_position],
+        "ndis_description": ndis.descriptions[charge_position],
+    }
+
+
+def pay_result_rows(results: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Turn batch result columns into per-row `$set` documents of plain Python values"""
+    columns = {field: results[field].tolist() for field in PAY_RESULT_FIELDS}
+    size = len(columns["hours_worked"])
+    return [{field: columns[field][row] for field in PAY_RESULT_FIELDS} for row in range(size)]
+
+
+def regression_corpus(start_date: str = "2025-01-06", step_minutes: int = 30) -> List[Dict[str, Any]]:
+    """Synthetic roster entries covering every weekday, time boundary and override combination"""
+    base_day = date.fromisoformat(start_date)
+    times = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(0, MINUTES_PER_DAY, step_minutes)]
+    times += ["05:59", "06:01", "19:59", "20:01", "23:59"]
+    variants = [
+        {},
+        {"is_public_holiday": True},
+        {"is_sleepover": True},
+        {"is_sleepover": True, "wake_hours": 3.5},
+        {"is_sleepover": True, "wake_hours": 2},
+        {"is_sleepover": True, "wake_hours": 4, "is_public_holiday": True},
+        {"manual_sleepover": True, "wake_hours": 5, "manual_hourly_rate": 61.25},
+        {"is_sleepover": True, "manual_sleepover": False},
+        {"manual_hourly_rate": 55.5},
+        {"manual_shift_type": "saturday"},
+        {"manual_shift_type": "Sunday"},
+        {"manual_shift_type": "unknown_type"},
+        {"manual_shift_type": "weekday_night", "manual_hourly_rate": 48.0},
+    ]
+
+    corpus = []
+    for day_offset in range(7):
+        date_str = (base_day + timedelta(days=day_offset)).isoformat()
+        for start_index, start_time in enumerate(times):
+            # A rotating subset of end times keeps the corpus around twenty thousand rows
+            for end_time in times[start_index % 3::3]:
+                for variant_index, variant in enumerate(variants):
+                    if (start_index + variant_index) % 4:
+                        continue
+                    entry = {
+                        "id": f"corpus-{len(corpus)}",
+                        "date": date_str,
+                        "shift_template_id": "regression-corpus",
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "is_sleepover": False,
+                        "is_public_holiday": False,
+                    }
+                    entry.update(variant)
+                    corpus.append(entry)
+    return corpus
+
+
+def verify_against_scalar(entries: Iterable[Dict[str, Any]], scalar_pay: Callable[[Dict[str, Any]], Dict[str, Any]],
+                          rules: RuleSet, is_holiday: Optional[Callable[[str], bool]] = None,
+                          max_mismatches: int = 20) -> Dict[str, Any]:
+    """Run both engines over the same entries and report any field that isn't bit-identical"""
+    entries = list(entries)
+    columns, errors = build_pay_columns(entries, is_holiday)
+    batch_rows = pay_result_rows(calculate_pay_batch(columns, rules))
+    failed_rows = {row for row, _ in errors}
+
+    mismatches = []
+    mismatched_entries = 0
+    compared = 0
+    for row, entry in enumerate(entries):
+        if row in failed_rows:
+            continue
+        compared += 1
+        expected = scalar_pay(entry)
+        for field in PAY_RESULT_FIELDS:
+            scalar_value, batch_value = expected.get(field), batch_rows[row][field]
+            # float.hex comparison catches differences in the last bit
+            if isinstance(scalar_value, (int, float)) and not isinstance(scalar_value, bool):
+                identical = float(scalar_value).hex() == float(batch_value).hex()
+            else:
+                identical = scalar_value == batch_value
+            if not identical:
+                mismatched_entries += 1
+                if len(mismatches) < max_mismatches:
+                    mismatches.append({
+                        "id": entry.get("id"), "field": field, "scalar": scalar_value, "batch": batch_value
+                    })
+                break
+
+    return {
+        "entries_compared": compared,
+        "parse_errors": len(errors),
+        "mismatched_entries": mismatched_entries,
+        "mismatches": mismatches,
+        "identical": not mismatched_entries,
+    }
+
+
+def merge_verifications(reports: Iterable[Dict[str, Any]], max_mismatches: int = 20) -> Dict[str, Any]:
+    """Combine verify_against_scalar reports for parts of one batch, e.g. one per settings version"""
+    reports = list(reports)
+    mismatched_entries = sum(report["mismatched_entries"] for report in reports)
+    return {
+        "entries_compared": sum(report["entries_compared"] for report in reports),
+        "parse_errors": sum(report["parse_errors"] for report in reports),
+        "mismatched_entries": mismatched_entries,
+        "mismatches": [mismatch for report in reports for mismatch in report["mismatches"]][:max_mismatches],
+        "identical": not mismatched_entries,
+    }
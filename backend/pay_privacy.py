@@ -0,0 +1,49 @@
+"""Pay privacy for roster reads, as aggregation stages
+
+Staff see pay for their own shifts and for unassigned shifts; on shifts
+assigned to anyone else the pay fields are nulled. Expressing that as a
+`$cond` on `staff_id` lets Mongo build the masked documents in the same pass
+as the month filter, and lets any pipeline over roster entries (month reads,
+the change log, exports) reuse it.
+"""
+from typing import Any, Dict, List, Optional
+
+PAY_FIELDS = (
+    "total_pay",
+    "base_pay",
+    "sleepover_allowance",
+    "ndis_total_charge",
+    "ndis_hourly_charge",
+    "ndis_shift_charge",
+)
+
+
+def pay_viewer(current_user: Dict[str, Any]) -> Optional[str]:
+    """The staff id whose pay a user may see, or None if they may see everyone's"""
+    if current_user["role"] != "staff":
+        return None
+    return current_user.get("staff_id") or current_user.get("id")
+
+
+def masked_pay(staff_id: str, document: str = "$$ROOT") -> Dict[str, Any]:
+    """Expression for a roster document with pay nulled unless it is unassigned or assigned to staff_id"""
+    assigned_to = f"{document}.staff_id"
+    assigned_elsewhere = {"$and": [
+        {"$ne": [{"$ifNull": [assigned_to, ""]}, ""]},
+        {"$ne": [assigned_to, {"$literal": staff_id}]},
+    ]}
+    return {"$cond": [
+        assigned_elsewhere,
+        {"$mergeObjects": [document, {field: None for field in PAY_FIELDS}]},
+        document,
+    ]}
+
+
+def pay_mask_stages(current_user: Dict[str, Any], field: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Stages masking pay for current_user, on the documents themselves or on an embedded entry field"""
+    staff_id = pay_viewer(current_user)
+    if staff_id is None:
+        return []
+    if field is None:
+        return [{"$replaceRoot": {"newRoot": masked_pay(staff_id)}}]
+    return [{"$addFields": {field: masked_pay(staff_id, f"${field}")}}]
@@ -0,0 +1,70 @@
+"""Pay rules engine: shift classification, compiled pay rules and pay/NDIS charge evaluation
+
+Standard library only, so maintenance scripts and tests can price shifts
+without importing the API server:
+
+    rules = compile_rules(settings)        # Settings model or settings document
+    pay = evaluate(rules, roster_entry)    # one roster entry document
+    rows, errors = evaluate_many(rules, roster_entries)
+    pay = memo.evaluate(rules, roster_entry)   # memo = PayMemo(), for shifts that repeat
+"""
+from .classify import (
+    MINUTES_PER_DAY,
+    SHIFT_TYPE_CODES,
+    SHIFT_TYPE_KEYS,
+    RateSegment,
+    classify_one,
+    classify_post_midnight_one,
+    next_date_of,
+    parse_date,
+    rate_segments,
+    shift_minutes,
+    time_to_minutes,
+    weekday_of,
+)
+from .defaults import DEFAULT_NDIS_CHARGE_RATES, DEFAULT_RATES
+from .evaluate import (
+    PAY_RESULT_FIELDS,
+    ShiftKey,
+    calendar_holiday,
+    determine_shift_type,
+    evaluate,
+    evaluate_many,
+    hours_worked,
+    is_sleepover,
+    price,
+    shift_key,
+)
+from .memo import PayMemo
+from .rules import NdisLineItem, RuleSet, compile_rules
+
+__all__ = [
+    "DEFAULT_NDIS_CHARGE_RATES",
+    "DEFAULT_RATES",
+    "MINUTES_PER_DAY",
+    "PAY_RESULT_FIELDS",
+    "SHIFT_TYPE_CODES",
+    "SHIFT_TYPE_KEYS",
+    "NdisLineItem",
+    "PayMemo",
+    "RateSegment",
+    "RuleSet",
+    "ShiftKey",
+    "calendar_holiday",
+    "classify_one",
+    "classify_post_midnight_one",
+    "compile_rules",
+    "determine_shift_type",
+    "evaluate",
+    "evaluate_many",
+    "hours_worked",
+    "is_sleepover",
+    "next_date_of",
+    "parse_date",
+    "price",
+    "rate_segments",
+    "shift_key",
+    "shift_minutes",
+    "time_to_minutes",
+    "weekday_of",
+]
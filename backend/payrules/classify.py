@@ -0,0 +1,150 @@
+"""Minute-resolution shift classification tables
+
+determine_shift_type's rules only look at a handful of cut-offs (midnight
+start, 6am, 8pm, past midnight), so every start minute and end minute is
+mapped to a band once at import and a shift's type becomes one table lookup
+per (weekday, is_holiday). The tables are plain nested lists; the batch
+engine wraps them in NumPy arrays (shift_classifier).
+"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+# Shift type codes, in the order used to index rate arrays
+SHIFT_TYPE_KEYS = ("weekday_day", "weekday_evening", "weekday_night", "saturday", "sunday", "public_holiday")
+WEEKDAY_DAY, WEEKDAY_EVENING, WEEKDAY_NIGHT, SATURDAY, SUNDAY, PUBLIC_HOLIDAY = range(len(SHIFT_TYPE_KEYS))
+SHIFT_TYPE_CODES = {key: code for code, key in enumerate(SHIFT_TYPE_KEYS)}
+
+START_MIDNIGHT, START_EARLY, START_LATE, START_NORMAL = range(4)
+END_BY_EVENING, END_BY_MIDNIGHT, END_AFTER_MIDNIGHT = range(3)
+
+
+def _start_band(start_minute: int) -> int:
+    if start_minute == 0:
+        return START_MIDNIGHT
+    if start_minute < 6 * 60:
+        return START_EARLY
+    if start_minute >= 20 * 60:
+        return START_LATE
+    return START_NORMAL
+
+
+def _end_band(end_span: int) -> int:
+    if end_span <= 20 * 60:
+        return END_BY_EVENING
+    if end_span <= MINUTES_PER_DAY:
+        return END_BY_MIDNIGHT
+    return END_AFTER_MIDNIGHT
+
+
+# Start minute bands
+START_BANDS = [_start_band(minute) for minute in range(MINUTES_PER_DAY)]
+
+# End bands, indexed by the end minute with overnight ends pushed past midnight
+END_BANDS = [_end_band(minute) for minute in range(2 * MINUTES_PER_DAY)]
+
+# Whether the raw end time is at or after 6am, which decides midnight starts and post-midnight segments
+END_DAYTIME = [1 if minute // 60 >= 6 else 0 for minute in range(MINUTES_PER_DAY)]
+
+
+def _filled(table: Any, shift_type: int) -> Any:
+    """A table of the same shape with every cell set to shift_type"""
+    return [_filled(row, shift_type) for row in table] if isinstance(table, list) else shift_type
+
+
+def _weekday_type_table() -> List[List[List[int]]]:
+    """Monday-Friday types by (start band, end band, end daytime), in determine_shift_type's rule order"""
+    table = [[[WEEKDAY_NIGHT, WEEKDAY_NIGHT] for _ in range(3)] for _ in range(4)]
+    for end_band in range(3):
+        table[START_MIDNIGHT][end_band] = [WEEKDAY_NIGHT, WEEKDAY_DAY]
+        table[START_LATE][end_band] = [WEEKDAY_EVENING, WEEKDAY_EVENING]
+    table[START_LATE][END_AFTER_MIDNIGHT] = [WEEKDAY_NIGHT, WEEKDAY_NIGHT]
+    table[START_NORMAL][END_BY_EVENING] = [WEEKDAY_DAY, WEEKDAY_DAY]
+    table[START_NORMAL][END_BY_MIDNIGHT] = [WEEKDAY_EVENING, WEEKDAY_EVENING]
+    return table
+
+
+def _by_day(weekday_table: Any) -> List[List[Any]]:
+    """Expand a Monday-Friday table to (weekday, is_holiday, ...) with holiday and weekend overrides"""
+    weekend = {5: SATURDAY, 6: SUNDAY}
+    return [
+        [
+            _filled(weekday_table, weekend[weekday]) if weekday in weekend else weekday_table,
+            _filled(weekday_table, PUBLIC_HOLIDAY),
+        ]
+        for weekday in range(7)
+    ]
+
+
+SHIFT_TYPE_TABLE = _by_day(_weekday_type_table())
+POST_MIDNIGHT_TYPE_TABLE = _by_day([WEEKDAY_NIGHT, WEEKDAY_DAY])
+
+
+def time_to_minutes(time_str: str) -> int:
+    hours, minutes = map(int, time_str.split(":"))
+    return hours * 60 + minutes
+
+
+def shift_minutes(start_time: str, end_time: str) -> Tuple[int, int]:
+    """Start and end minute of a shift; ValueError unless both are HH:MM clock times (00:00-23:59)"""
+    for time_str in (start_time, end_time):
+        hours, minutes = map(int, time_str.split(":"))
+        if not (0 <= hours < 24 and 0 <= minutes < 60):
+            raise ValueError(f"time out of range: {start_time}-{end_time}")
+    return time_to_minutes(start_time), time_to_minutes(end_time)
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str: str) -> date:
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def weekday_of(date_str: str) -> int:
+    return parse_date(date_str).weekday()
+
+
+@lru_cache(maxsize=4096)
+def next_date_of(date_str: str) -> str:
+    return (parse_date(date_str) + timedelta(days=1)).isoformat()
+
+
+def classify_one(weekday: int, holiday: bool, start_minute: int, end_minute: int) -> int:
+    """Shift type code for a span starting and ending at the given minutes of the day"""
+    end_span = end_minute + MINUTES_PER_DAY if end_minute <= start_minute else end_minute
+    return SHIFT_TYPE_TABLE[weekday][1 if holiday else 0][START_BANDS[start_minute]][END_BANDS[end_span]][END_DAYTIME[end_minute]]
+
+
+def classify_post_midnight_one(weekday: int, holiday: bool, end_minute: int) -> int:
+    """Shift type code for the 00:01-end segment of a cross-midnight shift"""
+    return POST_MIDNIGHT_TYPE_TABLE[weekday][1 if holiday else 0][END_DAYTIME[end_minute]]
+
+
+class RateSegment(NamedTuple):
+    day_offset: int
+    start_minute: int
+    end_minute: int
+    shift_type: int
+
+
+def rate_segments(weekday: int, holiday: bool, next_day_holiday: bool, start_minute: int, end_minute: int,
+                  split_at_midnight: bool = True) -> List[RateSegment]:
+    """Ordered rate segments for a shift; cross-midnight shifts split into the two calendar days"""
+    if end_minute > start_minute:
+        return [RateSegment(0, start_minute, end_minute, classify_one(weekday, holiday, start_minute, end_minute))]
+    if not split_at_midnight:
+        return [RateSegment(
+            0, start_minute, end_minute + MINUTES_PER_DAY,
+            classify_one(weekday, holiday, start_minute, end_minute)
+        )]
+    # The first day is classified as ending at 23:59, the second as starting just after midnight
+    return [
+        RateSegment(0, start_minute, MINUTES_PER_DAY,
+                    classify_one(weekday, holiday, start_minute, MINUTES_PER_DAY - 1)),
+        RateSegment(1, 0, end_minute,
+                    classify_post_midnight_one((weekday + 1) % 7, next_day_holiday, end_minute)),
+    ]
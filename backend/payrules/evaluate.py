@@ -0,0 +1,217 @@
+"""Pay and NDIS charge evaluation for roster entries under a compiled RuleSet
+
+`evaluate` prices one roster entry document; `evaluate_many` prices a batch
+and reports the rows it couldn't parse instead of failing the batch. Pricing
+only depends on the entry's ShiftKey, never on the date itself, which is what
+lets PayMemo share results between weeks. The NumPy engine in pay_batch must
+stay bit-identical to `evaluate`.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from .classify import (
+    MINUTES_PER_DAY,
+    PUBLIC_HOLIDAY,
+    SHIFT_TYPE_KEYS,
+    classify_one,
+    classify_post_midnight_one,
+    next_date_of,
+    rate_segments,
+    shift_minutes,
+    time_to_minutes,
+    weekday_of,
+)
+from .rules import SLEEPOVER_NDIS_KEY, RuleSet
+
+HolidayLookup = Optional[Callable[[str], bool]]
+
+PAY_RESULT_FIELDS = (
+    "calendar_holiday",
+    "hours_worked",
+    "base_pay",
+    "sleepover_allowance",
+    "total_pay",
+    "ndis_hourly_charge",
+    "ndis_shift_charge",
+    "ndis_total_charge",
+    "ndis_line_item_code",
+    "ndis_description",
+)
+
+# NDIS key for sleepover wake hours beyond the included ones, by weekday (public holidays aside)
+WAKE_HOURS_NDIS_KEYS = ("weekday_day",) * 5 + ("saturday", "sunday")
+
+
+def determine_shift_type(date_str: str, start_time: str, end_time: str, is_public_holiday: bool,
+                         is_post_midnight_segment: bool = False) -> str:
+    """Shift type key for a shift; post-midnight segments are classified by their end time only"""
+    if is_public_holiday:
+        return SHIFT_TYPE_KEYS[PUBLIC_HOLIDAY]
+    weekday = weekday_of(date_str)
+    end_minute = time_to_minutes(end_time)
+    if is_post_midnight_segment:
+        return SHIFT_TYPE_KEYS[classify_post_midnight_one(weekday, False, end_minute)]
+    return SHIFT_TYPE_KEYS[classify_one(weekday, False, time_to_minutes(start_time), end_minute)]
+
+
+def hours_worked(start_time: str, end_time: str) -> float:
+    """Hours between start and end time; an end at or before the start is on the next day"""
+    start_minute = time_to_minutes(start_time)
+    end_minute = time_to_minutes(end_time)
+    if end_minute <= start_minute:
+        end_minute += MINUTES_PER_DAY
+    return (end_minute - start_minute) / 60.0
+
+
+def is_sleepover(entry: Mapping[str, Any]) -> bool:
+    manual_sleepover = entry.get("manual_sleepover")
+    return bool(manual_sleepover if manual_sleepover is not None else entry.get("is_sleepover"))
+
+
+class ShiftKey(NamedTuple):
+    """Everything about a roster entry that its pay depends on"""
+    weekday: int
+    holiday: bool
+    next_day_holiday: bool  # Only looked up for shifts split at midnight
+    start_minute: int
+    end_minute: int
+    sleepover: bool
+    wake_hours: float  # Only kept for sleepovers
+    manual_hourly_rate: Optional[float]
+    manual_shift_type: Optional[str]
+
+
+def calendar_holiday(entry: Mapping[str, Any], is_holiday: HolidayLookup = None) -> bool:
+    """Whether the holiday calendar makes the entry's date a public holiday, whatever its manual flag says"""
+    return is_holiday is not None and is_holiday(entry["date"])
+
+
+def shift_key(entry: Mapping[str, Any], is_holiday: HolidayLookup = None) -> ShiftKey:
+    """The pay inputs of a roster entry document, with holidays resolved through the calendar lookup"""
+    date_str = entry["date"]
+    start_minute, end_minute = shift_minutes(entry["start_time"], entry["end_time"])
+    sleepover = is_sleepover(entry)
+    split_at_midnight = end_minute <= start_minute and not sleepover
+    return ShiftKey(
+        weekday=weekday_of(date_str),
+        holiday=bool(entry.get("is_public_holiday")) or calendar_holiday(entry, is_holiday),
+        next_day_holiday=split_at_midnight and is_holiday is not None and is_holiday(next_date_of(date_str)),
+        start_minute=start_minute,
+        end_minute=end_minute,
+        sleepover=sleepover,
+        wake_hours=(entry.get("wake_hours") or 0) if sleepover else 0,
+        manual_hourly_rate=entry.get("manual_hourly_rate") or None,
+        manual_shift_type=entry.get("manual_shift_type") or None,
+    )
+
+
+def _ndis_charges(rules: RuleSet, shift: ShiftKey, result: Dict[str, Any], shift_type: Optional[str],
+                  extra_wake_hours: float):
+    """Client billing: sleepovers per shift plus extra wake hours, everything else hourly; shift_type None means sleepover"""
+    if shift_type is None:
+        sleepover = rules.ndis_line_items[SLEEPOVER_NDIS_KEY]
+        total_charge = sleepover.rate
+        if extra_wake_hours > 0:
+            # Extra wake hours bill as daytime on that day: the sleepover rate already carries the night premium
+            if shift.holiday:
+                wake_key = SHIFT_TYPE_KEYS[PUBLIC_HOLIDAY]
+            else:
+                wake_key = WAKE_HOURS_NDIS_KEYS[shift.weekday]
+            wake_item = rules.ndis_line_item(wake_key)
+            if wake_item is not None:
+                total_charge += extra_wake_hours * wake_item.rate
+        result.update(
+            ndis_hourly_charge=0.0,
+            ndis_shift_charge=sleepover.rate,
+            ndis_total_charge=total_charge,
+            ndis_line_item_code=sleepover.line_item_code,
+            ndis_description=sleepover.description,
+        )
+        return
+
+    # Unknown shift types bill at the weekday day rate
+    item = rules.ndis_line_item(shift_type.lower()) or rules.ndis_line_items["weekday_day"]
+    result.update(
+        ndis_hourly_charge=item.rate,
+        ndis_shift_charge=0.0,
+        ndis_total_charge=result["hours_worked"] * item.rate,
+        ndis_line_item_code=item.line_item_code,
+        ndis_description=item.description,
+    )
+
+
+def price(rules: RuleSet, shift: ShiftKey) -> Dict[str, Any]:
+    """Hours, pay and NDIS charges (the PAY_RESULT_FIELDS but calendar_holiday) for a shift's pay inputs"""
+    start_minute, end_minute = shift.start_minute, shift.end_minute
+    included_wake_hours = rules.sleepover_included_wake_hours
+    extra_wake_hours = shift.wake_hours - included_wake_hours if shift.wake_hours > included_wake_hours else 0
+
+    result: Dict[str, Any] = {}
+    if end_minute <= start_minute and not shift.sleepover:
+        # Cross-midnight shifts are split at midnight and each side paid at its own day's rate;
+        # manual hourly rates don't apply to them
+        first_day, second_day = rate_segments(shift.weekday, shift.holiday, shift.next_day_holiday, start_minute, end_minute)
+        first_day_hours = (first_day.end_minute - first_day.start_minute) / 60.0
+        second_day_hours = (second_day.end_minute - second_day.start_minute) / 60.0
+        base_pay = (first_day_hours * rules.hourly_rates[first_day.shift_type]
+                    + second_day_hours * rules.hourly_rates[second_day.shift_type])
+        result.update(
+            hours_worked=first_day_hours + second_day_hours,
+            base_pay=base_pay,
+            sleepover_allowance=0.0,
+            total_pay=base_pay,
+        )
+        _ndis_charges(rules, shift, result, shift.manual_shift_type or SHIFT_TYPE_KEYS[first_day.shift_type], extra_wake_hours)
+        return result
+
+    span_end = end_minute + MINUTES_PER_DAY if end_minute <= start_minute else end_minute
+    hours = (span_end - start_minute) / 60.0
+    if shift.manual_shift_type:
+        shift_type = shift.manual_shift_type
+    elif shift.holiday:
+        shift_type = SHIFT_TYPE_KEYS[PUBLIC_HOLIDAY]
+    else:
+        shift_type = SHIFT_TYPE_KEYS[classify_one(shift.weekday, False, start_minute, end_minute)]
+    hourly_rate = shift.manual_hourly_rate or rules.hourly_rate(shift_type)
+    if shift.sleepover:
+        # The allowance covers the included wake hours; only the rest are paid hourly
+        base_pay = extra_wake_hours * hourly_rate if extra_wake_hours > 0 else 0.0
+        sleepover_allowance = rules.sleepover_allowance
+    else:
+        base_pay = hours * hourly_rate
+        sleepover_allowance = 0.0
+    result.update(
+        hours_worked=hours,
+        base_pay=base_pay,
+        sleepover_allowance=sleepover_allowance,
+        total_pay=base_pay + sleepover_allowance,
+    )
+    _ndis_charges(rules, shift, result, None if shift.sleepover else shift_type, extra_wake_hours)
+    return result
+
+
+def evaluate(rules: RuleSet, entry: Mapping[str, Any], is_holiday: HolidayLookup = None) -> Dict[str, Any]:
+    """Hours, pay and NDIS charges for one roster entry document
+
+    `is_holiday` is the public holiday calendar lookup: it adds to the entry's
+    own flag and decides whether the day after a cross-midnight shift is a
+    holiday. Returns the PAY_RESULT_FIELDS; the manual `is_public_holiday`
+    flag is only ever read, and the calendar's answer is returned separately
+    as `calendar_holiday`.
+    """
+    result = price(rules, shift_key(entry, is_holiday))
+    result["calendar_holiday"] = calendar_holiday(entry, is_holiday)
+    return result
+
+
+def evaluate_many(rules: RuleSet, entries: Iterable[Mapping[str, Any]],
+                  is_holiday: HolidayLookup = None) -> Tuple[List[Optional[Dict[str, Any]]], List[Tuple[int, str]]]:
+    """evaluate over a batch: per-row results (None where the entry couldn't be parsed) and (row, error) pairs"""
+    results: List[Optional[Dict[str, Any]]] = []
+    errors: List[Tuple[int, str]] = []
+    for row, entry in enumerate(entries):
+        try:
+            results.append(evaluate(rules, entry, is_holiday))
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            results.append(None)
+            errors.append((row, str(e)))
+    return results, errors
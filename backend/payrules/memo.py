@@ -0,0 +1,54 @@
+"""LRU memo of pay results for shifts that repeat week after week
+
+Template shifts come back every week with the same weekday, times and flags,
+so their pay only needs working out once per settings version. Results are
+keyed by the compiled RuleSet (one per settings version) and the entry's
+ShiftKey; the date itself never affects pay beyond what the key holds.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Tuple
+
+from .evaluate import HolidayLookup, ShiftKey, calendar_holiday, price, shift_key
+from .rules import RuleSet
+
+
+class PayMemo:
+    """Bounded LRU of priced shifts with hit/miss counters"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[RuleSet, ShiftKey], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def evaluate(self, rules: RuleSet, entry: Mapping[str, Any], is_holiday: HolidayLookup = None) -> Dict[str, Any]:
+        """payrules.evaluate, answered from the memo when the same shift was priced under the same rules"""
+        key = (rules, shift_key(entry, is_holiday))
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result, calendar_holiday=calendar_holiday(entry, is_holiday))
+
+        self.misses += 1
+        result = price(rules, key[1])
+        self._entries[key] = result
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return dict(result, calendar_holiday=calendar_holiday(entry, is_holiday))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,83 @@
+"""Pay rules compiled from a Settings document
+
+A RuleSet holds everything pay evaluation reads from settings, resolved into
+lookups: hourly rates indexed by shift type code, the sleepover rules and the
+NDIS line items. Rule sets are immutable and compiled once per distinct set
+of pay fields, so every settings version shares one.
+"""
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .classify import SHIFT_TYPE_CODES, SHIFT_TYPE_KEYS, WEEKDAY_DAY
+
+# The allowance is a fixed amount per night, whatever sleepover_default in the rates says
+SLEEPOVER_ALLOWANCE = 175.00
+SLEEPOVER_INCLUDED_WAKE_HOURS = 2
+SLEEPOVER_NDIS_KEY = "sleepover_default"
+
+
+class NdisLineItem(NamedTuple):
+    key: str
+    rate: float
+    line_item_code: str
+    description: str
+
+
+class RuleSet:
+    """Pay rules for one settings version; immutable, build it with compile_rules"""
+
+    __slots__ = (
+        "hourly_rates", "ndis_line_items", "sleepover_allowance", "sleepover_included_wake_hours", "_identity", "_hash"
+    )
+
+    def __init__(self, hourly_rates: Sequence[float], ndis_line_items: Iterable[NdisLineItem],
+                 sleepover_allowance: float = SLEEPOVER_ALLOWANCE,
+                 sleepover_included_wake_hours: float = SLEEPOVER_INCLUDED_WAKE_HOURS):
+        line_items = MappingProxyType({item.key: item for item in ndis_line_items})
+        fields = (tuple(hourly_rates), line_items, sleepover_allowance, sleepover_included_wake_hours)
+        for name, value in zip(self.__slots__, fields):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_identity", (fields[0], tuple(line_items.values()), fields[2], fields[3]))
+        # Rule sets key memoised pay results, so the hash is worked out once
+        object.__setattr__(self, "_hash", hash(self._identity))
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("RuleSet is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, RuleSet) and self._identity == other._identity
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        rates = ", ".join(f"{key}={rate}" for key, rate in zip(SHIFT_TYPE_KEYS, self.hourly_rates))
+        return f"RuleSet({rates}; {len(self.ndis_line_items)} NDIS line items)"
+
+    def hourly_rate(self, shift_type: str) -> float:
+        """Hourly rate for a shift type key; anything unrecognised pays the weekday day rate"""
+        return self.hourly_rates[SHIFT_TYPE_CODES.get(shift_type, WEEKDAY_DAY)]
+
+    def ndis_line_item(self, key: str) -> Optional[NdisLineItem]:
+        return self.ndis_line_items.get(key)
+
+
+def settings_field(settings: Any, name: str) -> Any:
+    """Read a field from a Settings model or a plain settings document"""
+    return settings[name] if isinstance(settings, Mapping) else getattr(settings, name)
+
+
+@lru_cache(maxsize=16)
+def _compile(rates: Tuple[float, ...], line_items: Tuple[NdisLineItem, ...]) -> RuleSet:
+    return RuleSet(rates, line_items)
+
+
+def compile_rules(settings: Any) -> RuleSet:
+    """Compiled rules for a Settings object or settings document (needs `rates` and `ndis_charge_rates`)"""
+    rates = settings_field(settings, "rates")
+    line_items = tuple(
+        NdisLineItem(key, float(item["rate"]), item["line_item_code"], item["description"])
+        for key, item in settings_field(settings, "ndis_charge_rates").items()
+    )
+    return _compile(tuple(rates[key] for key in SHIFT_TYPE_KEYS), line_items)
@@ -0,0 +1,197 @@
+"""Cross-process event fan-out over a capped Mongo collection
+
+Any process or job worker publishes by inserting into the capped `events`
+collection. Each API process runs one EventHub that tails the collection and
+hands every event to the local subscribers (open push connections) whose user
+is in the event's audience, and to the in-process listeners registered for its
+channel (e.g. reloading a cache another process invalidated). Capped collections keep insertion order, so a
+reconnecting client can resume after the last event id it received.
+"""
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+EVENTS_CAPPED_BYTES = 32 * 1024 * 1024
+EVENTS_CAPPED_DOCUMENTS = 50000
+EventListener = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# Ids from different processes only order by second, so resuming rescans a window this wide and skips what was seen
+CLOCK_SKEW_SECONDS = 5
+
+
+def audience(roles: Iterable[str] = (), staff_ids: Iterable[Optional[str]] = ()) -> Dict[str, List[str]]:
+    """Users an event is delivered to: anyone with one of the roles, plus the given staff members"""
+    return {"roles": sorted(set(roles)), "staff_ids": sorted({staff_id for staff_id in staff_ids if staff_id})}
+
+
+def staff_key(user: Dict[str, Any]) -> str:
+    """The id shift requests and notifications use for a user"""
+    return user.get("staff_id", user["id"])
+
+
+def inserted_after(event_id: ObjectId) -> Dict[str, Any]:
+    """Query covering every event inserted after event_id (and a few before it)"""
+    since = event_id.generation_time - timedelta(seconds=CLOCK_SKEW_SECONDS)
+    return {"_id": {"$gte": ObjectId.from_datetime(since)}}
+
+
+def visible_to(event: Dict[str, Any], user: Dict[str, Any]) -> bool:
+    event_audience = event.get("audience")
+    if event_audience is None:
+        return True
+    return user.get("role") in event_audience["roles"] or staff_key(user) in event_audience["staff_ids"]
+
+
+async def publish(db, channel: str, payload: Dict[str, Any], event_audience: Optional[Dict[str, List[str]]] = None):
+    """Publish an event to every API process; event_audience None means every signed-in user"""
+    await db.events.insert_one({
+        "channel": channel,
+        "payload": payload,
+        "audience": event_audience,
+        "created_at": datetime.utcnow(),
+    })
+
+
+class Subscription:
+    """One push connection's queue of events; a consumer too slow to keep up is told to resync"""
+
+    def __init__(self, user: Dict[str, Any], max_pending: int):
+        self.user = user
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def reset_if_overflowed(self) -> bool:
+        """After an overflow, drop the queued events and report that the consumer must resync"""
+        if not self.overflowed:
+            return False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+        return True
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """The next event, or None if none arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """Tails the events collection once per process and fans events out to local subscribers"""
+
+    def __init__(self, db, retry_interval: float = 1.0, max_pending: int = 1000):
+        self.db = db
+        self.retry_interval = retry_interval
+        self.max_pending = max_pending
+        self._subscriptions: List[Subscription] = []
+        self._listeners: Dict[str, List[EventListener]] = {}
+        self._listener_tasks: Set[asyncio.Task] = set()
+        self._tailer: Optional[asyncio.Task] = None
+        self.delivered = 0
+
+    async def start(self):
+        """Make sure the capped collection exists, then start tailing from the newest event"""
+        if self._tailer is None:
+            await self.db.events.ensure_capped(EVENTS_CAPPED_BYTES, EVENTS_CAPPED_DOCUMENTS)
+            self._tailer = asyncio.create_task(self._tail_loop())
+
+    async def stop(self):
+        if self._tailer:
+            self._tailer.cancel()
+            self._tailer = None
+
+    def subscribe(self, user: Dict[str, Any]) -> Subscription:
+        subscription = Subscription(user, self.max_pending)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def listen(self, channel: str, listener: EventListener):
+        """Run listener in this process for every event on channel, including events this process published"""
+        self._listeners.setdefault(channel, []).append(listener)
+
+    async def replay(self, user: Dict[str, Any], last_event_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Events after last_event_id visible to user; None if that event is gone and the client must resync"""
+        try:
+            last_id = ObjectId(last_event_id)
+        except (InvalidId, TypeError):
+            return None
+        events = await self.db.events.find(inserted_after(last_id), sort=[("$natural", 1)])
+        for position, event in enumerate(events):
+            if event["_id"] == last_id:
+                return [later for later in events[position + 1:] if visible_to(later, user)]
+        return None
+
+    def _dispatch(self, event: Dict[str, Any]):
+        for subscription in list(self._subscriptions):
+            if visible_to(event, subscription.user):
+                subscription.offer(event)
+                self.delivered += 1
+        for listener in self._listeners.get(event.get("channel"), ()):
+            # Listeners run as their own tasks so a slow one never holds up the tailer
+            task = asyncio.create_task(self._run_listener(listener, event))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_tasks.discard)
+
+    async def _run_listener(self, listener: EventListener, event: Dict[str, Any]):
+        try:
+            await listener(event)
+        except Exception as e:
+            print(f"❌ Event listener error on {event.get('channel')}: {e}")
+
+    async def _tail_loop(self):
+        seen_order: "deque[ObjectId]" = deque()
+        seen = set()
+        
+        def first_sighting(event_id: ObjectId) -> bool:
+            if event_id in seen:
+                return False
+            seen.add(event_id)
+            seen_order.append(event_id)
+            if len(seen_order) > EVENTS_CAPPED_DOCUMENTS:
+                seen.discard(seen_order.popleft())
+            return True
+        
+        # Events published before this process started are not delivered
+        newest = await self.db.events.find({}, {"_id": 1}, sort=[("$natural", -1)], limit=1)
+        last_id = newest[0]["_id"] if newest else None
+        if last_id:
+            for event in await self.db.events.find(inserted_after(last_id), {"_id": 1}):
+                first_sighting(event["_id"])
+        while True:
+            try:
+                cursor = self.db.events.tail(inserted_after(last_id) if last_id else {})
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        if first_sighting(event["_id"]):
+                            self._dispatch(event)
+                    await asyncio.sleep(self.retry_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Event tailer error: {e}")
+            # A tailable cursor on an empty collection dies straight away; reopen it after a pause
+            await asyncio.sleep(self.retry_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscriptions),
+            "listeners": sorted(self._listeners),
+            "delivered": self.delivered,
+            "tailing": self._tailer is not None,
+        }
@@ -0,0 +1,92 @@
+"""Versioned in-process cache for read-mostly reference data"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+# Looks up the shared version token of each key, e.g. content_versions.current_versions
+SharedVersionLookup = Callable[[Iterable[str]], Awaitable[Dict[str, str]]]
+
+
+class ReferenceDataCache:
+    """Caches loader results per key until the key's version is bumped by a write
+
+    A write in this process bumps the key directly. Writes by other processes
+    are caught through the shared version lookup: a read checks its key's
+    shared token at most once every check_interval seconds, so no process
+    serves a copy older than that.
+    """
+
+    def __init__(self, shared_versions: Optional[SharedVersionLookup] = None, check_interval: float = 2.0):
+        self._versions: Dict[str, int] = {}
+        self._entries: Dict[str, Tuple[int, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._observed: Dict[str, str] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._shared_versions = shared_versions
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.shared_checks = 0
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, *keys: str):
+        """Invalidate cached values after their underlying data changed"""
+        for key in keys:
+            self._versions[key] = self.version(key) + 1
+            self._entries.pop(key, None)
+
+    def observe(self, key: str, token: str):
+        """Invalidate key when its shared version token moved, e.g. after a write by another process"""
+        self._checked_at[key] = time.monotonic()
+        if self._observed.get(key) != token:
+            self._observed[key] = token
+            self.bump(key)
+
+    async def _check_shared(self, key: str):
+        if self._shared_versions is None:
+            return
+        if time.monotonic() - self._checked_at.get(key, float("-inf")) < self.check_interval:
+            return
+        # Claimed before the lookup so concurrent reads don't all check at once
+        self._checked_at[key] = time.monotonic()
+        self.shared_checks += 1
+        tokens = await self._shared_versions([key])
+        self.observe(key, tokens[key])
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, loading it once per version"""
+        await self._check_shared(key)
+        version = self.version(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        # One loader per key at a time so a burst of requests after a bump costs a single query
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            version = self.version(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            value = await loader()
+            # Don't store a value that was superseded by a write while it was loading
+            if self.version(key) == version:
+                self._entries[key] = (version, value)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "shared_checks": self.shared_checks,
+            "versions": dict(self._versions),
+            "cached_keys": sorted(self._entries),
+        }
@@ -0,0 +1,196 @@
+"""Async data access layer for the roster database, built on Motor"""
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCursor
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class Repository:
+    """Awaitable CRUD helpers for a single MongoDB collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def cursor(self, query: Optional[Dict] = None, projection: Optional[Dict] = None,
+               sort: Optional[SortSpec] = None, limit: int = 0, batch_size: int = 0) -> AsyncIOMotorCursor:
+        """Return a raw async cursor for streaming large result sets"""
+        cursor = self.collection.find(query or {}, projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if limit:
+            cursor = cursor.limit(limit)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+
+    async def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None,
+                   sort: Optional[SortSpec] = None, limit: int = 0) -> List[Dict[str, Any]]:
+        """Return all matching documents as a list"""
+        return await self.cursor(query, projection, sort=sort, limit=limit).to_list(length=None)
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one(query or {}, projection)
+
+    async def count_documents(self, query: Optional[Dict] = None) -> int:
+        return await self.collection.count_documents(query or {})
+
+    async def insert_one(self, document: Dict):
+        return await self.collection.insert_one(document)
+
+    async def insert_many(self, documents: List[Dict], ordered: bool = True):
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        return await self.collection.update_one(query, update, upsert=upsert)
+
+    async def update_many(self, query: Dict, update: Dict):
+        return await self.collection.update_many(query, update)
+
+    async def find_one_and_update(self, query: Dict, update: Dict, projection: Optional[Dict] = None,
+                                  sort: Optional[SortSpec] = None, **kwargs) -> Optional[Dict[str, Any]]:
+        """Atomically update one document and return it (before or after, per return_document)"""
+        return await self.collection.find_one_and_update(
+            query, update, projection=projection, sort=list(sort) if sort else None, **kwargs
+        )
+
+    async def find_one_and_delete(self, query: Dict, projection: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """Atomically remove one document and return it, so only one caller ever gets it"""
+        return await self.collection.find_one_and_delete(query, projection=projection)
+
+    async def delete_one(self, query: Dict):
+        return await self.collection.delete_one(query)
+
+    async def delete_many(self, query: Dict):
+        return await self.collection.delete_many(query)
+
+    async def bulk_write(self, requests: List, ordered: bool = True):
+        return await self.collection.bulk_write(requests, ordered=ordered)
+
+    async def aggregate(self, pipeline: List[Dict]) -> List[Dict[str, Any]]:
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return await self.collection.index_information()
+
+    async def create_indexes(self, indexes: List) -> List[str]:
+        return await self.collection.create_indexes(indexes)
+
+    async def explain(self, query: Dict, sort: Optional[SortSpec] = None) -> Dict[str, Any]:
+        """Return the query planner output for a find"""
+        return await self.cursor(query, sort=sort).explain()
+
+    async def ensure_capped(self, size_bytes: int, max_documents: int):
+        """Create the collection as a capped collection, converting an existing uncapped one"""
+        try:
+            await self.collection.database.create_collection(self.name, capped=True, size=size_bytes, max=max_documents)
+        except CollectionInvalid:
+            if not (await self.collection.options()).get("capped"):
+                await self.collection.database.command("convertToCapped", self.name, size=size_bytes)
+
+    def tail(self, query: Optional[Dict] = None) -> AsyncIOMotorCursor:
+        """Tailable cursor over a capped collection that waits for new documents in insertion order"""
+        return self.collection.find(query or {}, cursor_type=CursorType.TAILABLE_AWAIT)
+
+
+def roster_date_keys(date_str: Optional[str]) -> Dict[str, Optional[str]]:
+    """Return the materialised month (YYYY-MM) and ISO week (YYYY-Www) buckets for a roster date"""
+    try:
+        iso_year, iso_week, _ = date.fromisoformat(date_str).isocalendar()
+        week_key = f"{iso_year}-W{iso_week:02d}"
+    except (TypeError, ValueError):
+        week_key = None
+    return {"month": date_str[:7] if date_str else None, "week": week_key}
+
+
+def with_date_keys(document: Dict) -> Dict:
+    """Stamp month/week bucket keys onto a roster document in place"""
+    if "date" in document:
+        document.update(roster_date_keys(document["date"]))
+    return document
+
+
+class RosterRepository(Repository):
+    """Roster access that keeps the month/week bucket keys in step with `date`
+
+    Single-document writes are stamped here; callers building `bulk_write`
+    requests stamp their documents with `with_date_keys` themselves.
+    """
+
+    @staticmethod
+    def _stamp_update(update: Dict) -> Dict:
+        if "$set" in update:
+            with_date_keys(update["$set"])
+        return update
+
+    async def insert_one(self, document: Dict):
+        return await super().insert_one(with_date_keys(document))
+
+    async def insert_many(self, documents: List[Dict], ordered: bool = True):
+        return await super().insert_many([with_date_keys(document) for document in documents], ordered=ordered)
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        return await super().update_one(query, self._stamp_update(update), upsert=upsert)
+
+    async def update_many(self, query: Dict, update: Dict):
+        return await super().update_many(query, self._stamp_update(update))
+
+    async def find_month(self, month: str, projection: Optional[Dict] = None,
+                         sort: Optional[SortSpec] = None) -> List[Dict[str, Any]]:
+        """Return every entry in a YYYY-MM month using the indexed month bucket"""
+        return await self.find({"month": month}, projection, sort=sort)
+
+    async def aggregate_month(self, month: str, stages: List[Dict]) -> List[Dict[str, Any]]:
+        """Run a pipeline over one YYYY-MM month, matched on the indexed month bucket"""
+        return await self.aggregate([{"$match": {"month": month}}, *stages])
+
+    async def delete_month(self, month: str):
+        return await self.delete_many({"month": month})
+
+
+class Database:
+    """Repositories for every collection used by the API"""
+
+    COLLECTIONS = (
+        "roster",
+        "staff",
+        "users",
+        "sessions",
+        "shift_requests",
+        "staff_availability",
+        "clients",
+        "notifications",
+        "calendar_events",
+        "settings",
+        "shift_templates",
+        "day_templates",
+        "roster_templates",
+        "migrations",
+        "public_holidays",
+        "jobs",
+        "settings_versions",
+        "roster_month_summary",
+        "content_versions",
+        "roster_changes",
+        "events",
+        "generation_plans",
+    )
+    REPOSITORY_CLASSES = {
+        "roster": RosterRepository,
+    }
+
+    def __init__(self, database):
+        self.database = database
+        for name in self.COLLECTIONS:
+            repository_class = self.REPOSITORY_CLASSES.get(name, Repository)
+            setattr(self, name, repository_class(database[name]))
+
+
+def connect(mongo_url: str, db_name: str) -> Tuple[AsyncIOMotorClient, Database]:
+    """Create the Motor client and repository container for a database"""
+    client = AsyncIOMotorClient(mongo_url)
+    return client, Database(client[db_name])
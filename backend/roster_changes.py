@@ -0,0 +1,149 @@
+"""Append-only roster change log and the delta reads clients sync from
+
+Every recorded roster write appends one change per affected entry and month,
+numbered by a shared sequence. A client holds a cursor (sequence epoch and
+number) and asks for the changes after it, so a refresh costs O(changes)
+rather than a full month. Bulk writes that don't list their entries append a
+reset marker for each month instead, telling clients to refetch that month.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import ReturnDocument
+
+CHANGE_SEQUENCE = "roster_changes"
+CHANGE_RETENTION_DAYS = 30
+# A sequence number is allocated just before its change is inserted; a gap younger than this may still be filled
+GAP_GRACE_SECONDS = 10
+
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+OP_RESET = "reset"
+
+
+def entry_month(entry: Dict[str, Any]) -> Optional[str]:
+    return entry.get("month") or (entry.get("date") or "")[:7] or None
+
+
+def format_cursor(epoch: str, seq: int) -> str:
+    return f"{epoch}.{seq}"
+
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    epoch, _, seq = cursor.rpartition(".")
+    if not epoch or not seq.isdigit():
+        raise ValueError(f"Invalid change cursor: {cursor}")
+    return epoch, int(seq)
+
+
+def change_records(before: Iterable[Dict[str, Any]], after: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One change per entry and month; an entry moved to another month is a delete from the old one"""
+    previous = {entry["id"]: entry for entry in before if entry.get("id")}
+    records = []
+    for entry in after:
+        if not entry.get("id"):
+            continue
+        old = previous.pop(entry["id"], None)
+        month = entry_month(entry)
+        if old is not None and entry_month(old) != month:
+            records.append({"op": OP_DELETE, "entry_id": old["id"], "month": entry_month(old), "entry": None})
+            old = None
+        document = {field: value for field, value in entry.items() if field != "_id"}
+        records.append({"op": OP_INSERT if old is None else OP_UPDATE, "entry_id": entry["id"], "month": month, "entry": document})
+    for old in previous.values():
+        records.append({"op": OP_DELETE, "entry_id": old["id"], "month": entry_month(old), "entry": None})
+    return records
+
+
+def reset_records(months: Iterable[str]) -> List[Dict[str, Any]]:
+    return [{"op": OP_RESET, "entry_id": None, "month": month, "entry": None} for month in sorted(set(months))]
+
+
+async def append_changes(db, records: List[Dict[str, Any]]) -> int:
+    """Allocate a block of sequence numbers and append the records under them"""
+    if not records:
+        return 0
+    counter = await db.content_versions.find_one_and_update(
+        {"id": CHANGE_SEQUENCE},
+        {"$inc": {"version": len(records)}, "$setOnInsert": {"epoch": uuid.uuid4().hex}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first_seq = counter["version"] - len(records) + 1
+    now = datetime.utcnow()
+    await db.roster_changes.insert_many(
+        [dict(record, seq=first_seq + offset, created_at=now) for offset, record in enumerate(records)],
+        ordered=False
+    )
+    return len(records)
+
+
+async def head_cursor(db) -> str:
+    """Cursor covering every change recorded so far"""
+    counter = await db.content_versions.find_one({"id": CHANGE_SEQUENCE}, {"_id": 0})
+    return format_cursor(counter["epoch"], counter["version"]) if counter else format_cursor("0", 0)
+
+
+def collapse(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Latest state per entry, in the order entries last changed; an entry inserted in the window stays an insert"""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for change in changes:
+        first = latest.pop(change["entry_id"], None)
+        op = change["op"]
+        if first is not None and first["op"] == OP_INSERT and op == OP_UPDATE:
+            op = OP_INSERT
+        latest[change["entry_id"]] = {"op": op, "id": change["entry_id"], "entry": change["entry"]}
+    return list(latest.values())
+
+
+async def changes_since(db, cursor: str, month: Optional[str] = None, limit: int = 1000,
+                        entry_stages: Sequence[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """Entry changes after a cursor, optionally for one month
+
+    Returns reset=True when the cursor can't be continued (the log was reset
+    or trimmed past it); the client then refetches everything it holds.
+    reset_months lists months a bulk write asked clients to refetch.
+    entry_stages are extra aggregation stages over the change documents, whose entry is under `entry`.
+    """
+    epoch, seq = parse_cursor(cursor)
+    counter = await db.content_versions.find_one({"id": CHANGE_SEQUENCE}, {"_id": 0})
+    head_epoch, head_seq = (counter["epoch"], counter["version"]) if counter else ("0", 0)
+    result = {"cursor": format_cursor(head_epoch, head_seq), "reset": True, "reset_months": [], "changes": [], "has_more": False}
+    if epoch != head_epoch or seq > head_seq:
+        return result
+    if seq < head_seq:
+        oldest = await db.roster_changes.find({}, {"_id": 0, "seq": 1}, sort=[("seq", 1)], limit=1)
+        if not oldest or oldest[0]["seq"] > seq + 1:
+            return result
+
+    # Walk the sequence across all months and stop before a gap that is still being written
+    window = await db.roster_changes.find(
+        {"seq": {"$gt": seq}}, {"_id": 0, "seq": 1, "created_at": 1}, sort=[("seq", 1)], limit=limit
+    )
+    settled_before = datetime.utcnow() - timedelta(seconds=GAP_GRACE_SECONDS)
+    end = seq
+    for change in window:
+        if change["seq"] != end + 1 and change["created_at"] > settled_before:
+            break
+        end = change["seq"]
+
+    query: Dict[str, Any] = {"seq": {"$gt": seq, "$lte": end}}
+    if month:
+        query["month"] = month
+    changes = await db.roster_changes.aggregate([
+        {"$match": query},
+        {"$sort": {"seq": 1}},
+        {"$project": {"_id": 0}},
+        *entry_stages,
+    ]) if end > seq else []
+    result.update({
+        "cursor": format_cursor(head_epoch, end),
+        "reset": False,
+        "reset_months": sorted({change["month"] for change in changes if change["op"] == OP_RESET}),
+        "changes": collapse([change for change in changes if change["op"] != OP_RESET]),
+        "has_more": len(window) == limit and end == window[-1]["seq"] and end < head_seq,
+    })
+    return result
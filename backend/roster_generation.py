@@ -0,0 +1,352 @@
+"""Month roster generation engine: one snapshot read, in-memory planning, one bulk write"""
+import hashlib
+import json
+import uuid
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import InsertOne
+
+from roster_writes import record_roster_write
+from overlap_index import RosterIntervalIndex
+from repository import with_date_keys
+
+# Fields the planners need from existing roster entries
+SNAPSHOT_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "date": 1,
+    "start_time": 1,
+    "end_time": 1,
+    "staff_id": 1,
+    "staff_name": 1,
+    "shift_template_id": 1,
+    "name": 1,
+}
+SNAPSHOT_FIELDS = tuple(field for field in SNAPSHOT_PROJECTION if field != "_id")
+
+# Fields of each planned entry shown in a plan diff
+PLAN_ENTRY_FIELDS = (
+    "id",
+    "date",
+    "shift_template_id",
+    "start_time",
+    "end_time",
+    "is_sleepover",
+    "is_public_holiday",
+    "calendar_holiday",
+    "allow_overlap",
+    "hours_worked",
+    "total_pay",
+)
+
+# Builds a priced roster entry document from RosterEntry fields (everything except the id)
+EntryFactory = Callable[..., Dict[str, Any]]
+
+
+def month_fingerprint(entries: List[Dict[str, Any]]) -> str:
+    """Digest of a month's entries as the planners see them, to tell whether a plan's snapshot is still current
+
+    Covers every snapshot field, so an edit to an entry's date, times, staff,
+    template or name (which marks 2:1 shifts) changes it as well as an added
+    or removed entry.
+    """
+    rows = sorted(json.dumps([entry.get(field) for field in SNAPSHOT_FIELDS], default=str) for entry in entries)
+    return hashlib.sha1("\n".join(rows).encode()).hexdigest()
+
+
+# Optional inclusive (first_date, last_date) bounds on the days a planner fills
+DateWindow = Optional[Tuple[str, str]]
+
+
+def month_days(month: str, date_window: DateWindow = None) -> Iterator[Tuple[str, int]]:
+    """Yield (YYYY-MM-DD, day_of_week) for every day of a YYYY-MM month, optionally within a date window"""
+    year, month_num = map(int, month.split("-"))
+    _, days_in_month = monthrange(year, month_num)
+    for day in range(1, days_in_month + 1):
+        day_date = date(year, month_num, day)
+        date_str = day_date.isoformat()
+        if date_window and not date_window[0] <= date_str <= date_window[1]:
+            continue
+        yield date_str, day_date.weekday()
+
+
+def month_range(start_month: str, end_month: str) -> List[str]:
+    """Every YYYY-MM month from start_month to end_month inclusive"""
+    year, month_num = map(int, start_month.split("-"))
+    end_year, end_month_num = map(int, end_month.split("-"))
+    months = []
+    while (year, month_num) <= (end_year, end_month_num):
+        months.append(f"{year:04d}-{month_num:02d}")
+        year, month_num = (year + 1, 1) if month_num == 12 else (year, month_num + 1)
+    return months
+
+
+def horizon_window(today: date, weeks_ahead: int) -> Tuple[str, str]:
+    """Date window from today through the end of the rolling horizon"""
+    return today.isoformat(), (today + timedelta(weeks=weeks_ahead)).isoformat()
+
+
+class MonthSnapshot:
+    """Existing and planned roster entries for a month
+
+    Planned entries are added as they are created so later decisions see
+    them, exactly as the old insert-per-shift loops saw their own inserts.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.fingerprint = month_fingerprint(entries)
+        self._by_slot: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self._template_days = set()
+        self._intervals = RosterIntervalIndex(entries)
+        for entry in entries:
+            self._index_slot(entry)
+
+    def entries_at(self, date_str: str, start_time: str, end_time: str) -> List[Dict[str, Any]]:
+        return list(self._by_slot.get((date_str, start_time, end_time), ()))
+
+    def has_template_entry(self, date_str: str, shift_template_id: str) -> bool:
+        return (date_str, shift_template_id) in self._template_days
+
+    def overlaps(self, date_str: str, start_time: str, end_time: str, shift_name: Optional[str] = None) -> bool:
+        """Same rule as check_shift_overlap: 2:1 shifts may overlap anything, other shifts nothing"""
+        return self._intervals.conflicts(date_str, start_time, end_time, shift_name=shift_name)
+
+    def _index_slot(self, entry: Dict[str, Any]):
+        self._by_slot[(entry["date"], entry["start_time"], entry["end_time"])].append(entry)
+        if entry.get("shift_template_id"):
+            self._template_days.add((entry["date"], entry["shift_template_id"]))
+
+    def add(self, entry: Dict[str, Any]):
+        self._index_slot(entry)
+        self._intervals.add(entry)
+
+
+async def load_month_snapshot(db, month: str) -> MonthSnapshot:
+    return MonthSnapshot(await db.roster.find_month(month, SNAPSHOT_PROJECTION))
+
+
+async def load_month_fingerprint(db, month: str) -> str:
+    return month_fingerprint(await db.roster.find_month(month, SNAPSHOT_PROJECTION))
+
+
+class GenerationPlan:
+    """Entries to insert for a month plus what was skipped or allowed and why"""
+
+    def __init__(self, month: str, snapshot_fingerprint: Optional[str] = None):
+        self.month = month
+        self.snapshot_fingerprint = snapshot_fingerprint
+        self.inserts: List[Dict[str, Any]] = []
+        self.overlaps_detected: List[Dict[str, Any]] = []
+        self.duplicates_prevented: List[Dict[str, Any]] = []
+        self.duplicates_allowed: List[Dict[str, Any]] = []
+
+    def create(self, snapshot: MonthSnapshot, entry: Dict[str, Any]):
+        self.inserts.append(entry)
+        snapshot.add(entry)
+
+    async def commit(self, db) -> int:
+        """Insert every planned entry with a single ordered bulk write and record it for the month summaries and ETags"""
+        if not self.inserts:
+            return 0
+        await db.roster.bulk_write([InsertOne(with_date_keys(entry)) for entry in self.inserts], ordered=True)
+        await record_roster_write(db, after=self.inserts)
+        return len(self.inserts)
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "month": self.month,
+            "snapshot_fingerprint": self.snapshot_fingerprint,
+            "inserts": self.inserts,
+            "overlaps_detected": self.overlaps_detected,
+            "duplicates_prevented": self.duplicates_prevented,
+            "duplicates_allowed": self.duplicates_allowed,
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "GenerationPlan":
+        plan = cls(document["month"], document.get("snapshot_fingerprint"))
+        plan.inserts = document.get("inserts", [])
+        plan.overlaps_detected = document.get("overlaps_detected", [])
+        plan.duplicates_prevented = document.get("duplicates_prevented", [])
+        plan.duplicates_allowed = document.get("duplicates_allowed", [])
+        return plan
+
+    def diff(self) -> Dict[str, Any]:
+        """Complete, untruncated preview of what applying the plan would do"""
+        return {
+            "month": self.month,
+            "entries_to_create": len(self.inserts),
+            "overlaps_detected": len(self.overlaps_detected),
+            "duplicates_prevented": len(self.duplicates_prevented),
+            "duplicates_allowed": len(self.duplicates_allowed),
+            "creates": [{field: entry.get(field) for field in PLAN_ENTRY_FIELDS} for entry in self.inserts],
+            "overlap_details": self.overlaps_detected,
+            "prevention_details": self.duplicates_prevented,
+            "allowance_details": self.duplicates_allowed,
+        }
+
+
+class GenerationPlanStore:
+    """Computed plans kept in the generation_plans collection under a plan id until applied or expired
+
+    Plans live in Mongo rather than process memory, so any API process can
+    apply a plan another one computed. A TTL index on expires_at deletes
+    expired plans; claim also refuses ones the TTL monitor hasn't reached yet.
+    """
+
+    def __init__(self, db, ttl_seconds: float = 900.0):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+
+    async def put(self, plan: GenerationPlan, **metadata) -> Dict[str, Any]:
+        """Store a plan and return its id, expiry and metadata"""
+        plan_id = str(uuid.uuid4())
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        info = dict(metadata, plan_id=plan_id, expires_at=expires_at)
+        await self.db.generation_plans.insert_one({
+            "id": plan_id, "info": info, "plan": plan.to_document(), "expires_at": expires_at
+        })
+        return info
+
+    async def claim(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Mark an unexpired plan as being applied, so concurrent applies can't both commit it"""
+        stored = await self.db.generation_plans.find_one_and_update(
+            {"id": plan_id, "expires_at": {"$gt": datetime.utcnow()}, "claimed_at": None},
+            {"$set": {"claimed_at": datetime.utcnow()}},
+            {"_id": 0}
+        )
+        if not stored:
+            return None
+        return {"plan": GenerationPlan.from_document(stored["plan"]), "info": stored["info"]}
+
+    async def release(self, plan_id: str):
+        """Make a claimed plan available again after an apply that wrote nothing"""
+        await self.db.generation_plans.update_one({"id": plan_id}, {"$set": {"claimed_at": None}})
+
+    async def delete(self, plan_id: str):
+        await self.db.generation_plans.delete_one({"id": plan_id})
+
+
+def _shift_detail(date_str: str, shift: Dict[str, Any], reason: str, name: Optional[str] = None) -> Dict[str, Any]:
+    detail = {"date": date_str, "start_time": shift["start_time"], "end_time": shift["end_time"]}
+    if name is not None:
+        detail["name"] = name
+    detail["reason"] = reason
+    return detail
+
+
+def plan_month_from_shift_templates(month: str, templates: List[Dict[str, Any]], snapshot: MonthSnapshot,
+                                    make_entry: EntryFactory, date_window: DateWindow = None) -> GenerationPlan:
+    """Default generation: one entry per stored shift template per matching weekday, once per template"""
+    plan = GenerationPlan(month, snapshot.fingerprint)
+    for date_str, day_of_week in month_days(month, date_window):
+        for template in templates:
+            if template["day_of_week"] != day_of_week:
+                continue
+            if snapshot.has_template_entry(date_str, template["id"]):
+                continue
+            plan.create(snapshot, make_entry(
+                date=date_str,
+                shift_template_id=template["id"],
+                start_time=template["start_time"],
+                end_time=template["end_time"],
+                is_sleepover=template["is_sleepover"]
+            ))
+    return plan
+
+
+def plan_month_from_template_payload(month: str, templates: List[Dict[str, Any]], force_overlaps: bool,
+                                     snapshot: MonthSnapshot, make_entry: EntryFactory) -> GenerationPlan:
+    """Generation from the Shift Times templates posted by the client"""
+    plan = GenerationPlan(month, snapshot.fingerprint)
+    for date_str, day_of_week in month_days(month):
+        for template in templates:
+            if template.get("day_of_week") != day_of_week:
+                continue
+            template_name = template.get("name", "")
+            allow_overlap = template.get("allow_overlap", False)
+
+            # Check for overlaps (unless forced or explicitly allowed)
+            if not force_overlaps and not allow_overlap:
+                if snapshot.overlaps(date_str, template["start_time"], template["end_time"], shift_name=template_name):
+                    plan.overlaps_detected.append(
+                        _shift_detail(date_str, template, "Overlap detected in shift templates", name=template_name)
+                    )
+                    continue
+
+            # Skip exact duplicates unless forcing overlaps
+            if not force_overlaps and snapshot.entries_at(date_str, template["start_time"], template["end_time"]):
+                continue
+
+            plan.create(snapshot, make_entry(
+                date=date_str,
+                shift_template_id=template.get("id", f"template-{day_of_week}"),
+                start_time=template["start_time"],
+                end_time=template["end_time"],
+                is_sleepover=template.get("is_sleepover", False),
+                manual_shift_type=template.get("manual_shift_type"),
+                manual_hourly_rate=template.get("manual_hourly_rate"),
+                allow_overlap=allow_overlap or force_overlaps
+            ))
+    return plan
+
+
+def plan_month_from_roster_template(month: str, template_id: str, template, force_overlaps: bool,
+                                    snapshot: MonthSnapshot, make_entry: EntryFactory,
+                                    date_window: DateWindow = None) -> GenerationPlan:
+    """Generation from a saved RosterTemplate with its duplicate and 2:1 rules"""
+    plan = GenerationPlan(month, snapshot.fingerprint)
+    for date_str, day_of_week in month_days(month, date_window):
+        day_shifts = template.template_data.get(str(day_of_week), [])
+        if not day_shifts:
+            day_shifts = template.template_data.get(day_of_week, [])  # Try integer key
+
+        for shift_data in day_shifts:
+            shift_name = shift_data.get("name", template.name)
+            existing_entries = snapshot.entries_at(date_str, shift_data["start_time"], shift_data["end_time"])
+
+            # Apply duplicate prevention rules based on template configuration (unless forcing overlaps)
+            if existing_entries and not force_overlaps:
+                unassigned_exists = any(
+                    not entry.get("staff_id") and not entry.get("staff_name") for entry in existing_entries
+                )
+                if unassigned_exists and template.prevent_duplicate_unassigned:
+                    plan.duplicates_prevented.append(
+                        _shift_detail(date_str, shift_data, "Duplicate prevented: Unassigned shift already exists")
+                    )
+                    continue
+                # Non-2:1 templates with the different-staff rule allow one staff member per slot
+                if template.allow_different_staff_only and not template.enable_2_1_shift:
+                    if any(entry.get("staff_id") for entry in existing_entries):
+                        plan.duplicates_prevented.append(
+                            _shift_detail(date_str, shift_data, "Single staff per shift (non-2:1 template)")
+                        )
+                        continue
+
+            # Check for overlaps if not overridden and not forcing overlaps
+            if not template.allow_overlap_override and not force_overlaps:
+                overlap = snapshot.overlaps(date_str, shift_data["start_time"], shift_data["end_time"], shift_name=shift_name)
+                if overlap and not template.enable_2_1_shift:
+                    plan.overlaps_detected.append(
+                        _shift_detail(date_str, shift_data, "Overlap detected and not overridden", name=shift_name)
+                    )
+                    continue
+
+            plan.create(snapshot, make_entry(
+                date=date_str,
+                shift_template_id=f"template-{template_id}-{day_of_week}",
+                start_time=shift_data["start_time"],
+                end_time=shift_data["end_time"],
+                is_sleepover=shift_data.get("is_sleepover", False),
+                allow_overlap=template.enable_2_1_shift or template.allow_overlap_override or force_overlaps
+            ))
+
+            # Track allowed duplicates for reporting
+            if existing_entries:
+                plan.duplicates_allowed.append(
+                    _shift_detail(date_str, shift_data, "2:1 shift, different staff allowed, or forced overlaps")
+                )
+    return plan
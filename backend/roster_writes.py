@@ -0,0 +1,42 @@
+"""Bookkeeping shared by every roster write: month summaries, the change log, roster ETag versions and push events"""
+from typing import Any, Dict, Iterable, Set
+
+from content_versions import bump_versions, roster_month_key
+from month_summary import apply_summary_change
+from pubsub import publish
+from roster_changes import append_changes, change_records, reset_records
+
+
+def touched_months(*entry_groups: Iterable[Dict[str, Any]]) -> Set[str]:
+    months = set()
+    for entries in entry_groups:
+        for entry in entries:
+            month = entry.get("month") or (entry.get("date") or "")[:7]
+            if month:
+                months.add(month)
+    return months
+
+
+async def record_roster_write(db, before: Iterable[Dict[str, Any]] = (), after: Iterable[Dict[str, Any]] = ()):
+    """Follow up a roster write with the roster documents as they were before and after it"""
+    before, after = list(before), list(after)
+    await apply_summary_change(db, before, after)
+    await append_changes(db, change_records(before, after))
+    months = touched_months(before, after)
+    await bump_versions(db, [roster_month_key(month) for month in months])
+    if months:
+        # Subscribers pull the entries themselves from the change log, where pay is masked for their role
+        await publish(db, "roster", {
+            "months": sorted(months),
+            "unassigned": any(not entry.get("staff_id") for entry in before + after),
+        })
+
+
+async def invalidate_roster_months(db, months: Iterable[str]):
+    """For bulk writes that don't list their documents: clients refetch each month instead of applying changes"""
+    months = set(months)
+    if not months:
+        return
+    await append_changes(db, reset_records(months))
+    await bump_versions(db, [roster_month_key(month) for month in months])
+    await publish(db, "roster", {"months": sorted(months), "unassigned": True})
@@ -1,12 +1,13 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Header, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import JSONResponse, Response
-from pymongo import MongoClient
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, time, timedelta
 import os
+import json
 import uuid
 import hashlib
 import secrets
@@ -40,6 +41,59 @@ import csv
 import io
 from fastapi.responses import StreamingResponse
 
+# Data access layer
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from repository import connect
+from indexes import reconcile_indexes, audit_query_plans
+from migrations import backfill_roster_date_keys
+from reference_cache import ReferenceDataCache
+from auth_cache import SessionCache
+from overlap_index import DayIntervalIndex, entry_shift_name, is_2_1_shift
+from pay_batch import (
+    build_pay_columns,
+    calculate_pay_batch,
+    merge_verifications,
+    pay_result_rows,
+    regression_corpus,
+    verify_against_scalar,
+)
+from holiday_calendar import AU_STATES, HolidayCalendar
+from payrules import (
+    DEFAULT_NDIS_CHARGE_RATES,
+    DEFAULT_RATES,
+    PAY_RESULT_FIELDS,
+    SHIFT_TYPE_KEYS,
+    PayMemo,
+    compile_rules,
+    determine_shift_type as payrules_shift_type,
+    evaluate as evaluate_pay,
+    hours_worked,
+    shift_minutes,
+    time_to_minutes,
+)
+from roster_generation import (
+    GenerationPlanStore,
+    horizon_window,
+    load_month_fingerprint,
+    load_month_snapshot,
+    month_range,
+    plan_month_from_roster_template,
+    plan_month_from_shift_templates,
+    plan_month_from_template_payload,
+)
+from jobs import JobContext, JobRunner
+from pay_privacy import pay_mask_stages, pay_viewer
+from pubsub import EventHub, audience, publish
+from cost_forecast import expand_horizon, forecast_totals
+from content_versions import bump_versions, current_versions, etag_matches, make_etag, roster_month_key
+from month_summary import SUMMARY_FIELDS, rebuild_month, verify_month
+from roster_changes import changes_since, head_cursor
+from roster_writes import invalidate_roster_months, record_roster_write
+from settings_versions import BEGINNING_OF_TIME, SettingsTimeline, changed_pay_fields, recompute_query
+from timesheets import load_timesheets, pay_periods
+from wire_format import list_response, parse_fields, parse_format, projection
+
 # Email notification imports
 import aiosmtplib
 from email.mime.text import MIMEText
@@ -50,8 +104,13 @@ from jinja2 import Template
 MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.environ.get("DB_NAME", "shift_roster_db")
 
-client = MongoClient(MONGO_URL)
-db = client[DB_NAME]
+client, db = connect(MONGO_URL, DB_NAME)
+
+# Background jobs are claimed from the jobs collection by every API process
+job_runner = JobRunner(db)
+
+# Push events published by any process are tailed from the events collection and streamed to this process's clients
+event_hub = EventHub(db)
 
 app = FastAPI(title="Shift Roster & Pay Calculator")
 
@@ -62,6 +121,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Roster-Cursor"],
 )
 
 # Email Configuration
@@ -88,6 +148,9 @@ class ShiftType(str, Enum):
     PUBLIC_HOLIDAY = "public_holiday"
     SLEEPOVER = "sleepover"
 
+# ShiftType members in payrules' shift type code order
+SHIFT_TYPES_BY_CODE = tuple(ShiftType(key) for key in SHIFT_TYPE_KEYS)
+
 class UserRole(str, Enum):
     ADMIN = "admin"
     SUPERVISOR = "supervisor"
@@ -194,7 +257,8 @@ class RosterEntry(BaseModel):
     start_time: str
     end_time: str
     is_sleepover: bool = False
-    is_public_holiday: bool = False
+    is_public_holiday: bool = False  # Manual flag; only ever set by a user
+    calendar_holiday: bool = False  # Set by pay calculation when the holiday calendar covers the date
     manual_shift_type: Optional[str] = None  # Manual override for shift type
     manual_hourly_rate: Optional[float] = None  # Manual override for hourly rate
     manual_sleepover: Optional[bool] = None  # Manual override for sleepover status
@@ -204,6 +268,7 @@ class RosterEntry(BaseModel):
     sleepover_allowance: float = 0.0
     total_pay: float = 0.0
     allow_overlap: Optional[bool] = False  # Allow this shift to overlap with others (for 2:1 shifts)
+    is_frozen: bool = False  # Pay locked (e.g. after payroll); settings changes don't recompute it
     
     # NDIS Charge Rate Fields (Client Billing)
     ndis_hourly_charge: float = 0.0  # NDIS hourly charge rate
@@ -213,67 +278,17 @@ class RosterEntry(BaseModel):
     ndis_description: Optional[str] = None     # NDIS service description
 
 class Settings(BaseModel):
-    rates: Dict[str, float] = {
-        "weekday_day": 42.00,
-        "weekday_evening": 44.50,
-        "weekday_night": 52.00,
-        "saturday": 57.50,
-        "sunday": 74.00,
-        "public_holiday": 88.50,
-        "sleepover_default": 175.00,
-        "sleepover_schads": 286.56
-    }
+    rates: Dict[str, float] = DEFAULT_RATES
     
     # NDIS Invoice Charge Rates (Client Billing)
-    ndis_charge_rates: Dict[str, Dict] = {
-        "weekday_day": {
-            "rate": 70.23,
-            "line_item_code": "01_801_0115_1_1",
-            "description": "Assistance in Supported Independent Living - Standard - Weekday Daytime",
-            "time_range": "6am-8pm (Starts at/after 6:00am, ends at/before 8:00pm)"
-        },
-        "weekday_evening": {
-            "rate": 77.38,
-            "line_item_code": "01_802_0115_1_1", 
-            "description": "Assistance in Supported Independent Living - Standard - Weekday Evening",
-            "time_range": "After 8pm (Starts after 8:00pm OR extends past 8:00pm)"
-        },
-        "weekday_night": {
-            "rate": 78.81,
-            "line_item_code": "01_803_0115_1_1",
-            "description": "Assistance in Supported Independent Living - Standard - Weekday Night", 
-            "time_range": "Overnight (Commences at/before midnight and finishes after midnight)"
-        },
-        "saturday": {
-            "rate": 98.83,
-            "line_item_code": "01_804_0115_1_1",
-            "description": "Assistance in Supported Independent Living - Standard - Saturday",
-            "time_range": "All hours on Saturday"
-        },
-        "sunday": {
-            "rate": 122.59,
-            "line_item_code": "01_805_0115_1_1", 
-            "description": "Assistance in Supported Independent Living - Standard - Sunday",
-            "time_range": "All hours on Sunday"
-        },
-        "public_holiday": {
-            "rate": 150.10,
-            "line_item_code": "01_806_0115_1_1",
-            "description": "Assistance in Supported Independent Living - Standard - Public Holiday",
-            "time_range": "All hours on public holidays"
-        },
-        "sleepover_default": {
-            "rate": 286.56,
-            "line_item_code": "01_832_0115_1_1",
-            "description": "Assistance in Supported Independent Living - Night-Time Sleepover",
-            "time_range": "8-hour sleepover period (includes up to 2 hours active support)",
-            "unit": "per_shift"
-        }
-    }
+    ndis_charge_rates: Dict[str, Dict] = DEFAULT_NDIS_CHARGE_RATES
     
     first_day_of_week: str = "monday"  # "monday" or "sunday"
     pay_mode: str = "default"  # "default" or "schads"
     time_format: str = "24hr"  # "12hr" or "24hr"
+    holiday_state: Optional[str] = None  # AU state/territory whose public holidays apply; None applies only admin-added holidays
+    rolling_horizon_weeks: int = 0  # Nightly generation keeps this many weeks rostered ahead (0 = off)
+    rolling_horizon_template_id: Optional[str] = None  # Roster template for the horizon; stored shift templates if unset
 
 class RosterTemplate(BaseModel):
     id: str
@@ -287,6 +302,14 @@ class RosterTemplate(BaseModel):
     prevent_duplicate_unassigned: Optional[bool] = True  # Prevent duplicate entries if unassigned
     allow_different_staff_only: Optional[bool] = True  # Allow duplicates only if different staff assigned
 
+class RangeGenerationRequest(BaseModel):
+    source: str = "shift_templates"  # "shift_templates" or "roster_template"
+    template_id: Optional[str] = None  # Required for roster_template
+    start_month: Optional[str] = None  # YYYY-MM
+    end_month: Optional[str] = None  # YYYY-MM, defaults to start_month
+    weeks_ahead: Optional[int] = None  # Rolling horizon from today instead of a month range
+    force_overlaps: bool = False  # roster_template only; shift template generation never skips overlapping shifts
+
 class DayTemplate(BaseModel):
     id: str
     name: str
@@ -296,6 +319,13 @@ class DayTemplate(BaseModel):
     created_at: datetime = None
     is_active: bool = True
 
+class PublicHoliday(BaseModel):
+    id: Optional[str] = None
+    date: str  # YYYY-MM-DD
+    name: str
+    state: Optional[str] = None  # None applies to every state
+    created_at: datetime = None
+
 class CalendarEvent(BaseModel):
     id: str
     title: str
@@ -464,9 +494,9 @@ def generate_token() -> str:
     """Generate a secure random token"""
     return secrets.token_urlsafe(32)
 
-def create_admin_user():
+async def create_admin_user():
     """Create the default admin user if it doesn't exist"""
-    admin_user = db.users.find_one({"username": "Admin"})
+    admin_user = await db.users.find_one({"username": "Admin"})
     if not admin_user:
         admin_data = {
             "id": str(uuid.uuid4()),
@@ -479,7 +509,7 @@ def create_admin_user():
             "is_active": True,
             "created_at": datetime.utcnow()
         }
-        db.users.insert_one(admin_data)
+        await db.users.insert_one(admin_data)
         print("✅ Admin user created with default PIN: 0000")
 
 def send_reset_email(email: str, temp_pin: str):
@@ -524,6 +554,28 @@ async def send_email_notification(to_email: str, subject: str, html_content: str
         print(f"❌ Email sending failed: {str(e)}")
         return False
 
+EMAIL_JOB = "send_email"
+
+async def run_email_job(ctx: JobContext):
+    """Send one queued email; a failed send raises so the job is retried with backoff"""
+    params = ctx.params
+    if not await send_email_notification(
+        params["to_email"], params["subject"], params["html_content"], params.get("text_content")
+    ):
+        raise RuntimeError(f"Email to {params['to_email']} was not sent")
+    return {"sent_to": params["to_email"]}
+
+job_runner.register(EMAIL_JOB, run_email_job, concurrency=4, max_attempts=5, backoff_seconds=30)
+
+async def queue_email_notification(to_email: str, subject: str, html_content: str, text_content: str = None):
+    """Queue an email as a background job so it survives restarts and is retried on failure"""
+    return await job_runner.submit(EMAIL_JOB, {
+        "to_email": to_email,
+        "subject": subject,
+        "html_content": html_content,
+        "text_content": text_content
+    })
+
 def get_shift_request_approval_email(staff_name: str, shift_date: str, shift_time: str, admin_notes: str = None):
     """Generate HTML email for shift request approval"""
     html_template = """
@@ -728,9 +780,6 @@ Workforce Management System
     
     return html_content, text_content
 
-# Initialize admin user on startup
-create_admin_user()
-
 # OCR Configuration and Processing
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -1195,67 +1244,10 @@ async def process_image_async(file_path: Path, task_id: str) -> Dict[str, Any]:
         'extracted_at': datetime.now().isoformat()
     }
 
-# Pay calculation functions
+# Pay calculation functions (the rules themselves live in payrules)
 def determine_shift_type_with_context(date_str: str, start_time: str, end_time: str, is_public_holiday: bool, is_post_midnight_segment: bool = False) -> ShiftType:
     """Determine the shift type with context for cross-midnight calculations"""
-    
-    if is_public_holiday:
-        return ShiftType.PUBLIC_HOLIDAY
-    
-    # Parse date and get day of week
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-    day_of_week = date_obj.weekday()  # 0=Monday, 1=Tuesday, ..., 6=Sunday
-    
-    # Weekend rates override time-based logic
-    if day_of_week == 5:  # Saturday
-        return ShiftType.SATURDAY
-    elif day_of_week == 6:  # Sunday
-        return ShiftType.SUNDAY
-    
-    # For weekdays (Monday-Friday), check time ranges
-    start_hour = int(start_time.split(":")[0])
-    start_min = int(start_time.split(":")[1])
-    end_hour = int(end_time.split(":")[0])
-    end_min = int(end_time.split(":")[1])
-    
-    start_minutes = start_hour * 60 + start_min
-    end_minutes = end_hour * 60 + end_min
-    
-    # Handle overnight shifts
-    if end_minutes <= start_minutes:
-        end_minutes += 24 * 60
-    
-    # Special handling for post-midnight segments of cross-midnight shifts
-    if is_post_midnight_segment:
-        # For post-midnight segments (00:01-XX:XX), classify based on the end time
-        # Since this segment starts at midnight, we determine the rate based on 
-        # what type of shift it would be considered ending at that time
-        
-        # If the segment ends at 6am or later, it's entering day shift territory
-        if end_hour >= 6:
-            return ShiftType.WEEKDAY_DAY
-        # If ending before 6am, it's still night shift
-        else:
-            return ShiftType.WEEKDAY_NIGHT
-    
-    # Special handling for shifts starting exactly at midnight (00:00)
-    if start_hour == 0 and start_min == 0:
-        # Shifts starting at midnight should be classified based on end time
-        if end_hour >= 6:
-            return ShiftType.WEEKDAY_DAY
-        else:
-            return ShiftType.WEEKDAY_NIGHT
-    
-    # Original logic for regular shifts and first segments of cross-midnight shifts
-    # Night: starts before 6am OR ends after midnight
-    if start_hour < 6 or end_minutes > 24 * 60:
-        return ShiftType.WEEKDAY_NIGHT
-    # Evening: starts at 8pm or later OR extends past 8pm (SCHADS: shifts ending AT 8pm are still Day shifts)
-    elif start_hour >= 20 or end_minutes > 20 * 60:
-        return ShiftType.WEEKDAY_EVENING
-    # Day: everything else (6am-8pm range)
-    else:
-        return ShiftType.WEEKDAY_DAY
+    return ShiftType(payrules_shift_type(date_str, start_time, end_time, is_public_holiday, is_post_midnight_segment))
 
 def determine_shift_type(date_str: str, start_time: str, end_time: str, is_public_holiday: bool) -> ShiftType:
     """Determine the shift type based on date and time - SIMPLIFIED LOGIC"""
@@ -1263,20 +1255,9 @@ def determine_shift_type(date_str: str, start_time: str, end_time: str, is_publi
 
 def calculate_hours_worked(start_time: str, end_time: str) -> float:
     """Calculate hours worked between start and end time"""
-    start_hour, start_min = map(int, start_time.split(":"))
-    end_hour, end_min = map(int, end_time.split(":"))
-    
-    start_minutes = start_hour * 60 + start_min
-    end_minutes = end_hour * 60 + end_min
-    
-    # Handle overnight shifts
-    if end_minutes <= start_minutes:
-        end_minutes += 24 * 60
-    
-    total_minutes = end_minutes - start_minutes
-    return total_minutes / 60.0
+    return hours_worked(start_time, end_time)
 
-def check_shift_overlap(date_str: str, start_time: str, end_time: str, exclude_id: Optional[str] = None, shift_name: Optional[str] = None) -> bool:
+async def check_shift_overlap(date_str: str, start_time: str, end_time: str, exclude_id: Optional[str] = None, shift_name: Optional[str] = None) -> bool:
     """Check if a shift overlaps with existing shifts on the same date
     
     Args:
@@ -1289,376 +1270,50 @@ def check_shift_overlap(date_str: str, start_time: str, end_time: str, exclude_i
     Returns:
         True if overlap detected and should be prevented, False if overlap is allowed
     """
-    existing_shifts = list(db.roster.find({"date": date_str}))
-    
-    if exclude_id:
-        existing_shifts = [s for s in existing_shifts if s.get("id") != exclude_id]
-    
-    if not existing_shifts:
+    # 2:1 shifts may overlap anything, so there's nothing to look up
+    if is_2_1_shift(shift_name):
         return False
     
-    # Convert times to minutes for comparison
-    def time_to_minutes(time_str: str) -> int:
-        hours, minutes = map(int, time_str.split(':'))
-        return hours * 60 + minutes
-    
-    new_start = time_to_minutes(start_time)
-    new_end = time_to_minutes(end_time)
-    
-    # Handle overnight shift
-    if new_end <= new_start:
-        new_end += 24 * 60
-    
-    for shift in existing_shifts:
-        existing_start = time_to_minutes(shift["start_time"])
-        existing_end = time_to_minutes(shift["end_time"])
-        
-        # Handle overnight shift
-        if existing_end <= existing_start:
-            existing_end += 24 * 60
-        
-        # Check for overlap
-        if (new_start < existing_end and new_end > existing_start):
-            # Check if either shift has "2:1" in the name - if so, allow overlap
-            existing_shift_name = ""
-            
-            # Try to get shift name from template or roster entry
-            if shift.get("shift_template_id"):
-                template = db.shift_templates.find_one({"id": shift["shift_template_id"]})
-                if template:
-                    existing_shift_name = template.get("name", "")
-            
-            # Also check if the shift itself has a name field
-            if not existing_shift_name and shift.get("name"):
-                existing_shift_name = shift.get("name", "")
-            
-            # Check both current shift name and existing shift name for "2:1"
-            current_has_2to1 = shift_name and "2:1" in shift_name.lower()
-            existing_has_2to1 = "2:1" in existing_shift_name.lower()
-            
-            # Only allow overlap if BOTH shifts have "2:1" in their names
-            # OR if the current shift being added/updated has "2:1" in its name
-            if current_has_2to1:
-                print(f"Allowing overlap for 2:1 shift - Current: {shift_name}, Existing: {existing_shift_name}")
-                continue  # Allow this overlap because current shift is 2:1
-            else:
-                return True  # Prevent overlap - regular shifts cannot overlap with anything
-    
-    return False
-
-def calculate_ndis_charges(roster_entry: RosterEntry, settings: Settings, shift_type: str) -> RosterEntry:
-    """Calculate NDIS charges for client billing"""
-    # Determine if this is a sleepover shift
-    is_sleepover = roster_entry.manual_sleepover if roster_entry.manual_sleepover is not None else roster_entry.is_sleepover
-    
-    if is_sleepover:
-        # Sleepover charges are per-shift basis
-        sleepover_charge = settings.ndis_charge_rates["sleepover_default"]
-        roster_entry.ndis_hourly_charge = 0.0  # Not applicable for sleepovers
-        roster_entry.ndis_shift_charge = sleepover_charge["rate"]
-        roster_entry.ndis_total_charge = sleepover_charge["rate"]
-        roster_entry.ndis_line_item_code = sleepover_charge["line_item_code"]
-        roster_entry.ndis_description = sleepover_charge["description"]
-        
-        # Add any additional wake hours beyond 2 hours at hourly rate
-        wake_hours = roster_entry.wake_hours if roster_entry.wake_hours else 0
-        extra_wake_hours = max(0, wake_hours - 2) if wake_hours > 2 else 0
-        
-        if extra_wake_hours > 0:
-            # For extra wake hours beyond 2, use the appropriate hourly NDIS rate
-            # based on the actual shift timing (not sleepover rate)
-            # Determine the proper shift type for NDIS hourly billing
-            if shift_type == "sleepover_default":
-                # For sleepover extra wake hours, always use weekday_day rate
-                # as per review request: 1 hour × $70.23 (weekday_day NDIS rate)
-                # This is because the sleepover base rate already includes night premium
-                from datetime import datetime
-                try:
-                    shift_date = datetime.strptime(roster_entry.date, "%Y-%m-%d")
-                    day_of_week = shift_date.weekday()  # 0=Monday, 6=Sunday
-                    
-                    if roster_entry.is_public_holiday:
-                        ndis_shift_type_key = "public_holiday"
-                    elif day_of_week == 5:  # Saturday
-                        ndis_shift_type_key = "saturday"
-                    elif day_of_week == 6:  # Sunday
-                        ndis_shift_type_key = "sunday"
-                    else:
-                        # For weekday sleepovers, always use weekday_day rate for extra wake hours
-                        # This matches the expected calculation in the review request
-                        ndis_shift_type_key = "weekday_day"
-                        
-                except Exception as e:
-                    # Default to weekday_day for sleepover extra wake hours
-                    # This ensures we use the correct rate as specified in review request
-                    ndis_shift_type_key = "weekday_day"
-            else:
-                ndis_shift_type_key = shift_type.lower().replace('_', '_')
-            
-            if ndis_shift_type_key in settings.ndis_charge_rates:
-                hourly_ndis_rate = settings.ndis_charge_rates[ndis_shift_type_key]["rate"]
-                roster_entry.ndis_total_charge += extra_wake_hours * hourly_ndis_rate
-    else:
-        # Regular shift - hourly charges
-        # Map shift_type to NDIS charge rate key
-        shift_type_key = shift_type.lower().replace('_', '_')
-        
-        if shift_type_key in settings.ndis_charge_rates:
-            ndis_rate_info = settings.ndis_charge_rates[shift_type_key]
-            roster_entry.ndis_hourly_charge = ndis_rate_info["rate"]
-            roster_entry.ndis_shift_charge = 0.0  # Not applicable for regular shifts
-            roster_entry.ndis_total_charge = roster_entry.hours_worked * ndis_rate_info["rate"]
-            roster_entry.ndis_line_item_code = ndis_rate_info["line_item_code"]
-            roster_entry.ndis_description = ndis_rate_info["description"]
-        else:
-            # Default to weekday_day if shift type not found
-            default_rate = settings.ndis_charge_rates["weekday_day"]
-            roster_entry.ndis_hourly_charge = default_rate["rate"]
-            roster_entry.ndis_shift_charge = 0.0
-            roster_entry.ndis_total_charge = roster_entry.hours_worked * default_rate["rate"]
-            roster_entry.ndis_line_item_code = default_rate["line_item_code"]
-            roster_entry.ndis_description = default_rate["description"]
-    
-    return roster_entry
-
-def calculate_cross_midnight_pay(roster_entry: RosterEntry, settings: Settings) -> RosterEntry:
-    """Calculate pay for shifts that cross midnight, splitting by actual days"""
-    from datetime import datetime, timedelta
-    
-    # Parse the shift date and times
-    shift_date = datetime.strptime(roster_entry.date, "%Y-%m-%d")
-    start_hour, start_min = map(int, roster_entry.start_time.split(":"))
-    end_hour, end_min = map(int, roster_entry.end_time.split(":"))
-    
-    start_minutes = start_hour * 60 + start_min
-    end_minutes = end_hour * 60 + end_min
-    
-    # Check if shift crosses midnight
-    crosses_midnight = end_minutes <= start_minutes
-    
-    if not crosses_midnight:
-        # Regular shift - use existing logic
-        return calculate_pay_regular(roster_entry, settings)
-    
-    # Shift crosses midnight - split into segments
-    is_sleepover = roster_entry.manual_sleepover if roster_entry.manual_sleepover is not None else roster_entry.is_sleepover
-    
-    if is_sleepover:
-        # Sleepover shifts don't need splitting - use existing logic
-        return calculate_pay_regular(roster_entry, settings)
-    
-    # Split the shift at midnight
-    # Segment 1: start_time to 23:59 on the first day
-    first_day_end_minutes = 24 * 60  # midnight
-    first_day_duration_minutes = first_day_end_minutes - start_minutes
-    first_day_hours = first_day_duration_minutes / 60.0
-    
-    # Segment 2: 00:00 to end_time on the second day
-    second_day_start_minutes = 0  # midnight
-    second_day_duration_minutes = end_minutes
-    second_day_hours = second_day_duration_minutes / 60.0
-    
-    # Get the second day date
-    second_day_date = shift_date + timedelta(days=1)
-    second_day_date_str = second_day_date.strftime("%Y-%m-%d")
-    
-    # Calculate pay for first day segment
-    first_day_shift_type = determine_shift_type(
-        roster_entry.date, 
-        roster_entry.start_time, 
-        "23:59",
-        roster_entry.is_public_holiday
-    )
-    first_day_rate = get_hourly_rate_for_shift_type(first_day_shift_type, settings)
-    first_day_pay = first_day_hours * first_day_rate
-    
-    # Calculate pay for second day segment
-    # Check if second day is a public holiday
-    second_day_is_holiday = is_public_holiday_date(second_day_date_str, settings)
-    
-    second_day_shift_type = determine_shift_type_with_context(
-        second_day_date_str,
-        "00:01",  # Just after midnight
-        roster_entry.end_time,
-        second_day_is_holiday,
-        is_post_midnight_segment=True  # This is the post-midnight segment
-    )
-    second_day_rate = get_hourly_rate_for_shift_type(second_day_shift_type, settings)
-    second_day_pay = second_day_hours * second_day_rate
-    
-    # Set the calculated values
-    roster_entry.hours_worked = first_day_hours + second_day_hours
-    roster_entry.base_pay = first_day_pay + second_day_pay
-    roster_entry.sleepover_allowance = 0
-    roster_entry.total_pay = roster_entry.base_pay
-    
-    # Calculate NDIS charges - use the primary (first day) shift type
-    if roster_entry.manual_shift_type:
-        ndis_shift_type = roster_entry.manual_shift_type
-    else:
-        # Use first day shift type for NDIS (primary segment)
-        if first_day_shift_type == ShiftType.PUBLIC_HOLIDAY:
-            ndis_shift_type = "public_holiday"
-        elif first_day_shift_type == ShiftType.SATURDAY:
-            ndis_shift_type = "saturday"
-        elif first_day_shift_type == ShiftType.SUNDAY:
-            ndis_shift_type = "sunday"
-        elif first_day_shift_type == ShiftType.WEEKDAY_EVENING:
-            ndis_shift_type = "weekday_evening"
-        elif first_day_shift_type == ShiftType.WEEKDAY_NIGHT:
-            ndis_shift_type = "weekday_night"
-        else:
-            ndis_shift_type = "weekday_day"
-    
-    # Calculate NDIS charges
-    roster_entry = calculate_ndis_charges(roster_entry, settings, ndis_shift_type)
-    
-    return roster_entry
-
-def get_hourly_rate_for_shift_type(shift_type: ShiftType, settings: Settings) -> float:
-    """Get hourly rate for a given shift type"""
-    if shift_type == ShiftType.PUBLIC_HOLIDAY:
-        return settings.rates["public_holiday"]
-    elif shift_type == ShiftType.SATURDAY:
-        return settings.rates["saturday"]
-    elif shift_type == ShiftType.SUNDAY:
-        return settings.rates["sunday"]
-    elif shift_type == ShiftType.WEEKDAY_EVENING:
-        return settings.rates["weekday_evening"]
-    elif shift_type == ShiftType.WEEKDAY_NIGHT:
-        return settings.rates["weekday_night"]
-    else:
-        return settings.rates["weekday_day"]
+    existing_shifts = await db.roster.find({"date": date_str}, {"_id": 0, "id": 1, "start_time": 1, "end_time": 1})
+    return DayIntervalIndex(existing_shifts).conflicts(start_time, end_time, shift_name=shift_name, exclude_id=exclude_id)
 
 def is_public_holiday_date(date_str: str, settings: Settings) -> bool:
     """Check if a specific date is a public holiday"""
-    # This is a simplified check - you may want to implement proper holiday checking
-    # For now, returning False, but you can enhance this with actual holiday data
-    return False
+    return holiday_calendar.is_holiday(date_str, settings.holiday_state)
 
-def calculate_pay_regular(roster_entry: RosterEntry, settings: Settings) -> RosterEntry:
-    """Original calculate_pay logic for non-cross-midnight shifts"""
-    hours = calculate_hours_worked(roster_entry.start_time, roster_entry.end_time)
-    roster_entry.hours_worked = hours
-    
-    # Determine if this is a sleepover shift
-    is_sleepover = roster_entry.manual_sleepover if roster_entry.manual_sleepover is not None else roster_entry.is_sleepover
-    
-    if is_sleepover:
-        # Sleepover calculation: $175 flat rate includes 2 hours
-        roster_entry.sleepover_allowance = 175.00  # Fixed $175 per night
-        
-        # Additional wake hours beyond 2 hours at applicable hourly rate
-        wake_hours = roster_entry.wake_hours if roster_entry.wake_hours else 0
-        extra_wake_hours = max(0, wake_hours - 2) if wake_hours > 2 else 0
-        
-        if extra_wake_hours > 0:
-            # Get applicable hourly rate for extra wake time
-            if roster_entry.manual_hourly_rate:
-                hourly_rate = roster_entry.manual_hourly_rate
-            else:
-                # Determine rate based on shift type or manual override
-                if roster_entry.manual_shift_type:
-                    shift_type_map = {
-                        "weekday_day": ShiftType.WEEKDAY_DAY,
-                        "weekday_evening": ShiftType.WEEKDAY_EVENING,
-                        "weekday_night": ShiftType.WEEKDAY_NIGHT,
-                        "saturday": ShiftType.SATURDAY,
-                        "sunday": ShiftType.SUNDAY,
-                        "public_holiday": ShiftType.PUBLIC_HOLIDAY
-                    }
-                    shift_type = shift_type_map.get(roster_entry.manual_shift_type, ShiftType.WEEKDAY_DAY)
-                else:
-                    shift_type = determine_shift_type(
-                        roster_entry.date, 
-                        roster_entry.start_time, 
-                        roster_entry.end_time,
-                        roster_entry.is_public_holiday
-                    )
-                
-                hourly_rate = get_hourly_rate_for_shift_type(shift_type, settings)
-            
-            roster_entry.base_pay = extra_wake_hours * hourly_rate
-        else:
-            roster_entry.base_pay = 0  # Only sleepover allowance
-        
-        # Calculate NDIS charges for sleepover
-        # For sleepover shifts, NDIS charges are per-shift based
-        roster_entry = calculate_ndis_charges(roster_entry, settings, "sleepover_default")
-            
-    else:
-        # Regular shift calculation
-        roster_entry.sleepover_allowance = 0
-        
-        # Use manual hourly rate if provided
-        if roster_entry.manual_hourly_rate:
-            hourly_rate = roster_entry.manual_hourly_rate
-        else:
-            # Use manual shift type if provided, otherwise determine automatically
-            if roster_entry.manual_shift_type:
-                shift_type_map = {
-                    "weekday_day": ShiftType.WEEKDAY_DAY,
-                    "weekday_evening": ShiftType.WEEKDAY_EVENING,
-                    "weekday_night": ShiftType.WEEKDAY_NIGHT,
-                    "saturday": ShiftType.SATURDAY,
-                    "sunday": ShiftType.SUNDAY,
-                    "public_holiday": ShiftType.PUBLIC_HOLIDAY
-                }
-                shift_type = shift_type_map.get(roster_entry.manual_shift_type, ShiftType.WEEKDAY_DAY)
-            else:
-                # Determine shift type automatically
-                shift_type = determine_shift_type(
-                    roster_entry.date, 
-                    roster_entry.start_time, 
-                    roster_entry.end_time,
-                    roster_entry.is_public_holiday
-                )
-            
-            hourly_rate = get_hourly_rate_for_shift_type(shift_type, settings)
-        
-        roster_entry.base_pay = hours * hourly_rate
-    
-    # Calculate NDIS charges - determine shift type for NDIS calculation
-    # Skip NDIS calculation for sleepover shifts as it's already calculated above
-    is_sleepover = roster_entry.manual_sleepover if roster_entry.manual_sleepover is not None else roster_entry.is_sleepover
-    
-    if not is_sleepover:
-        if roster_entry.manual_shift_type:
-            ndis_shift_type = roster_entry.manual_shift_type
-        else:
-            # Determine shift type automatically for NDIS calculation
-            shift_type_enum = determine_shift_type(
-                roster_entry.date, 
-                roster_entry.start_time, 
-                roster_entry.end_time,
-                roster_entry.is_public_holiday
-            )
-            # Convert enum to string for NDIS calculation
-            if shift_type_enum == ShiftType.PUBLIC_HOLIDAY:
-                ndis_shift_type = "public_holiday"
-            elif shift_type_enum == ShiftType.SATURDAY:
-                ndis_shift_type = "saturday"
-            elif shift_type_enum == ShiftType.SUNDAY:
-                ndis_shift_type = "sunday"
-            elif shift_type_enum == ShiftType.WEEKDAY_EVENING:
-                ndis_shift_type = "weekday_evening"
-            elif shift_type_enum == ShiftType.WEEKDAY_NIGHT:
-                ndis_shift_type = "weekday_night"
-            else:
-                ndis_shift_type = "weekday_day"
-        
-        # Calculate NDIS charges for regular shifts only
-        roster_entry = calculate_ndis_charges(roster_entry, settings, ndis_shift_type)
-    
-    roster_entry.total_pay = roster_entry.base_pay + roster_entry.sleepover_allowance
-    return roster_entry
+def check_shift_times(roster_entry: RosterEntry):
+    """Reject start and end times that aren't HH:MM clock times before they reach overlap checks or pay"""
+    try:
+        shift_minutes(roster_entry.start_time, roster_entry.end_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid shift times: {e}")
 
 def calculate_pay(roster_entry: RosterEntry, settings: Settings) -> RosterEntry:
     """Calculate pay for a roster entry with cross-midnight logic"""
-    return calculate_cross_midnight_pay(roster_entry, settings)
+    # Calendar holidays apply on top of the manual flag
+    is_holiday = lambda date_str: is_public_holiday_date(date_str, settings)
+    for field, value in pay_memo.evaluate(compile_rules(settings), roster_entry.dict(), is_holiday).items():
+        setattr(roster_entry, field, value)
+    return roster_entry
+
+def calculate_pay_for_documents(entry_docs: List[Dict], settings: Settings):
+    """Batch calculate_pay over roster documents, returning per-row pay fields and (row, error) pairs"""
+    columns, errors = build_pay_columns(entry_docs, lambda date_str: is_public_holiday_date(date_str, settings))
+    return pay_result_rows(calculate_pay_batch(columns, compile_rules(settings))), errors
+
+def calculate_pay_for_dated_documents(entry_docs: List[Dict], settings_timeline: SettingsTimeline):
+    """calculate_pay_for_documents with each entry priced under the settings in effect on its date"""
+    pay_rows: List[Optional[Dict]] = [None] * len(entry_docs)
+    errors = []
+    for settings, positions in settings_timeline.partition(entry_docs):
+        group_rows, group_errors = calculate_pay_for_documents([entry_docs[position] for position in positions], settings)
+        for position, row in zip(positions, group_rows):
+            pay_rows[position] = row
+        errors.extend((positions[row], error) for row, error in group_errors)
+    return pay_rows, sorted(errors)
 
 # Initialize default data
-def initialize_default_data():
+async def initialize_default_data():
     """Initialize default staff and shift templates"""
     
     # Default staff members
@@ -1668,7 +1323,7 @@ def initialize_default_data():
     ]
     
     for staff_name in default_staff:
-        existing = db.staff.find_one({"name": staff_name})
+        existing = await db.staff.find_one({"name": staff_name})
         if not existing:
             staff = Staff(
                 id=str(uuid.uuid4()),
@@ -1676,10 +1331,10 @@ def initialize_default_data():
                 active=True,
                 created_at=datetime.now()
             )
-            db.staff.insert_one(staff.dict())
+            await db.staff.insert_one(staff.dict())
     
     # Clear existing shift templates and create new ones per user requirements
-    db.shift_templates.delete_many({})
+    await db.shift_templates.delete_many({})
     
     # Updated shift templates according to user specifications
     shift_templates = [
@@ -1731,34 +1386,205 @@ def initialize_default_data():
             id=str(uuid.uuid4()),
             **template_data
         )
-        db.shift_templates.insert_one(template.dict())
+        await db.shift_templates.insert_one(template.dict())
+    await reference_data_changed("staff", "shift_templates")
     
     # Initialize default settings
-    existing_settings = db.settings.find_one()
+    existing_settings = await db.settings.find_one()
     if not existing_settings:
         settings = Settings()
-        db.settings.insert_one(settings.dict())
+        await db.settings.insert_one(settings.dict())
+
+# Reference data cache - write endpoints bump the relevant key so readers reload once per change;
+# reads check the shared version every couple of seconds to catch writes made by other processes
+reference_cache = ReferenceDataCache(lambda keys: current_versions(db, keys), check_interval=2.0)
+
+# Public holiday calendar shared by the scalar and batch pay paths
+holiday_calendar = HolidayCalendar()
+
+# Pay results for repeating shifts, keyed by settings version and everything else pay depends on
+pay_memo = PayMemo(max_entries=4096)
+
+async def reload_holiday_calendar():
+    """Load admin-added holidays into the calendar"""
+    holiday_calendar.load_custom(await db.public_holidays.find({}, {"_id": 0}))
+
+async def publish_holidays_changed(holiday: dict, action: str):
+    """Tell every API process to reload its holiday calendar, and admins that the holiday list changed"""
+    await publish(db, "public_holidays", {
+        "id": holiday.get("id"),
+        "date": holiday.get("date"),
+        "action": action,
+    }, audience(roles=["admin"]))
+
+# Every process reloads its calendar when any process adds or removes a holiday
+event_hub.listen("public_holidays", lambda event: reload_holiday_calendar())
+
+async def get_stored_settings() -> Settings:
+    """Get the settings document, which covers every date until the first dated settings change"""
+    async def load():
+        settings_doc = await db.settings.find_one()
+        return Settings(**settings_doc) if settings_doc else Settings()
+    return await reference_cache.get("settings", load)
+
+async def get_cached_settings() -> Settings:
+    """Get the settings in effect today; versions effective from a later date don't apply yet"""
+    return await get_settings_for_date(datetime.now().date().isoformat())
+
+async def load_settings_timeline() -> SettingsTimeline:
+    """Settings versions by effective date; before the first dated change the stored settings cover every date"""
+    versions = await db.settings_versions.find(
+        {}, {"_id": 0, "effective_from": 1, "settings": 1}, sort=[("effective_from", 1), ("version", 1)]
+    )
+    if not versions:
+        return SettingsTimeline([(BEGINNING_OF_TIME, await get_stored_settings())])
+    return SettingsTimeline([(version["effective_from"], Settings(**version["settings"])) for version in versions])
+
+async def get_settings_timeline() -> SettingsTimeline:
+    return await reference_cache.get("settings_versions", load_settings_timeline)
+
+async def get_settings_for_date(date_str: str) -> Settings:
+    return (await get_settings_timeline()).for_date(date_str)
+
+async def get_cached_staff() -> List[Dict]:
+    """Get active staff sorted alphabetically by name"""
+    async def load():
+        staff_list = await db.staff.find({"active": True}, {"_id": 0})
+        staff_list.sort(key=lambda staff: staff['name'].lower())
+        return staff_list
+    return list(await reference_cache.get("staff", load))
+
+async def get_cached_shift_templates() -> List[Dict]:
+    """Get all shift templates"""
+    async def load():
+        return await db.shift_templates.find({}, {"_id": 0})
+    return list(await reference_cache.get("shift_templates", load))
+
+async def get_cached_shift_template_names() -> Dict[str, str]:
+    """Map shift template ids to names for overlap checks"""
+    return {template["id"]: template.get("name", "") for template in await get_cached_shift_templates() if template.get("id")}
+
+async def get_cached_login_users() -> List[Dict]:
+    """Get active users for the login dropdown, admins first"""
+    async def load():
+        users = await db.users.find(
+            {"is_active": True},
+            {
+                "_id": 0,
+                "id": 1,
+                "username": 1, 
+                "role": 1,
+                "first_name": 1,
+                "last_name": 1,
+                "is_first_login": 1
+                # Exclude pin and pin_hash for security
+            }
+        )
+        users.sort(key=lambda x: (x.get("role") != "admin", x.get("username", "")))
+        return users
+    return list(await reference_cache.get("login_users", load))
+
+async def reference_data_changed(*keys: str):
+    """Drop this process's cached copy and advance the shared versions that conditional GETs compare against"""
+    reference_cache.bump(*keys)
+    await bump_versions(db, keys)
+
+# Conditional GETs - responses carry an ETag built from shared version counters, so If-None-Match is answered with one lookup
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+def set_etag(response: Response, etag: str):
+    response.headers.update(etag_headers(etag))
 
-# Authentication dependency
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
+async def reference_etag(resource: str, *keys: str, variant: str = "") -> str:
+    """ETag for cached reference data; a version moved by another process drops the stale local copy first"""
+    versions = await current_versions(db, keys)
+    for key, token in versions.items():
+        reference_cache.observe(key, token)
+    return make_etag(resource, versions, variant)
+
+def roster_variant(current_user: dict) -> str:
+    """Pay is masked per staff member, so each staff member gets their own representation of a month"""
+    staff_id = pay_viewer(current_user)
+    return "full" if staff_id is None else f"staff:{staff_id}"
+
+def list_options(fields: Optional[str], response_format: Optional[str]) -> Tuple[Optional[List[str]], str]:
+    """Validate the fields= projection and format= layout accepted by large list endpoints"""
+    try:
+        return parse_fields(fields), parse_format(response_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Authentication dependency - validated sessions are cached by token so most requests skip both lookups
+session_cache = SessionCache(max_entries=2048, ttl_seconds=60)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
     """Get current authenticated user"""
-    token = credentials.credentials
-    session = db.sessions.find_one({"token": token, "is_active": True})
+    return await authenticate_token(credentials.credentials)
+
+async def authenticate_token(token: str) -> dict:
+    """Resolve a session token to its active user"""
+    cached_user = session_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
+    session = await db.sessions.find_one({"token": token, "is_active": True})
     
     if not session or session["expires_at"] < datetime.utcnow():
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    user = db.users.find_one({"id": session["user_id"], "is_active": True})
+    user = await db.users.find_one({"id": session["user_id"], "is_active": True})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
+    session_cache.put(token, user, session["expires_at"])
     return user
 
 # API Endpoints
 
 @app.on_event("startup")
 async def startup_event():
-    initialize_default_data()
+    index_report = await reconcile_indexes(db)
+    for collection_name, status in index_report.items():
+        if status["created"]:
+            print(f"🗂️ Created indexes on {collection_name}: {', '.join(status['created'])}")
+        if status["extra"]:
+            print(f"⚠️ Unregistered indexes on {collection_name}: {', '.join(status['extra'])}")
+        for failure in status["failed"]:
+            print(f"❌ Index creation failed on {collection_name}: {failure}")
+    
+    # Before anything publishes, so the events collection is created capped
+    await event_hub.start()
+    
+    migration_result = await backfill_roster_date_keys(db)
+    if migration_result["entries_updated"]:
+        print(f"🗓️ Backfilled month/week keys on {migration_result['entries_updated']} roster entries")
+    
+    await reload_holiday_calendar()
+    
+    # Queued jobs, and jobs interrupted by a restart once their lease lapses, are picked up by the pool
+    job_runner.start()
+    
+    # Summaries start empty on existing databases; build them once in the background
+    if not await db.roster_month_summary.find_one({}) and await db.roster.find_one({}, {"_id": 1}):
+        await job_runner.submit(
+            REBUILD_SUMMARY_JOB, {}, await roster_months(), dedupe_key="roster-summary-initial-build"
+        )
+    app.state.rolling_horizon_task = asyncio.create_task(rolling_horizon_scheduler())
+    
+    # Seed data is written through the async repositories, so it runs here rather than at import time
+    await create_admin_user()
+    await initialize_admin()
+    await initialize_sample_client()
+    await initialize_default_data()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
+    await event_hub.stop()
 
 @app.get("/api/health")
 async def health_check():
@@ -1766,11 +1592,12 @@ async def health_check():
 
 # Staff endpoints
 @app.get("/api/staff")
-async def get_staff():
-    staff_list = list(db.staff.find({"active": True}, {"_id": 0}))
-    # Sort staff alphabetically by name
-    staff_list.sort(key=lambda staff: staff['name'].lower())
-    return staff_list
+async def get_staff(response: Response, if_none_match: Optional[str] = Header(None)):
+    etag = await reference_etag("staff", "staff")
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await get_cached_staff()
 
 @app.post("/api/staff")
 async def create_staff(staff: Staff):
@@ -1785,19 +1612,21 @@ async def create_staff(staff: Staff):
         raise HTTPException(status_code=422, detail="Staff name cannot be empty")
     
     # Check if staff name already exists
-    existing_staff = db.staff.find_one({"name": staff.name, "active": True})
+    existing_staff = await db.staff.find_one({"name": staff.name, "active": True})
     if existing_staff:
         raise HTTPException(status_code=400, detail=f"Staff member with name '{staff.name}' already exists")
     
     try:
-        db.staff.insert_one(staff.dict())
+        await db.staff.insert_one(staff.dict())
+        await reference_data_changed("staff")
         return staff
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create staff member: {str(e)}")
 
 @app.put("/api/staff/{staff_id}")
 async def update_staff(staff_id: str, staff: Staff):
-    result = db.staff.update_one({"id": staff_id}, {"$set": staff.dict()})
+    result = await db.staff.update_one({"id": staff_id}, {"$set": staff.dict()})
+    await reference_data_changed("staff")
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Staff not found")
     return staff
@@ -1809,12 +1638,12 @@ async def delete_staff(staff_id: str, current_user: dict = Depends(get_current_u
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if staff member exists
-    staff_member = db.staff.find_one({"id": staff_id})
+    staff_member = await db.staff.find_one({"id": staff_id})
     if not staff_member:
         raise HTTPException(status_code=404, detail="Staff not found")
     
     # Check for assigned shifts
-    assigned_shifts = list(db.roster.find({"staff_id": staff_id}))
+    assigned_shifts = await db.roster.find({"staff_id": staff_id})
     future_shifts = []
     past_shifts = []
     
@@ -1828,17 +1657,20 @@ async def delete_staff(staff_id: str, current_user: dict = Depends(get_current_u
             past_shifts.append(shift)
     
     # Deactivate the staff member
-    result = db.staff.update_one({"id": staff_id}, {"$set": {"active": False}})
+    result = await db.staff.update_one({"id": staff_id}, {"$set": {"active": False}})
+    await reference_data_changed("staff")
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Staff not found")
     
     # Unassign from future shifts (keep past shifts for record keeping)
     if future_shifts:
-        db.roster.update_many(
+        await db.roster.update_many(
             {"staff_id": staff_id, "date": {"$gte": today}},
             {"$unset": {"staff_id": "", "staff_name": ""}}
         )
+        unassigned = [{**shift, "staff_id": None, "staff_name": None} for shift in future_shifts]
+        await record_roster_write(db, before=future_shifts, after=unassigned)
     
     response = {
         "message": f"Staff member '{staff_member.get('first_name', '')} {staff_member.get('last_name', '')}' has been deactivated",
@@ -1854,13 +1686,17 @@ async def delete_staff(staff_id: str, current_user: dict = Depends(get_current_u
 
 # Shift template endpoints
 @app.get("/api/shift-templates")
-async def get_shift_templates():
+async def get_shift_templates(response: Response, if_none_match: Optional[str] = Header(None)):
     """Get shift templates with calculated rates and shift types"""
-    templates = list(db.shift_templates.find({}, {"_id": 0}))
+    # Calculated rates come from settings, so a settings change also changes the ETag
+    etag = await reference_etag("shift_templates", "shift_templates", "settings")
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    templates = await get_cached_shift_templates()
     
     # Get current settings for rate calculations
-    settings = db.settings.find_one() or {}
-    rates = settings.get("rates", {})
+    rates = (await get_cached_settings()).rates
     
     # Enhance each template with calculated information
     enhanced_templates = []
@@ -1929,21 +1765,101 @@ async def get_shift_templates():
 @app.post("/api/shift-templates")
 async def create_shift_template(template: ShiftTemplate):
     template.id = str(uuid.uuid4())
-    db.shift_templates.insert_one(template.dict())
+    await db.shift_templates.insert_one(template.dict())
+    await reference_data_changed("shift_templates")
     return template
 
 @app.put("/api/shift-templates/{template_id}")
 async def update_shift_template(template_id: str, template: ShiftTemplate):
     """Update a shift template with all fields including manual overrides"""
-    result = db.shift_templates.update_one({"id": template_id}, {"$set": template.dict()})
+    result = await db.shift_templates.update_one({"id": template_id}, {"$set": template.dict()})
+    await reference_data_changed("shift_templates")
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Shift template not found")
     return template
 
+# Public holiday endpoints
+@app.get("/api/public-holidays")
+async def get_public_holidays(year: int, state: Optional[str] = None):
+    """List public holidays for a year: rule-based national/state holidays plus admin-added dates; with no state, admin-added dates only"""
+    settings = await get_cached_settings()
+    state = state or settings.holiday_state
+    if state is not None:
+        state = state.upper()
+        if state not in AU_STATES:
+            raise HTTPException(status_code=400, detail=f"Unknown state. Use one of: {', '.join(AU_STATES)}")
+    
+    custom_dates = {
+        holiday["date"]: holiday
+        for holiday in await db.public_holidays.find(
+            {"date": {"$gte": f"{year}-01-01", "$lte": f"{year}-12-31"}, "state": {"$in": [None, state]}},
+            {"_id": 0}
+        )
+    }
+    return [
+        {
+            "date": date_str,
+            "name": name,
+            "state": state,
+            "custom": date_str in custom_dates,
+            "id": custom_dates.get(date_str, {}).get("id")
+        }
+        for date_str, name in holiday_calendar.holidays_for_year(year, state).items()
+    ]
+
+async def queue_holiday_recompute(date_str: str) -> Dict[str, Any]:
+    """Queue repricing of entries on a date whose holiday status changed, and of overnight shifts ending on it"""
+    previous_date = (datetime.strptime(date_str, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    return await job_runner.submit(RECOMPUTE_PAY_JOB, {"holiday_date": date_str, "dates": [previous_date, date_str]})
+
+@app.post("/api/public-holidays")
+async def create_public_holiday(holiday: PublicHoliday, current_user: dict = Depends(get_current_user)):
+    """Add a public holiday and queue a pay recompute for the roster entries it affects"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        datetime.strptime(holiday.date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if holiday.state is not None:
+        holiday.state = holiday.state.upper()
+        if holiday.state not in AU_STATES:
+            raise HTTPException(status_code=400, detail=f"Unknown state. Use one of: {', '.join(AU_STATES)}")
+    
+    holiday.id = str(uuid.uuid4())
+    holiday.created_at = datetime.now()
+    await db.public_holidays.insert_one(holiday.dict())
+    await reload_holiday_calendar()
+    await publish_holidays_changed(holiday.dict(), "created")
+    
+    job = await queue_holiday_recompute(holiday.date)
+    return {"holiday": holiday, "recompute_job_id": job["id"]}
+
+@app.delete("/api/public-holidays/{holiday_id}")
+async def delete_public_holiday(holiday_id: str, current_user: dict = Depends(get_current_user)):
+    """Remove an admin-added public holiday and queue a pay recompute for the roster entries it affected"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    holiday = await db.public_holidays.find_one({"id": holiday_id})
+    if not holiday:
+        raise HTTPException(status_code=404, detail="Public holiday not found")
+    
+    await db.public_holidays.delete_one({"id": holiday_id})
+    await reload_holiday_calendar()
+    await publish_holidays_changed(holiday, "deleted")
+    
+    # Entries flagged as holidays by hand keep their flag and their holiday pay
+    job = await queue_holiday_recompute(holiday["date"])
+    return {"message": "Public holiday deleted", "recompute_job_id": job["id"]}
+
 # Calendar events endpoints
 @app.get("/api/calendar-events")
-async def get_calendar_events(start_date: Optional[str] = None, end_date: Optional[str] = None, event_type: Optional[str] = None):
+async def get_calendar_events(start_date: Optional[str] = None, end_date: Optional[str] = None, event_type: Optional[str] = None,
+                              fields: Optional[str] = None, response_format: Optional[str] = Query(None, alias="format")):
     """Get calendar events with optional filtering"""
+    fields, response_format = list_options(fields, response_format)
     query = {"is_active": True}
     
     if start_date and end_date:
@@ -1956,13 +1872,13 @@ async def get_calendar_events(start_date: Optional[str] = None, end_date: Option
     if event_type:
         query["event_type"] = event_type
     
-    events = list(db.calendar_events.find(query, {"_id": 0}))
-    return events
+    events = await db.calendar_events.find(query, projection(fields))
+    return list_response(events, fields, response_format)
 
 @app.get("/api/calendar-events/{date}")
 async def get_events_for_date(date: str):
     """Get all events for a specific date"""
-    events = list(db.calendar_events.find({"date": date, "is_active": True}, {"_id": 0}))
+    events = await db.calendar_events.find({"date": date, "is_active": True}, {"_id": 0})
     return events
 
 @app.post("/api/calendar-events")
@@ -1970,13 +1886,13 @@ async def create_calendar_event(event: CalendarEvent):
     """Create a new calendar event"""
     event.id = str(uuid.uuid4())
     event.created_at = datetime.now()
-    db.calendar_events.insert_one(event.dict())
+    await db.calendar_events.insert_one(event.dict())
     return event
 
 @app.put("/api/calendar-events/{event_id}")
 async def update_calendar_event(event_id: str, event: CalendarEvent):
     """Update an existing calendar event"""
-    result = db.calendar_events.update_one({"id": event_id}, {"$set": event.dict()})
+    result = await db.calendar_events.update_one({"id": event_id}, {"$set": event.dict()})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Calendar event not found")
     return event
@@ -1984,7 +1900,7 @@ async def update_calendar_event(event_id: str, event: CalendarEvent):
 @app.delete("/api/calendar-events/{event_id}")
 async def delete_calendar_event(event_id: str):
     """Delete a calendar event"""
-    result = db.calendar_events.update_one({"id": event_id}, {"$set": {"is_active": False}})
+    result = await db.calendar_events.update_one({"id": event_id}, {"$set": {"is_active": False}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Calendar event not found")
     return {"message": "Calendar event deleted"}
@@ -1992,7 +1908,7 @@ async def delete_calendar_event(event_id: str):
 @app.put("/api/calendar-events/{event_id}/complete")
 async def complete_task(event_id: str):
     """Mark a task as completed"""
-    result = db.calendar_events.update_one(
+    result = await db.calendar_events.update_one(
         {"id": event_id, "event_type": "task"}, 
         {"$set": {"is_completed": True}}
     )
@@ -2004,13 +1920,13 @@ async def complete_task(event_id: str):
 @app.get("/api/day-templates")
 async def get_day_templates():
     """Get all day templates"""
-    templates = list(db.day_templates.find({"is_active": True}, {"_id": 0}))
+    templates = await db.day_templates.find({"is_active": True}, {"_id": 0})
     return templates
 
 @app.get("/api/day-templates/{day_of_week}")
 async def get_day_templates_for_day(day_of_week: int):
     """Get day templates for a specific day of week"""
-    templates = list(db.day_templates.find({"day_of_week": day_of_week, "is_active": True}, {"_id": 0}))
+    templates = await db.day_templates.find({"day_of_week": day_of_week, "is_active": True}, {"_id": 0})
     return templates
 
 @app.post("/api/day-templates")
@@ -2018,14 +1934,14 @@ async def create_day_template(template: DayTemplate):
     """Create a new day template"""
     template.id = str(uuid.uuid4())
     template.created_at = datetime.now()
-    db.day_templates.insert_one(template.dict())
+    await db.day_templates.insert_one(template.dict())
     return template
 
 @app.post("/api/day-templates/save-day/{template_name}")
 async def save_day_as_template(template_name: str, date: str):
     """Save all shifts from a specific date as a day template"""
     # Get all roster entries for the specific date
-    roster_entries = list(db.roster.find({"date": date}, {"_id": 0}))
+    roster_entries = await db.roster.find({"date": date}, {"_id": 0})
     
     if not roster_entries:
         raise HTTPException(status_code=404, detail=f"No shifts found for date {date}")
@@ -2058,24 +1974,27 @@ async def save_day_as_template(template_name: str, date: str):
         created_at=datetime.now()
     )
     
-    db.day_templates.insert_one(day_template.dict())
+    await db.day_templates.insert_one(day_template.dict())
     return day_template
 
 @app.post("/api/day-templates/apply-to-date/{template_id}")
 async def apply_day_template_to_date(template_id: str, target_date: str):
     """Apply a day template to a specific date"""
     # Get the day template
-    template_doc = db.day_templates.find_one({"id": template_id, "is_active": True})
+    template_doc = await db.day_templates.find_one({"id": template_id, "is_active": True})
     if not template_doc:
         raise HTTPException(status_code=404, detail="Day template not found")
     
     template = DayTemplate(**template_doc)
     
     # Check if target date already has shifts and look for overlaps
-    overlaps = []
-    for shift_data in template.shifts:
-        if check_shift_overlap(target_date, shift_data["start_time"], shift_data["end_time"], shift_name=template.name):
-            overlaps.append(f"{shift_data['start_time']}-{shift_data['end_time']}")
+    existing_shifts = await db.roster.find({"date": target_date}, {"_id": 0, "id": 1, "start_time": 1, "end_time": 1})
+    day_index = DayIntervalIndex(existing_shifts)
+    overlaps = [
+        f"{shift_data['start_time']}-{shift_data['end_time']}"
+        for shift_data in template.shifts
+        if day_index.conflicts(shift_data["start_time"], shift_data["end_time"], shift_name=template.name)
+    ]
     
     if overlaps:
         raise HTTPException(
@@ -2084,9 +2003,8 @@ async def apply_day_template_to_date(template_id: str, target_date: str):
         )
     
     # Apply the template shifts to the target date
-    entries_created = 0
-    settings_doc = db.settings.find_one()
-    settings = Settings(**settings_doc) if settings_doc else Settings()
+    settings = await get_settings_for_date(target_date)
+    new_entries = []
     
     for shift_data in template.shifts:
         # Create roster entry
@@ -2100,10 +2018,14 @@ async def apply_day_template_to_date(template_id: str, target_date: str):
         )
         
         # Calculate pay
+        check_shift_times(entry)
         entry = calculate_pay(entry, settings)
-        
-        db.roster.insert_one(entry.dict())
-        entries_created += 1
+        new_entries.append(entry.dict())
+    
+    if new_entries:
+        await db.roster.insert_many(new_entries)
+        await record_roster_write(db, after=new_entries)
+    entries_created = len(new_entries)
     
     return {
         "message": f"Applied '{template.name}' to {target_date}",
@@ -2114,79 +2036,33 @@ async def apply_day_template_to_date(template_id: str, target_date: str):
 @app.delete("/api/day-templates/{template_id}")
 async def delete_day_template(template_id: str):
     """Delete a day template"""
-    result = db.day_templates.update_one({"id": template_id}, {"$set": {"is_active": False}})
+    result = await db.day_templates.update_one({"id": template_id}, {"$set": {"is_active": False}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Day template not found")
     return {"message": "Day template deleted"}
 
+def roster_entry_factory(settings_timeline: SettingsTimeline):
+    """Build priced roster entry documents for the generation planners, under the settings in effect on each date"""
+    def make_entry(**fields) -> dict:
+        entry = RosterEntry(id=str(uuid.uuid4()), **fields)
+        return calculate_pay(entry, settings_timeline.for_date(entry.date)).dict()
+    return make_entry
+
 @app.post("/api/generate-roster-from-shift-templates/{month}")
 async def generate_roster_from_shift_templates(month: str, templates_data: dict):
     """Generate roster for a month using the shift templates from Shift Times section"""
-    year, month_num = map(int, month.split("-"))
     templates = templates_data.get("templates", [])
     force_overlaps = templates_data.get("force_overlaps", False)
     
     if not templates:
         raise HTTPException(status_code=400, detail="No shift templates provided")
     
-    # Generate entries for each day of the month using shift templates
-    from calendar import monthrange
-    _, days_in_month = monthrange(year, month_num)
-    
-    entries_created = 0
-    overlaps_detected = []
-    
-    for day in range(1, days_in_month + 1):
-        date_obj = datetime(year, month_num, day)
-        date_str = date_obj.strftime("%Y-%m-%d")
-        day_of_week = date_obj.weekday()  # 0=Monday, 6=Sunday
-        
-        # Get shift templates for this day of week
-        day_templates = [t for t in templates if t.get("day_of_week") == day_of_week]
-        
-        for template in day_templates:
-            template_name = template.get("name", "")
-            allow_overlap = template.get("allow_overlap", False)
-            
-            # Check for overlaps (unless forced or explicitly allowed)
-            if not force_overlaps and not allow_overlap:
-                if check_shift_overlap(date_str, template["start_time"], template["end_time"], shift_name=template_name):
-                    overlaps_detected.append({
-                        "date": date_str,
-                        "start_time": template["start_time"],
-                        "end_time": template["end_time"],
-                        "name": template_name,
-                        "reason": "Overlap detected in shift templates"
-                    })
-                    continue  # Skip overlapping shifts unless forced
-            
-            # Check if entry already exists (unless forcing overlaps)
-            existing = db.roster.find_one({
-                "date": date_str,
-                "start_time": template["start_time"],
-                "end_time": template["end_time"]
-            }) if not force_overlaps else None
-            
-            if not existing or force_overlaps:
-                entry = RosterEntry(
-                    id=str(uuid.uuid4()),
-                    date=date_str,
-                    shift_template_id=template.get("id", f"template-{day_of_week}"),
-                    start_time=template["start_time"],
-                    end_time=template["end_time"],
-                    is_sleepover=template.get("is_sleepover", False),
-                    manual_shift_type=template.get("manual_shift_type"),
-                    manual_hourly_rate=template.get("manual_hourly_rate"),
-                    allow_overlap=allow_overlap or force_overlaps
-                )
-                
-                # Calculate pay using template overrides
-                settings_doc = db.settings.find_one()
-                settings = Settings(**settings_doc) if settings_doc else Settings()
-                entry = calculate_pay(entry, settings)
-                
-                db.roster.insert_one(entry.dict())
-                entries_created += 1
+    # Plan the whole month against one snapshot, then insert in a single bulk write
+    settings_timeline = await get_settings_timeline()
+    snapshot = await load_month_snapshot(db, month)
+    plan = plan_month_from_template_payload(month, templates, force_overlaps, snapshot, roster_entry_factory(settings_timeline))
+    entries_created = await plan.commit(db)
+    overlaps_detected = plan.overlaps_detected
     
     result = {
         "message": f"Generated {entries_created} roster entries for {month} using Shift Times templates",
@@ -2209,7 +2085,7 @@ async def generate_roster_from_shift_templates(month: str, templates_data: dict)
 @app.get("/api/roster-templates")
 async def get_roster_templates():
     """Get all roster templates"""
-    templates = list(db.roster_templates.find({"is_active": True}, {"_id": 0}))
+    templates = await db.roster_templates.find({"is_active": True}, {"_id": 0})
     return templates
 
 @app.post("/api/roster-templates")
@@ -2217,13 +2093,13 @@ async def create_roster_template(template: RosterTemplate):
     """Create a new roster template"""
     template.id = str(uuid.uuid4())
     template.created_at = datetime.now()
-    db.roster_templates.insert_one(template.dict())
+    await db.roster_templates.insert_one(template.dict())
     return template
 
 @app.put("/api/roster-templates/{template_id}")
 async def update_roster_template(template_id: str, template: RosterTemplate):
     """Update an existing roster template"""
-    result = db.roster_templates.update_one({"id": template_id}, {"$set": template.dict()})
+    result = await db.roster_templates.update_one({"id": template_id}, {"$set": template.dict()})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Roster template not found")
     return template
@@ -2231,7 +2107,7 @@ async def update_roster_template(template_id: str, template: RosterTemplate):
 @app.delete("/api/roster-templates/{template_id}")
 async def delete_roster_template(template_id: str):
     """Delete a roster template"""
-    result = db.roster_templates.update_one({"id": template_id}, {"$set": {"is_active": False}})
+    result = await db.roster_templates.update_one({"id": template_id}, {"$set": {"is_active": False}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Roster template not found")
     return {"message": "Roster template deleted"}
@@ -2240,7 +2116,7 @@ async def delete_roster_template(template_id: str):
 async def save_current_roster_as_template(template_name: str, month: str):
     """Save current month's roster as a template"""
     # Get all roster entries for the month
-    roster_entries = list(db.roster.find({"date": {"$regex": f"^{month}"}}, {"_id": 0}))
+    roster_entries = await db.roster.find_month(month, {"_id": 0})
     
     if not roster_entries:
         raise HTTPException(status_code=404, detail="No roster entries found for the specified month")
@@ -2275,126 +2151,29 @@ async def save_current_roster_as_template(template_name: str, month: str):
         template_data=template_data
     )
     
-    db.roster_templates.insert_one(roster_template.dict())
+    await db.roster_templates.insert_one(roster_template.dict())
     return roster_template
 
 @app.post("/api/generate-roster-from-template/{template_id}/{month}")
 async def generate_roster_from_template(template_id: str, month: str, force_overlaps: bool = False):
     """Generate roster entries for a month using a roster template with advanced 2:1 shift support"""
     # Get the roster template
-    template_doc = db.roster_templates.find_one({"id": template_id, "is_active": True})
+    template_doc = await db.roster_templates.find_one({"id": template_id, "is_active": True})
     if not template_doc:
         raise HTTPException(status_code=404, detail="Roster template not found")
     
     template = RosterTemplate(**template_doc)
-    year, month_num = map(int, month.split("-"))
     
-    # Generate entries for each day of the month
-    from calendar import monthrange
-    _, days_in_month = monthrange(year, month_num)
-    
-    entries_created = 0
-    overlaps_detected = []
-    duplicates_prevented = []
-    duplicates_allowed = []
-    
-    for day in range(1, days_in_month + 1):
-        date_obj = datetime(year, month_num, day)
-        date_str = date_obj.strftime("%Y-%m-%d")
-        day_of_week = date_obj.weekday()  # 0=Monday, 6=Sunday
-        
-        # Get shift templates for this day of week
-        day_shifts = template.template_data.get(str(day_of_week), [])
-        if not day_shifts:
-            day_shifts = template.template_data.get(day_of_week, [])  # Try integer key
-        
-        for shift_data in day_shifts:
-            # Get shift name from template if available
-            shift_name = shift_data.get("name", template.name)
-            
-            # Check for existing entries at same time
-            existing_entries = list(db.roster.find({
-                "date": date_str,
-                "start_time": shift_data["start_time"],
-                "end_time": shift_data["end_time"]
-            }))
-            
-            should_skip = False
-            skip_reason = ""
-            
-            # Apply duplicate prevention rules based on template configuration (unless forcing overlaps)
-            if existing_entries and not force_overlaps:
-                # Check if any existing entries are unassigned
-                unassigned_exists = any(not entry.get("staff_id") and not entry.get("staff_name") for entry in existing_entries)
-                
-                if unassigned_exists and template.prevent_duplicate_unassigned:
-                    should_skip = True
-                    skip_reason = "Duplicate prevented: Unassigned shift already exists"
-                    duplicates_prevented.append({
-                        "date": date_str,
-                        "start_time": shift_data["start_time"],
-                        "end_time": shift_data["end_time"],
-                        "reason": skip_reason
-                    })
-                
-                # Check if we should allow different staff only
-                elif template.allow_different_staff_only and not template.enable_2_1_shift:
-                    # For non-2:1 templates with different staff rule, check if all slots are filled with different staff
-                    assigned_staff = [entry.get("staff_id") for entry in existing_entries if entry.get("staff_id")]
-                    if len(assigned_staff) >= 1:  # Already has one staff member
-                        should_skip = True
-                        skip_reason = "Single staff per shift (non-2:1 template)"
-                        duplicates_prevented.append({
-                            "date": date_str,
-                            "start_time": shift_data["start_time"],
-                            "end_time": shift_data["end_time"],
-                            "reason": skip_reason
-                        })
-            
-            if should_skip:
-                continue
-            
-            # Check for overlaps if not overridden and not forcing overlaps
-            if not template.allow_overlap_override and not force_overlaps:
-                overlap_check = check_shift_overlap(date_str, shift_data["start_time"], shift_data["end_time"], shift_name=shift_name)
-                if overlap_check and not template.enable_2_1_shift:
-                    overlaps_detected.append({
-                        "date": date_str,
-                        "start_time": shift_data["start_time"],
-                        "end_time": shift_data["end_time"],
-                        "name": shift_name,
-                        "reason": "Overlap detected and not overridden"
-                    })
-                    if not force_overlaps:
-                        continue  # Skip overlapping shifts unless forced
-            
-            # Create new entry
-            entry = RosterEntry(
-                id=str(uuid.uuid4()),
-                date=date_str,
-                shift_template_id=f"template-{template_id}-{day_of_week}",
-                start_time=shift_data["start_time"],
-                end_time=shift_data["end_time"],
-                is_sleepover=shift_data.get("is_sleepover", False),
-                allow_overlap=template.enable_2_1_shift or template.allow_overlap_override or force_overlaps
-            )
-            
-            # Calculate pay
-            settings_doc = db.settings.find_one()
-            settings = Settings(**settings_doc) if settings_doc else Settings()
-            entry = calculate_pay(entry, settings)
-            
-            db.roster.insert_one(entry.dict())
-            entries_created += 1
-            
-            # Track allowed duplicates for reporting
-            if existing_entries:
-                duplicates_allowed.append({
-                    "date": date_str,
-                    "start_time": shift_data["start_time"],
-                    "end_time": shift_data["end_time"],
-                    "reason": "2:1 shift, different staff allowed, or forced overlaps"
-                })
+    # Plan the whole month against one snapshot, then insert in a single bulk write
+    settings_timeline = await get_settings_timeline()
+    snapshot = await load_month_snapshot(db, month)
+    plan = plan_month_from_roster_template(
+        month, template_id, template, force_overlaps, snapshot, roster_entry_factory(settings_timeline)
+    )
+    entries_created = await plan.commit(db)
+    overlaps_detected = plan.overlaps_detected
+    duplicates_prevented = plan.duplicates_prevented
+    duplicates_allowed = plan.duplicates_allowed
     
     result = {
         "message": f"Generated {entries_created} roster entries for {month} using template '{template.name}'",
@@ -2425,192 +2204,737 @@ async def generate_roster_from_template(template_id: str, month: str, force_over
     
     return result
 
-# Roster endpoints
-@app.get("/api/roster")
-async def get_roster(month: str, current_user: dict = Depends(get_current_user)):
-    """Get roster for a specific month (YYYY-MM format) with role-based filtering and pay privacy"""
+# Dry-run plans are kept in Mongo until applied or expired, so any process can apply them
+generation_plans = GenerationPlanStore(db, ttl_seconds=900)
+
+@app.post("/api/generate-roster-from-template/{template_id}/{month}/plan")
+async def plan_roster_from_template(template_id: str, month: str, force_overlaps: bool = False):
+    """Dry run of template generation: the full diff of creates, skips and allowed duplicates, cached under a plan id"""
+    template_doc = await db.roster_templates.find_one({"id": template_id, "is_active": True})
+    if not template_doc:
+        raise HTTPException(status_code=404, detail="Roster template not found")
     
-    # Base query for the specified month
-    query = {"date": {"$regex": f"^{month}"}}
+    template = RosterTemplate(**template_doc)
+    settings_timeline = await get_settings_timeline()
+    snapshot = await load_month_snapshot(db, month)
+    plan = plan_month_from_roster_template(
+        month, template_id, template, force_overlaps, snapshot, roster_entry_factory(settings_timeline)
+    )
     
-    # Get all roster entries for the month (no filtering by staff for staff users anymore)
-    roster_entries = list(db.roster.find(query, {"_id": 0}))
+    plan_info = await generation_plans.put(
+        plan,
+        template_id=template_id,
+        template_name=template.name,
+        month=month,
+        force_overlaps=force_overlaps
+    )
+    return {**plan_info, **plan.diff()}
+
+@app.post("/api/generation-plans/{plan_id}/apply")
+async def apply_generation_plan(plan_id: str):
+    """Apply exactly the entries of a previously computed plan with one bulk write"""
+    stored = await generation_plans.claim(plan_id)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Generation plan not found, expired or already being applied")
     
-    # Apply pay filtering for staff users
-    if current_user["role"] == "staff":
-        staff_id = current_user.get("staff_id") or current_user.get("id")
-        
-        # Filter pay information based on staff access rules:
-        # - Staff can see pay for their own shifts
-        # - Staff can see pay for unassigned shifts 
-        # - Staff cannot see pay for other staff's shifts
-        for entry in roster_entries:
-            # If shift is assigned to someone else (not this staff member and not unassigned)
-            if entry.get("staff_id") and entry.get("staff_id") != staff_id:
-                # Remove pay information for other staff's shifts
-                entry["total_pay"] = None
-                entry["base_pay"] = None
-                entry["sleepover_allowance"] = None
-                entry["ndis_total_charge"] = None
-                entry["ndis_hourly_charge"] = None
-                entry["ndis_shift_charge"] = None
-                # Keep staff_name, hours_worked, time info for display
-            # For own shifts and unassigned shifts, keep all pay information intact
-    
-    return roster_entries
+    # The plan stays stored until its entries are written, so a stale or failed apply can be retried or replanned
+    plan = stored["plan"]
+    try:
+        if await load_month_fingerprint(db, plan.month) != plan.snapshot_fingerprint:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Roster for {plan.month} changed since the plan was made. Create a new plan."
+            )
+        entries_created = await plan.commit(db)
+    except Exception:
+        await generation_plans.release(plan_id)
+        raise
+    await generation_plans.delete(plan_id)
+    
+    return {
+        "message": f"Applied plan: generated {entries_created} roster entries for {plan.month}",
+        "entries_created": entries_created,
+        **stored["info"]
+    }
+
+# Background job endpoints
+def _job_visible_to(job: dict, current_user: dict) -> bool:
+    return current_user["role"] == "admin" or job.get("created_by") == current_user["id"]
+
+@app.get("/api/jobs")
+async def get_jobs(job_type: Optional[str] = None, status: Optional[str] = None, limit: int = 50,
+                   current_user: dict = Depends(get_current_user)):
+    """Recent background jobs; admins see every job, other users their own"""
+    query = {}
+    if job_type:
+        query["type"] = job_type
+    if status:
+        query["status"] = status
+    if current_user["role"] != "admin":
+        query["created_by"] = current_user["id"]
+    
+    return await db.jobs.find(query, {"_id": 0}, sort=[("created_at", -1)], limit=min(limit, 200))
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status, progress, heartbeat and result of a background job"""
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job or not _job_visible_to(job, current_user):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel a queued job, or stop a running one at its next checkpoint"""
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "created_by": 1})
+    if not job or not _job_visible_to(job, current_user):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if not await job_runner.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    return {"message": "Cancellation requested", "job_id": job_id}
+
+# Range generation runs as a tracked background job, one step per month
+ROSTER_RANGE_JOB = "roster_generation_range"
+MAX_RANGE_MONTHS = 24
+ROLLING_HORIZON_HOUR = 2  # Local hour the nightly horizon extension runs
+
+async def run_roster_range_job(ctx: JobContext):
+    """Generate each pending month of a range job and record its counts as the month completes
+    
+    A month interrupted after its bulk write is regenerated on resume; the planners'
+    duplicate and overlap rules skip the shifts it already created.
+    """
+    params = ctx.params
+    template = None
+    if params["source"] == "roster_template":
+        template_doc = await db.roster_templates.find_one({"id": params["template_id"], "is_active": True})
+        if not template_doc:
+            raise ValueError(f"Roster template {params['template_id']} not found")
+        template = RosterTemplate(**template_doc)
+    date_window = tuple(params["date_window"]) if params.get("date_window") else None
+    
+    for month in ctx.pending_steps():
+        await ctx.check_cancelled()
+        settings_timeline = await load_settings_timeline()
+        snapshot = await load_month_snapshot(db, month)
+        make_entry = roster_entry_factory(settings_timeline)
+        if template:
+            plan = plan_month_from_roster_template(
+                month, params["template_id"], template, params["force_overlaps"], snapshot, make_entry, date_window
+            )
+        else:
+            plan = plan_month_from_shift_templates(
+                month, await get_cached_shift_templates(), snapshot, make_entry, date_window
+            )
+        entries_created = await plan.commit(db)
+        await ctx.step_done(month, {
+            "entries_created": entries_created,
+            "overlaps_detected": len(plan.overlaps_detected),
+            "duplicates_prevented": len(plan.duplicates_prevented),
+            "duplicates_allowed": len(plan.duplicates_allowed),
+        })
+        print(f"🗓️ Range job {ctx.job_id}: generated {entries_created} entries for {month}")
+
+job_runner.register(ROSTER_RANGE_JOB, run_roster_range_job, concurrency=1, max_attempts=3, backoff_seconds=60)
+
+def _validate_month(month: str) -> str:
+    try:
+        return datetime.strptime(month, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid month '{month}', expected YYYY-MM")
+
+async def submit_roster_range_job(request: RangeGenerationRequest, created_by: Optional[str] = None,
+                                  dedupe_key: Optional[str] = None) -> Optional[dict]:
+    """Validate a range request, resolve its months and queue the job"""
+    if request.source not in ("shift_templates", "roster_template"):
+        raise HTTPException(status_code=400, detail="source must be 'shift_templates' or 'roster_template'")
+    if request.source == "roster_template":
+        if not request.template_id:
+            raise HTTPException(status_code=400, detail="template_id is required for roster_template generation")
+        if not await db.roster_templates.find_one({"id": request.template_id, "is_active": True}):
+            raise HTTPException(status_code=404, detail="Roster template not found")
+    elif request.force_overlaps:
+        # Shift templates only skip their own duplicates, so there is no overlap check to force past
+        raise HTTPException(status_code=400, detail="force_overlaps only applies to roster_template generation")
+    
+    date_window = None
+    if request.weeks_ahead is not None:
+        if request.weeks_ahead <= 0:
+            raise HTTPException(status_code=400, detail="weeks_ahead must be positive")
+        date_window = horizon_window(datetime.now().date(), request.weeks_ahead)
+        months = month_range(date_window[0][:7], date_window[1][:7])
+    elif request.start_month:
+        months = month_range(_validate_month(request.start_month), _validate_month(request.end_month or request.start_month))
+    else:
+        raise HTTPException(status_code=400, detail="Provide start_month/end_month or weeks_ahead")
+    
+    if not months:
+        raise HTTPException(status_code=400, detail="end_month is before start_month")
+    if len(months) > MAX_RANGE_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Range covers {len(months)} months; the maximum is {MAX_RANGE_MONTHS}")
+    
+    params = {
+        "source": request.source,
+        "template_id": request.template_id,
+        "force_overlaps": request.force_overlaps,
+        "weeks_ahead": request.weeks_ahead,
+        "date_window": list(date_window) if date_window else None,
+    }
+    return await job_runner.submit(ROSTER_RANGE_JOB, params, months, dedupe_key=dedupe_key, created_by=created_by)
+
+async def extend_rolling_horizon() -> Optional[dict]:
+    """Queue today's horizon extension if the rolling horizon is enabled; once per day across workers"""
+    settings = await get_cached_settings()
+    if settings.rolling_horizon_weeks <= 0:
+        return None
+    request = RangeGenerationRequest(
+        source="roster_template" if settings.rolling_horizon_template_id else "shift_templates",
+        template_id=settings.rolling_horizon_template_id,
+        weeks_ahead=settings.rolling_horizon_weeks
+    )
+    today = datetime.now().date().isoformat()
+    return await submit_roster_range_job(request, created_by="scheduler", dedupe_key=f"rolling-horizon-{today}")
+
+async def rolling_horizon_scheduler():
+    """Extend the rostered horizon every night at ROLLING_HORIZON_HOUR"""
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=ROLLING_HORIZON_HOUR, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            job = await extend_rolling_horizon()
+            if job:
+                print(f"🌙 Rolling horizon job {job['id']} queued for {', '.join(job['steps'])}")
+        except Exception as e:
+            print(f"❌ Rolling horizon extension failed: {e}")
+
+@app.post("/api/roster/generate-range")
+async def generate_roster_range(request: RangeGenerationRequest, current_user: dict = Depends(get_current_user)):
+    """Queue generation for a month range or a rolling weeks-ahead horizon (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await submit_roster_range_job(request, created_by=current_user["id"])
+
+@app.get("/api/roster/generation-jobs")
+async def get_generation_jobs(limit: int = 20, current_user: dict = Depends(get_current_user)):
+    """Most recent range generation jobs (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await db.jobs.find(
+        {"type": ROSTER_RANGE_JOB}, {"_id": 0}, sort=[("created_at", -1)], limit=min(limit, 100)
+    )
+
+@app.get("/api/roster/generation-jobs/{job_id}")
+async def get_generation_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status and per-month progress of a range generation job (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    job = await db.jobs.find_one({"id": job_id, "type": ROSTER_RANGE_JOB}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return job
+
+@app.post("/api/roster/generation-jobs/{job_id}/cancel")
+async def cancel_generation_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Stop a range generation job after the month in progress (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if not await job_runner.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No queued or running generation job with that id")
+    return {"message": "Cancellation requested; the job stops after the current month", "job_id": job_id}
+
+# Cost forecasts expand templates over a horizon in memory and price them with the batch engine; nothing is written
+@app.get("/api/forecast/cost")
+async def get_cost_forecast(start_date: str, end_date: str, source: str = "shift_templates", template_id: Optional[str] = None,
+                            force_overlaps: bool = False, current_user: dict = Depends(get_current_user)):
+    """Projected wages, NDIS revenue and margin per day, week and month if the horizon were rostered from templates (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        first_day = datetime.strptime(start_date, "%Y-%m-%d")
+        last_day = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if last_day < first_day:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    start_date, end_date = first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d")
+    months = month_range(start_date[:7], end_date[:7])
+    if len(months) > MAX_RANGE_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Range covers {len(months)} months; the maximum is {MAX_RANGE_MONTHS}")
+    
+    if source == "shift_templates":
+        if force_overlaps:
+            raise HTTPException(status_code=400, detail="force_overlaps only applies to roster_template forecasts")
+        templates = await get_cached_shift_templates()
+        plan_month = lambda month, snapshot, make_entry, date_window: plan_month_from_shift_templates(
+            month, templates, snapshot, make_entry, date_window
+        )
+    elif source == "roster_template":
+        template_doc = await db.roster_templates.find_one({"id": template_id, "is_active": True}) if template_id else None
+        if not template_doc:
+            raise HTTPException(status_code=404, detail="Roster template not found")
+        template = RosterTemplate(**template_doc)
+        plan_month = lambda month, snapshot, make_entry, date_window: plan_month_from_roster_template(
+            month, template_id, template, force_overlaps, snapshot, make_entry, date_window
+        )
+    else:
+        raise HTTPException(status_code=400, detail="source must be 'shift_templates' or 'roster_template'")
+    
+    entries, skipped = expand_horizon(start_date, end_date, plan_month)
+    pay_rows, errors = calculate_pay_for_dated_documents(entries, await get_settings_timeline())
+    settings = await get_cached_settings()
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "source": source,
+        "template_id": template_id if source == "roster_template" else None,
+        "first_day_of_week": settings.first_day_of_week,
+        **forecast_totals(entries, pay_rows, settings.first_day_of_week),
+        **skipped,
+        "pricing_errors": len(errors),
+    }
+
+# Roster endpoints
+@app.get("/api/roster")
+async def get_roster(month: str, fields: Optional[str] = None, response_format: Optional[str] = Query(None, alias="format"),
+                     if_none_match: Optional[str] = Header(None), current_user: dict = Depends(get_current_user)):
+    """Get roster for a specific month (YYYY-MM format) with role-based filtering and pay privacy"""
+    fields, response_format = list_options(fields, response_format)
+    
+    # The version is read before the entries, so a write landing in between leaves the ETag older than the body, never newer
+    variant = f"{roster_variant(current_user)}|{response_format}|{','.join(fields or [])}"
+    etag = make_etag("roster", await current_versions(db, [roster_month_key(month)]), variant)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = etag_headers(etag)
+    
+    # Changes are logged after their write, so every change up to this cursor is already in the entries read below
+    headers["X-Roster-Cursor"] = await head_cursor(db)
+    
+    # Get all roster entries for the month (no filtering by staff for staff users anymore), masking pay before projecting
+    roster_entries = await db.roster.aggregate_month(month, [
+        *pay_mask_stages(current_user),
+        {"$project": projection(fields)},
+    ])
+    return list_response(roster_entries, fields, response_format, headers)
+
+@app.get("/api/roster/changes")
+async def get_roster_changes(since: str, month: Optional[str] = None, limit: int = 1000,
+                             current_user: dict = Depends(get_current_user)):
+    """Entries inserted, updated or deleted since a cursor from X-Roster-Cursor or a previous call, with pay privacy"""
+    try:
+        return await changes_since(db, since, month, limit=min(max(limit, 1), 5000),
+                                   entry_stages=pay_mask_stages(current_user, "entry"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/roster")
 async def create_roster_entry(entry: RosterEntry):
-    # Get current settings for pay calculation
-    settings_doc = db.settings.find_one()
-    settings = Settings(**settings_doc) if settings_doc else Settings()
+    check_shift_times(entry)
+    
+    # Get the settings in effect on the shift date for pay calculation
+    settings = await get_settings_for_date(entry.date)
     
     entry.id = str(uuid.uuid4())
     entry = calculate_pay(entry, settings)
     
-    db.roster.insert_one(entry.dict())
+    await db.roster.insert_one(entry.dict())
+    await record_roster_write(db, after=[entry.dict()])
     return entry
 
 @app.put("/api/roster/{entry_id}")
 async def update_roster_entry(entry_id: str, entry: RosterEntry):
+    previous = await db.roster.find_one({"id": entry_id})
+    if not previous:
+        raise HTTPException(status_code=404, detail="Roster entry not found")
+    check_shift_times(entry)
+    
     # Get shift name from template if available
-    shift_name = ""
-    if entry.shift_template_id:
-        template = db.shift_templates.find_one({"id": entry.shift_template_id})
-        if template:
-            shift_name = template.get("name", "")
+    shift_name = entry_shift_name(entry.dict(), await get_cached_shift_template_names())
     
     # Check for overlaps (excluding current entry, allows 2:1 shifts and manual override)
-    if not entry.allow_overlap and check_shift_overlap(entry.date, entry.start_time, entry.end_time, exclude_id=entry_id, shift_name=shift_name):
+    if not entry.allow_overlap and await check_shift_overlap(entry.date, entry.start_time, entry.end_time, exclude_id=entry_id, shift_name=shift_name):
         raise HTTPException(
             status_code=409, 
             detail=f"Updated shift would overlap with existing shift on {entry.date}"
         )
     
-    # Get current settings for pay calculation
-    settings_doc = db.settings.find_one()
-    settings = Settings(**settings_doc) if settings_doc else Settings()
-    
-    entry = calculate_pay(entry, settings)
+    # Only the freeze endpoint changes is_frozen; frozen entries keep their stored pay,
+    # others are priced under the settings in effect on the shift date
+    entry.is_frozen = bool(previous.get("is_frozen"))
+    if entry.is_frozen:
+        for field in PAY_RESULT_FIELDS:
+            if field in previous:
+                setattr(entry, field, previous[field])
+    else:
+        entry = calculate_pay(entry, await get_settings_for_date(entry.date))
     
-    result = db.roster.update_one({"id": entry_id}, {"$set": entry.dict()})
+    result = await db.roster.update_one({"id": entry_id}, {"$set": entry.dict()})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Roster entry not found")
+    await record_roster_write(db, before=[previous], after=[{**previous, **entry.dict()}])
     return entry
 
 @app.delete("/api/roster/{entry_id}")
 async def delete_roster_entry(entry_id: str):
-    result = db.roster.delete_one({"id": entry_id})
+    previous = await db.roster.find_one({"id": entry_id})
+    result = await db.roster.delete_one({"id": entry_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Roster entry not found")
+    await record_roster_write(db, before=[previous])
     return {"message": "Roster entry deleted"}
 
+MIGRATE_NDIS_JOB = "migrate_ndis_charges"
+MIGRATE_NDIS_CHUNK = 2000
+
+# Unfrozen entries that never got NDIS charges, or got empty ones
+MIGRATE_NDIS_QUERY = {
+    "is_frozen": {"$ne": True},
+    "$or": [
+        {"ndis_total_charge": {"$exists": False}},
+        {"ndis_total_charge": 0},
+        {"ndis_line_item_code": {"$exists": False}},
+        {"ndis_line_item_code": {"$in": [None, ""]}},
+    ],
+}
+
+async def migrate_ndis_chunk(chunk: List[Dict], settings_timeline: SettingsTimeline) -> Tuple[int, List[str]]:
+    """Reprice one chunk of entries with the batch engine and write it back with one bulk write"""
+    pay_rows, parse_errors = calculate_pay_for_dated_documents(chunk, settings_timeline)
+    failed_rows = {row for row, _ in parse_errors}
+    errors = [f"Entry {chunk[row].get('id', 'unknown')}: {error}" for row, error in parse_errors]
+    
+    updates = [
+        UpdateOne({"_id": entry_doc["_id"]}, {"$set": pay_rows[row]})
+        for row, entry_doc in enumerate(chunk) if row not in failed_rows
+    ]
+    if updates:
+        await db.roster.bulk_write(updates, ordered=False)
+        await record_roster_write(
+            db,
+            before=[entry_doc for row, entry_doc in enumerate(chunk) if row not in failed_rows],
+            after=[{**entry_doc, **pay_rows[row]} for row, entry_doc in enumerate(chunk) if row not in failed_rows]
+        )
+    return len(updates), errors
+
+async def run_migrate_ndis_job(ctx: JobContext):
+    """Recalculate pay and NDIS charges for entries missing them, streaming a vectorised chunk at a time"""
+    settings_timeline = await load_settings_timeline()
+    
+    total = await db.roster.count_documents(MIGRATE_NDIS_QUERY)
+    await ctx.progress(0, total=total)
+    
+    processed = updated_count = 0
+    errors: List[str] = []
+    chunk: List[Dict] = []
+    async for entry_doc in db.roster.cursor(MIGRATE_NDIS_QUERY, batch_size=MIGRATE_NDIS_CHUNK):
+        chunk.append(entry_doc)
+        if len(chunk) < MIGRATE_NDIS_CHUNK:
+            continue
+        await ctx.check_cancelled()
+        chunk_updated, chunk_errors = await migrate_ndis_chunk(chunk, settings_timeline)
+        processed += len(chunk)
+        updated_count += chunk_updated
+        errors.extend(chunk_errors)
+        chunk = []
+        await ctx.progress(processed)
+    if chunk:
+        chunk_updated, chunk_errors = await migrate_ndis_chunk(chunk, settings_timeline)
+        processed += len(chunk)
+        updated_count += chunk_updated
+        errors.extend(chunk_errors)
+        await ctx.progress(processed)
+    
+    return {
+        "message": f"NDIS charge migration completed",
+        "entries_updated": updated_count,
+        "total_entries": total,
+        "errors": errors
+    }
+
+job_runner.register(MIGRATE_NDIS_JOB, run_migrate_ndis_job, concurrency=1)
+
 @app.post("/api/admin/migrate-ndis-charges")
 async def migrate_ndis_charges_to_existing_entries(current_user: dict = Depends(get_current_user)):
-    """Migrate NDIS charge calculations to existing roster entries"""
+    """Queue the NDIS charge migration for existing roster entries; poll /api/jobs/{job_id} for the result"""
     # Admin only endpoint
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Get current settings
-    settings_doc = db.settings.find_one()
-    settings = Settings(**settings_doc) if settings_doc else Settings()
+    job = await job_runner.submit(MIGRATE_NDIS_JOB, {}, created_by=current_user["id"])
+    return {"message": "NDIS charge migration queued", "job_id": job["id"], "status": job["status"]}
+
+@app.post("/api/admin/migrate-roster-date-keys")
+async def migrate_roster_date_keys(current_user: dict = Depends(get_current_user)):
+    """Backfill month/week bucket keys on roster entries (resumable)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Find all roster entries that don't have NDIS fields or have zero values
-    roster_entries = list(db.roster.find())
-    updated_count = 0
-    errors = []
+    return await backfill_roster_date_keys(db)
+
+@app.get("/api/admin/cache-stats")
+async def cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit/miss counters for the auth session cache, reference data cache and pay memo"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    for entry_doc in roster_entries:
-        try:
-            # Check if entry needs NDIS migration
-            needs_migration = (
-                "ndis_total_charge" not in entry_doc or 
-                entry_doc.get("ndis_total_charge", 0) == 0 or
-                not entry_doc.get("ndis_line_item_code")
-            )
-            
-            if needs_migration:
-                # Convert to RosterEntry object
-                roster_entry = RosterEntry(**entry_doc)
-                
-                # Recalculate pay (including NDIS charges)
-                roster_entry = calculate_pay(roster_entry, settings)
-                
-                # Update in database
-                db.roster.update_one(
-                    {"id": roster_entry.id}, 
-                    {"$set": roster_entry.dict()}
-                )
-                updated_count += 1
-                
-        except Exception as e:
-            errors.append(f"Entry {entry_doc.get('id', 'unknown')}: {str(e)}")
+    return {
+        "auth_sessions": session_cache.stats(),
+        "reference_data": reference_cache.stats(),
+        "pay_results": pay_memo.stats(),
+        "event_hub": event_hub.stats()
+    }
+
+@app.get("/api/admin/index-audit")
+async def index_audit(current_user: dict = Depends(get_current_user)):
+    """Reconcile registered indexes and explain each hot query shape, flagging collection scans"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    index_report = await reconcile_indexes(db)
+    query_plans = await audit_query_plans(db)
+    collscans = [plan["query"] for plan in query_plans if plan["collscan"]]
     
     return {
-        "message": f"NDIS charge migration completed",
-        "entries_updated": updated_count,
-        "total_entries": len(roster_entries),
-        "errors": errors
+        "indexes": index_report,
+        "query_plans": query_plans,
+        "collscan_queries": collscans,
+        "healthy": not collscans
     }
 
+@app.get("/api/admin/pay-engine/verify")
+async def verify_pay_engine(month: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Check the batch pay engine is bit-identical to calculate_pay on the regression corpus (and a month's roster)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    def verify(entry_docs: List[Dict], settings: Settings) -> Dict:
+        is_holiday = lambda date_str: is_public_holiday_date(date_str, settings)
+        rules = compile_rules(settings)
+        # Bypasses the pay memo so both engines really compute every entry
+        scalar_pay = lambda entry_doc: evaluate_pay(rules, RosterEntry(**entry_doc).dict(), is_holiday)
+        return verify_against_scalar(entry_docs, scalar_pay, rules, is_holiday)
+    
+    settings_timeline = await get_settings_timeline()
+    result = {"regression_corpus": verify(regression_corpus(), await get_cached_settings())}
+    if month:
+        # Each entry is checked under the settings version in effect on its date, as it is priced
+        roster_entries = await db.roster.find_month(month, {"_id": 0})
+        result["roster"] = merge_verifications([
+            verify([roster_entries[position] for position in positions], settings)
+            for settings, positions in settings_timeline.partition(roster_entries)
+        ])
+    return result
+
 # Settings endpoints
 @app.get("/api/settings")
-async def get_settings():
-    settings_doc = db.settings.find_one({}, {"_id": 0})
-    return settings_doc if settings_doc else Settings().dict()
+async def get_settings(response: Response, if_none_match: Optional[str] = Header(None)):
+    # The settings in effect change at midnight when a dated version starts, so the day is part of the representation
+    etag = await reference_etag("settings", "settings", "settings_versions", variant=datetime.now().date().isoformat())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return (await get_cached_settings()).dict()
+
+RECOMPUTE_PAY_JOB = "recompute_pay"
+RECOMPUTE_BATCH_SIZE = 500
+
+async def recompute_pay_batch(entry_docs: List[Dict], settings: Settings) -> Tuple[int, List[str]]:
+    """Reprice a batch of entries and write back only the rows whose pay changed"""
+    pay_rows, parse_errors = calculate_pay_for_documents(entry_docs, settings)
+    failed_rows = {row for row, _ in parse_errors}
+    changed_rows = [
+        row for row, entry_doc in enumerate(entry_docs)
+        if row not in failed_rows and any(entry_doc.get(field) != value for field, value in pay_rows[row].items())
+    ]
+    if changed_rows:
+        await db.roster.bulk_write(
+            [UpdateOne({"_id": entry_docs[row]["_id"]}, {"$set": pay_rows[row]}) for row in changed_rows],
+            ordered=False
+        )
+        await record_roster_write(
+            db,
+            before=[entry_docs[row] for row in changed_rows],
+            after=[{**entry_docs[row], **pay_rows[row]} for row in changed_rows]
+        )
+    return len(changed_rows), [f"Entry {entry_docs[row].get('id', 'unknown')}: {error}" for row, error in parse_errors]
+
+async def recompute_dated_pay_batch(entry_docs: List[Dict], settings_timeline: SettingsTimeline) -> Tuple[int, List[str]]:
+    """recompute_pay_batch with each entry priced under the settings in effect on its date"""
+    updated = 0
+    errors: List[str] = []
+    for settings, positions in settings_timeline.partition(entry_docs):
+        group_updated, group_errors = await recompute_pay_batch([entry_docs[position] for position in positions], settings)
+        updated += group_updated
+        errors.extend(group_errors)
+    return updated, errors
+
+async def run_recompute_pay_job(ctx: JobContext):
+    """Stream the entries a settings version or holiday change affects through the batch pay engine, a cursor batch at a time"""
+    params = ctx.params
+    settings_timeline = await load_settings_timeline()
+    if params.get("dates"):
+        # A holiday added or removed: its date plus the day before, for overnight shifts ending on it
+        until = None
+        query = {"date": {"$in": params["dates"]}, "is_frozen": {"$ne": True}}
+    else:
+        until = settings_timeline.next_change_after(params["effective_from"])
+        query = recompute_query(params["effective_from"], until, params["changed_fields"])
+    
+    total = await db.roster.count_documents(query)
+    await ctx.progress(0, total=total)
+    
+    processed = updated = 0
+    errors: List[str] = []
+    batch: List[Dict] = []
+    async for entry_doc in db.roster.cursor(query, batch_size=RECOMPUTE_BATCH_SIZE):
+        batch.append(entry_doc)
+        if len(batch) < RECOMPUTE_BATCH_SIZE:
+            continue
+        await ctx.check_cancelled()
+        batch_updated, batch_errors = await recompute_dated_pay_batch(batch, settings_timeline)
+        processed += len(batch)
+        updated += batch_updated
+        errors.extend(batch_errors)
+        batch = []
+        await ctx.progress(processed)
+    if batch:
+        batch_updated, batch_errors = await recompute_dated_pay_batch(batch, settings_timeline)
+        processed += len(batch)
+        updated += batch_updated
+        errors.extend(batch_errors)
+        await ctx.progress(processed)
+    
+    if params.get("dates"):
+        print(f"💲 Holiday {params['holiday_date']}: repriced {updated} of {processed} entries")
+        return {
+            "holiday_date": params["holiday_date"],
+            "dates": params["dates"],
+            "entries_checked": processed,
+            "entries_updated": updated,
+            "errors": errors
+        }
+    print(f"💲 Settings version {params['version']}: repriced {updated} of {processed} entries from {params['effective_from']}")
+    return {
+        "version": params["version"],
+        "effective_from": params["effective_from"],
+        "until": until,
+        "entries_checked": processed,
+        "entries_updated": updated,
+        "errors": errors
+    }
+
+job_runner.register(RECOMPUTE_PAY_JOB, run_recompute_pay_job, concurrency=1, max_attempts=3, backoff_seconds=60)
+
+SETTINGS_VERSION_ATTEMPTS = 3
+
+async def ensure_first_settings_version():
+    """Record the settings used so far as version 1, covering every earlier date, unless a version already exists"""
+    first_version = {
+        "id": str(uuid.uuid4()),
+        "effective_from": BEGINNING_OF_TIME,
+        "settings": (await get_stored_settings()).dict(),
+        "changed_fields": [],
+        "created_at": datetime.utcnow()
+    }
+    try:
+        await db.settings_versions.update_one({"version": 1}, {"$setOnInsert": first_version}, upsert=True)
+    except DuplicateKeyError:
+        # Two first saves raced to upsert version 1; the other one recorded it
+        pass
 
 @app.put("/api/settings")
-async def update_settings(settings: Settings):
-    db.settings.update_one({}, {"$set": settings.dict()}, upsert=True)
+async def update_settings(settings: Settings, effective_from: Optional[str] = None):
+    """Save settings as a new version; pay changes are recomputed in the background from effective_from (default today)"""
+    effective_from = effective_from or datetime.now().date().isoformat()
+    try:
+        datetime.strptime(effective_from, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="effective_from must be YYYY-MM-DD")
+    if settings.holiday_state is not None:
+        settings.holiday_state = settings.holiday_state.upper()
+        if settings.holiday_state not in AU_STATES:
+            raise HTTPException(status_code=400, detail=f"Unknown holiday_state. Use one of: {', '.join(AU_STATES)}")
+    
+    settings_timeline = await load_settings_timeline()
+    await ensure_first_settings_version()
+    
+    changed_fields = changed_pay_fields(settings_timeline.for_date(effective_from).dict(), settings.dict())
+    version_doc = {
+        "id": str(uuid.uuid4()),
+        "effective_from": effective_from,
+        "settings": settings.dict(),
+        "changed_fields": changed_fields,
+        "created_at": datetime.utcnow()
+    }
+    # A concurrent save can take the next version number first; retry on the one after it
+    for _ in range(SETTINGS_VERSION_ATTEMPTS):
+        latest = await db.settings_versions.find({}, {"_id": 0, "version": 1}, sort=[("version", -1)], limit=1)
+        version = latest[0]["version"] + 1
+        try:
+            await db.settings_versions.insert_one(dict(version_doc, version=version))
+            break
+        except DuplicateKeyError:
+            continue
+    else:
+        raise HTTPException(status_code=409, detail="Settings were changed at the same time; reload and try again")
+    
+    # Settings effective from a later date stay in the timeline only until that day comes
+    if effective_from <= datetime.now().date().isoformat():
+        await db.settings.update_one({}, {"$set": settings.dict()}, upsert=True)
+    await reference_data_changed("settings", "settings_versions")
+    
+    if changed_fields:
+        job = await job_runner.submit(RECOMPUTE_PAY_JOB, {
+            "version": version,
+            "effective_from": effective_from,
+            "changed_fields": changed_fields
+        })
+        await db.settings_versions.update_one({"id": version_doc["id"]}, {"$set": {"recompute_job_id": job["id"]}})
     return settings
 
+@app.get("/api/settings/versions")
+async def get_settings_versions(current_user: dict = Depends(get_current_user)):
+    """Settings versions, newest first, with the recompute job each pay change queued (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await db.settings_versions.find({}, {"_id": 0}, sort=[("version", -1)])
+
+@app.post("/api/roster/freeze")
+async def freeze_roster_entries(through_date: str, frozen: bool = True, current_user: dict = Depends(get_current_user)):
+    """Freeze (or unfreeze) pay on every entry up to and including a date, e.g. after payroll (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    try:
+        datetime.strptime(through_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="through_date must be YYYY-MM-DD")
+    
+    result = await db.roster.update_many({"date": {"$lte": through_date}}, {"$set": {"is_frozen": frozen}})
+    if result.modified_count:
+        await invalidate_roster_months(db, [month for month in await roster_months() if month <= through_date[:7]])
+    action = "Froze" if frozen else "Unfroze"
+    return {"message": f"{action} {result.modified_count} roster entries through {through_date}", "modified_count": result.modified_count}
+
 # Generate monthly roster
 @app.post("/api/generate-roster/{month}")
 async def generate_monthly_roster(month: str):
     """Generate roster entries for a month based on shift templates"""
-    year, month_num = map(int, month.split("-"))
-    
-    # Get shift templates
-    templates = list(db.shift_templates.find())
+    templates = await get_cached_shift_templates()
+    settings_timeline = await get_settings_timeline()
     
-    # Generate entries for each day of the month
-    from calendar import monthrange
-    _, days_in_month = monthrange(year, month_num)
-    
-    entries_created = 0
-    for day in range(1, days_in_month + 1):
-        date_obj = datetime(year, month_num, day)
-        date_str = date_obj.strftime("%Y-%m-%d")
-        day_of_week = date_obj.weekday()  # 0=Monday
-        
-        # Find templates for this day of week
-        day_templates = [t for t in templates if t["day_of_week"] == day_of_week]
-        
-        for template in day_templates:
-            # Check if entry already exists
-            existing = db.roster.find_one({
-                "date": date_str,
-                "shift_template_id": template["id"]
-            })
-            
-            if not existing:
-                entry = RosterEntry(
-                    id=str(uuid.uuid4()),
-                    date=date_str,
-                    shift_template_id=template["id"],
-                    start_time=template["start_time"],
-                    end_time=template["end_time"],
-                    is_sleepover=template["is_sleepover"]
-                )
-                
-                # Calculate pay
-                settings_doc = db.settings.find_one()
-                settings = Settings(**settings_doc) if settings_doc else Settings()
-                entry = calculate_pay(entry, settings)
-                
-                db.roster.insert_one(entry.dict())
-                entries_created += 1
+    snapshot = await load_month_snapshot(db, month)
+    plan = plan_month_from_shift_templates(month, templates, snapshot, roster_entry_factory(settings_timeline))
+    entries_created = await plan.commit(db)
     
     return {"message": f"Generated {entries_created} roster entries for {month}"}
 
@@ -2618,41 +2942,124 @@ async def generate_monthly_roster(month: str):
 @app.delete("/api/roster/month/{month}")
 async def clear_monthly_roster(month: str):
     """Clear all roster entries for a specific month"""
-    result = db.roster.delete_many({"date": {"$regex": f"^{month}"}})
+    result = await db.roster.delete_month(month)
+    await db.roster_month_summary.delete_many({"month": month})
+    await invalidate_roster_months(db, [month])
     return {"message": f"Deleted {result.deleted_count} roster entries for {month}"}
 
+# Month summary endpoints
+REBUILD_SUMMARY_JOB = "rebuild_month_summaries"
+
+async def roster_months() -> List[str]:
+    """Every month that has roster entries"""
+    groups = await db.roster.aggregate([{"$group": {"_id": "$month"}}])
+    return sorted(group["_id"] for group in groups if group["_id"])
+
+async def run_rebuild_summaries_job(ctx: JobContext):
+    """Rebuild month summaries from roster entries, one month per step"""
+    for month in ctx.pending_steps():
+        await ctx.check_cancelled()
+        await ctx.step_done(month, {"summaries": await rebuild_month(db, month)})
+
+job_runner.register(REBUILD_SUMMARY_JOB, run_rebuild_summaries_job, concurrency=1, max_attempts=3, backoff_seconds=60)
+
+@app.get("/api/roster/summary/{month}")
+async def get_roster_month_summary(month: str, current_user: dict = Depends(get_current_user)):
+    """Per-staff hours, pay and NDIS totals for a month, read from the maintained summaries"""
+    query = {"month": month, "count": {"$gt": 0}}
+    if current_user["role"] == "staff":
+        query["staff_id"] = current_user.get("staff_id") or current_user.get("id")
+    
+    staff_totals = {}
+    for row in await db.roster_month_summary.find(query, {"_id": 0}):
+        staff_id = row.get("staff_id")
+        totals = staff_totals.setdefault(staff_id, dict(
+            {"staff_id": staff_id, "staff_name": row.get("staff_name") if staff_id else "Unassigned", "by_shift_type": {}},
+            **dict.fromkeys(SUMMARY_FIELDS, 0)
+        ))
+        if staff_id and row.get("staff_name"):
+            totals["staff_name"] = row["staff_name"]
+        totals["by_shift_type"][row["shift_type"]] = {field: round(row.get(field, 0), 2) for field in SUMMARY_FIELDS}
+        for field in SUMMARY_FIELDS:
+            totals[field] += row.get(field, 0)
+    
+    staff_rows = sorted(staff_totals.values(), key=lambda totals: (totals["staff_id"] is None, (totals["staff_name"] or "").lower()))
+    grand_totals = {field: round(sum(totals[field] for totals in staff_rows), 2) for field in SUMMARY_FIELDS}
+    for totals in staff_rows:
+        for field in SUMMARY_FIELDS:
+            totals[field] = round(totals[field], 2)
+    return {"month": month, "staff": staff_rows, "totals": grand_totals}
+
+@app.get("/api/timesheets")
+async def get_timesheets(start: str, periods: int = 1, period: str = "fortnight", staff_id: Optional[str] = None,
+                         current_user: dict = Depends(get_current_user)):
+    """Per-staff hours by shift type, base pay, sleepover allowances and totals for consecutive pay periods"""
+    settings = await get_cached_settings()
+    try:
+        pay_period_ranges = pay_periods(start, periods, period, settings.first_day_of_week)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Staff only get their own timesheet
+    viewer_staff_id = pay_viewer(current_user)
+    if viewer_staff_id is not None:
+        staff_id = viewer_staff_id
+    
+    return {
+        "period": period,
+        "first_day_of_week": settings.first_day_of_week,
+        "periods": await load_timesheets(db, pay_period_ranges, staff_id),
+    }
+
+@app.post("/api/admin/roster-summary/rebuild")
+async def rebuild_roster_summaries(month: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Rebuild one month's summaries now, or queue a rebuild of every month (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if month:
+        return {"month": month, "summaries": await rebuild_month(db, month)}
+    job = await job_runner.submit(REBUILD_SUMMARY_JOB, {}, await roster_months(), created_by=current_user["id"])
+    return {"message": "Summary rebuild queued", "job_id": job["id"], "months": job["steps"]}
+
+@app.get("/api/admin/roster-summary/verify")
+async def verify_roster_summaries(month: str, current_user: dict = Depends(get_current_user)):
+    """Check a month's maintained summaries against totals recomputed from its entries (Admin only)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await verify_month(db, month)
+
 @app.post("/api/roster/add-shift")
 async def add_individual_shift(entry: RosterEntry):
     """Add a single shift to the roster with overlap detection (allows 2:1 shifts and manual override)"""
+    check_shift_times(entry)
+    
     # Get shift name from template if available
-    shift_name = ""
-    if entry.shift_template_id:
-        template = db.shift_templates.find_one({"id": entry.shift_template_id})
-        if template:
-            shift_name = template.get("name", "")
+    shift_name = entry_shift_name(entry.dict(), await get_cached_shift_template_names())
     
     # Check for overlaps (allows 2:1 shifts to overlap, or if allow_overlap is explicitly set)
-    if not entry.allow_overlap and check_shift_overlap(entry.date, entry.start_time, entry.end_time, shift_name=shift_name):
+    if not entry.allow_overlap and await check_shift_overlap(entry.date, entry.start_time, entry.end_time, shift_name=shift_name):
         raise HTTPException(
             status_code=409, 
             detail=f"Shift overlaps with existing shift on {entry.date} from {entry.start_time} to {entry.end_time}. Use 'Allow Overlap' option for 2:1 shifts."
         )
     
-    # Get current settings for pay calculation
-    settings_doc = db.settings.find_one()
-    settings = Settings(**settings_doc) if settings_doc else Settings()
+    # Get the settings in effect on the shift date for pay calculation
+    settings = await get_settings_for_date(entry.date)
     
     entry.id = str(uuid.uuid4())
     entry = calculate_pay(entry, settings)
     
-    db.roster.insert_one(entry.dict())
+    await db.roster.insert_one(entry.dict())
+    await record_roster_write(db, after=[entry.dict()])
     return entry
 
 # Authentication endpoints
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
     """Authenticate user with username and PIN"""
-    user = db.users.find_one({"username": request.username, "is_active": True})
+    user = await db.users.find_one({"username": request.username, "is_active": True})
     if not user or not verify_pin(request.pin, user["pin_hash"]):
         raise HTTPException(status_code=401, detail="Invalid username or PIN")
     
@@ -2666,10 +3073,10 @@ async def login(request: LoginRequest):
         expires_at=datetime.utcnow() + timedelta(hours=8)  # 8-hour session
     )
     
-    db.sessions.insert_one(session.dict())
+    await db.sessions.insert_one(session.dict())
     
     # Update last login
-    db.users.update_one(
+    await db.users.update_one(
         {"id": user["id"]},
         {"$set": {"last_login": datetime.utcnow()}}
     )
@@ -2694,10 +3101,12 @@ async def change_pin(request: ChangePinRequest, user: dict = Depends(get_current
         raise HTTPException(status_code=400, detail="PIN must be 4 or 6 digits")
     
     new_pin_hash = hash_pin(request.new_pin)
-    db.users.update_one(
+    await db.users.update_one(
         {"id": user["id"]},
         {"$set": {"pin_hash": new_pin_hash, "is_first_login": False}}
     )
+    await reference_data_changed("login_users")
+    session_cache.invalidate_user(user["id"])
     
     return {"message": "PIN changed successfully"}
 
@@ -2717,7 +3126,7 @@ async def change_user_pin(new_pin_data: dict, current_user: dict = Depends(get_c
     new_pin_hash = hash_pin(new_pin)
     
     # Update user PIN and mark as not first-time login
-    result = db.users.update_one(
+    result = await db.users.update_one(
         {"id": current_user["id"]},
         {"$set": {
             "pin": new_pin,  # Store plain PIN for display (in production, consider removing)
@@ -2726,6 +3135,8 @@ async def change_user_pin(new_pin_data: dict, current_user: dict = Depends(get_c
             "updated_at": datetime.utcnow()
         }}
     )
+    await reference_data_changed("login_users")
+    session_cache.invalidate_user(current_user["id"])
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -2745,7 +3156,7 @@ async def admin_reset_user_pin(reset_data: dict, current_user: dict = Depends(ge
         raise HTTPException(status_code=400, detail="User ID is required")
     
     # Find the target user
-    target_user = db.users.find_one({"id": target_user_id})
+    target_user = await db.users.find_one({"id": target_user_id})
     if not target_user:
         raise HTTPException(status_code=404, detail="Target user not found")
     
@@ -2759,7 +3170,7 @@ async def admin_reset_user_pin(reset_data: dict, current_user: dict = Depends(ge
     default_pin_hash = hash_pin(default_pin)
     
     # Reset user PIN to default
-    result = db.users.update_one(
+    result = await db.users.update_one(
         {"id": target_user_id},
         {"$set": {
             "pin": default_pin,
@@ -2768,6 +3179,8 @@ async def admin_reset_user_pin(reset_data: dict, current_user: dict = Depends(ge
             "updated_at": datetime.utcnow()
         }}
     )
+    await reference_data_changed("login_users")
+    session_cache.invalidate_user(target_user_id)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Failed to reset PIN")
@@ -2781,7 +3194,7 @@ async def admin_reset_user_pin(reset_data: dict, current_user: dict = Depends(ge
 @app.post("/api/auth/reset-pin")
 async def reset_pin(request: ResetPinRequest):
     """Request PIN reset via email"""
-    user = db.users.find_one({"username": request.username, "email": request.email, "is_active": True})
+    user = await db.users.find_one({"username": request.username, "email": request.email, "is_active": True})
     if not user:
         raise HTTPException(status_code=404, detail="User not found with provided username and email")
     
@@ -2790,10 +3203,12 @@ async def reset_pin(request: ResetPinRequest):
     temp_pin_hash = hash_pin(temp_pin)
     
     # Update user with temporary PIN
-    db.users.update_one(
+    await db.users.update_one(
         {"id": user["id"]},
         {"$set": {"pin_hash": temp_pin_hash, "is_first_login": True}}
     )
+    await reference_data_changed("login_users")
+    session_cache.invalidate_user(user["id"])
     
     # Send reset email
     send_reset_email(request.email, temp_pin)
@@ -2811,21 +3226,21 @@ async def admin_reset_pin(request: dict, current_user: dict = Depends(get_curren
         raise HTTPException(status_code=400, detail="Email is required")
     
     # Try to find user by email first, then by generated email pattern
-    user = db.users.find_one({"email": email, "is_active": True})
+    user = await db.users.find_one({"email": email, "is_active": True})
     
     # If not found and email looks like generated email, try to find by staff name
     if not user and "@company.com" in email:
         # Extract staff name from generated email pattern
         staff_name_pattern = email.split("@")[0]
         # Find staff member by name pattern
-        staff_member = db.staff.find_one({"active": True})
+        staff_member = await db.staff.find_one({"active": True})
         if staff_member:
-            staff_names = list(db.staff.find({"active": True}))
+            staff_names = await db.staff.find({"active": True})
             for staff in staff_names:
                 generated_email = f"{staff['name'].lower().replace(' ', '')}@company.com"
                 if generated_email == email:
                     # Create a user account for this staff member if it doesn't exist
-                    existing_user = db.users.find_one({"staff_id": staff["id"]}) 
+                    existing_user = await db.users.find_one({"staff_id": staff["id"]}) 
                     if not existing_user:
                         # Create user account for staff member with default staff PIN
                         new_user = User(
@@ -2840,7 +3255,7 @@ async def admin_reset_pin(request: dict, current_user: dict = Depends(get_curren
                             created_at=datetime.utcnow(),
                             is_first_login=True  # Staff must change PIN on first login
                         )
-                        db.users.insert_one(new_user.dict())
+                        await db.users.insert_one(new_user.dict())
                         user = new_user.dict()
                     else:
                         user = existing_user
@@ -2868,10 +3283,13 @@ async def admin_reset_pin(request: dict, current_user: dict = Depends(get_curren
     if user.get("role") != "admin":
         update_data["is_first_login"] = True
     
-    db.users.update_one(
+    await db.users.update_one(
         {"id": user["id"]},
         {"$set": update_data}
     )
+    # Also covers a staff user account created above
+    await reference_data_changed("login_users")
+    session_cache.invalidate_user(user["id"])
     
     return {
         "message": "PIN reset successful",
@@ -2884,10 +3302,11 @@ async def admin_reset_pin(request: dict, current_user: dict = Depends(get_curren
 @app.get("/api/auth/logout")
 async def logout(token: str):
     """Logout user and invalidate session"""
-    db.sessions.update_one(
+    await db.sessions.update_one(
         {"token": token},
         {"$set": {"is_active": False}}
     )
+    session_cache.invalidate_token(token)
     return {"message": "Logged out successfully"}
 
 # User management endpoints
@@ -2908,41 +3327,26 @@ async def update_current_user_profile(profile_data: dict, current_user: dict = D
         raise HTTPException(status_code=400, detail="No valid fields to update")
     
     # Update user in database
-    result = db.users.update_one(
+    result = await db.users.update_one(
         {"id": current_user["id"]},
         {"$set": update_data}
     )
+    await reference_data_changed("login_users")
+    session_cache.invalidate_user(current_user["id"])
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Return updated user data
-    updated_user = db.users.find_one({"id": current_user["id"]}, {"_id": 0, "pin_hash": 0})
+    updated_user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "pin_hash": 0})
     return updated_user
 
 @app.get("/api/users/login")
 async def get_login_users():
     """Get available users for login dropdown (public endpoint)"""
     try:
-        # Get only active users with basic info needed for login
-        users = list(db.users.find(
-            {"is_active": True},
-            {
-                "_id": 0,
-                "id": 1,
-                "username": 1, 
-                "role": 1,
-                "first_name": 1,
-                "last_name": 1,
-                "is_first_login": 1
-                # Exclude pin and pin_hash for security
-            }
-        ))
-        
-        # Sort admin users first
-        users.sort(key=lambda x: (x.get("role") != "admin", x.get("username", "")))
-        
-        return users
+        # Get only active users with basic info needed for login, admin users first
+        return await get_cached_login_users()
     except Exception as e:
         print(f"Error fetching login users: {e}")
         # Return fallback admin user
@@ -2963,7 +3367,7 @@ async def get_users(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = list(db.users.find({}, {"_id": 0, "pin_hash": 0}))
+    users = await db.users.find({}, {"_id": 0, "pin_hash": 0})
     return users
 
 @app.post("/api/users")
@@ -2973,7 +3377,7 @@ async def create_user(user_data: dict, current_user: dict = Depends(get_current_
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if username already exists
-    existing_user = db.users.find_one({"username": user_data["username"]})
+    existing_user = await db.users.find_one({"username": user_data["username"]})
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     
@@ -3000,7 +3404,8 @@ async def create_user(user_data: dict, current_user: dict = Depends(get_current_
         is_first_login=requires_pin_change
     )
     
-    db.users.insert_one(new_user.dict())
+    await db.users.insert_one(new_user.dict())
+    await reference_data_changed("login_users")
     
     # Remove sensitive data from response
     user_response = {k: v for k, v in new_user.dict().items() if k != "pin_hash"}
@@ -3058,18 +3463,29 @@ async def search_addresses(q: str, limit: int = 5):
 # Shift Request and Availability API Endpoints
 
 @app.get("/api/unassigned-shifts")
-async def get_unassigned_shifts(current_user: dict = Depends(get_current_user)):
+async def get_unassigned_shifts(fields: Optional[str] = None, response_format: Optional[str] = Query(None, alias="format"),
+                                current_user: dict = Depends(get_current_user)):
     """Get all unassigned shifts (shifts without staff assigned)"""
-    unassigned_shifts = list(db.roster.find({
+    fields, response_format = list_options(fields, response_format)
+    unassigned_shifts = await db.roster.find({
         "$or": [
             {"staff_id": None},
             {"staff_id": ""},
             {"staff_name": None},
             {"staff_name": ""}
         ]
-    }, {"_id": 0}))
+    }, projection(fields, required=["date", "start_time"]))
     
-    return sorted(unassigned_shifts, key=lambda x: (x['date'], x['start_time']))
+    unassigned_shifts.sort(key=lambda x: (x['date'], x['start_time']))
+    return list_response(unassigned_shifts, fields, response_format)
+
+async def publish_shift_request_event(shift_request: dict):
+    """Tell admins and the requesting staff member that a shift request changed"""
+    await publish(db, "shift_requests", {
+        "id": shift_request.get("id"),
+        "status": shift_request.get("status"),
+        "roster_entry_id": shift_request.get("roster_entry_id"),
+    }, audience(roles=["admin"], staff_ids=[shift_request.get("staff_id")]))
 
 @app.get("/api/shift-requests")
 async def get_shift_requests(current_user: dict = Depends(get_current_user)):
@@ -3078,7 +3494,7 @@ async def get_shift_requests(current_user: dict = Depends(get_current_user)):
     if current_user["role"] == "staff":
         query["staff_id"] = current_user.get("staff_id", current_user["id"])
     
-    shift_requests = list(db.shift_requests.find(query, {"_id": 0}))
+    shift_requests = await db.shift_requests.find(query, {"_id": 0})
     return sorted(shift_requests, key=lambda x: x.get('request_date', datetime.min), reverse=True)
 
 @app.post("/api/shift-requests")
@@ -3088,7 +3504,7 @@ async def create_shift_request(request: ShiftRequest, current_user: dict = Depen
         raise HTTPException(status_code=403, detail="Only staff can create shift requests")
     
     # Check if shift exists and is unassigned
-    roster_entry = db.roster.find_one({"id": request.roster_entry_id})
+    roster_entry = await db.roster.find_one({"id": request.roster_entry_id})
     if not roster_entry:
         raise HTTPException(status_code=404, detail="Shift not found")
     
@@ -3096,7 +3512,7 @@ async def create_shift_request(request: ShiftRequest, current_user: dict = Depen
         raise HTTPException(status_code=400, detail="Shift is already assigned")
     
     # Check for existing request from same staff for same shift
-    existing_request = db.shift_requests.find_one({
+    existing_request = await db.shift_requests.find_one({
         "roster_entry_id": request.roster_entry_id,
         "staff_id": current_user.get("staff_id", current_user["id"]),
         "status": {"$in": ["pending", "approved"]}
@@ -3111,7 +3527,8 @@ async def create_shift_request(request: ShiftRequest, current_user: dict = Depen
     request.request_date = datetime.utcnow()
     request.created_at = datetime.utcnow()
     
-    db.shift_requests.insert_one(request.dict())
+    await db.shift_requests.insert_one(request.dict())
+    await publish_shift_request_event(request.dict())
     
     # Send email notification to admin
     try:
@@ -3123,14 +3540,13 @@ async def create_shift_request(request: ShiftRequest, current_user: dict = Depen
             request_notes=request.notes
         )
         
-        # Schedule email sending to admin (async)
-        import asyncio
-        asyncio.create_task(send_email_notification(
+        # Schedule email sending to admin (queued job)
+        await queue_email_notification(
             to_email=EMAIL_CONFIG["admin_email"],
             subject=f"🔔 New Shift Request from {request.staff_name} - Workforce Management",
             html_content=html_content,
             text_content=text_content
-        ))
+        )
     except Exception as e:
         print(f"⚠️ Admin email notification failed: {str(e)}")
     
@@ -3143,7 +3559,7 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Find the request
-    shift_request = db.shift_requests.find_one({"id": request_id})
+    shift_request = await db.shift_requests.find_one({"id": request_id})
     if not shift_request:
         raise HTTPException(status_code=404, detail="Shift request not found")
     
@@ -3151,7 +3567,7 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
         raise HTTPException(status_code=400, detail="Request is not pending")
     
     # Check if shift is still unassigned
-    roster_entry = db.roster.find_one({"id": shift_request["roster_entry_id"]})
+    roster_entry = await db.roster.find_one({"id": shift_request["roster_entry_id"]})
     if not roster_entry:
         raise HTTPException(status_code=404, detail="Shift no longer exists")
     
@@ -3159,7 +3575,7 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
         raise HTTPException(status_code=400, detail="Shift has already been assigned")
     
     # Check for availability conflicts
-    availability_conflicts = check_availability_conflicts(
+    availability_conflicts = await check_availability_conflicts(
         shift_request["staff_id"], 
         roster_entry["date"], 
         roster_entry["start_time"], 
@@ -3167,16 +3583,15 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
     )
     
     # Assign the shift
-    db.roster.update_one(
-        {"id": shift_request["roster_entry_id"]},
-        {"$set": {
-            "staff_id": shift_request["staff_id"],
-            "staff_name": shift_request["staff_name"]
-        }}
-    )
+    assignment = {
+        "staff_id": shift_request["staff_id"],
+        "staff_name": shift_request["staff_name"]
+    }
+    await db.roster.update_one({"id": shift_request["roster_entry_id"]}, {"$set": assignment})
+    await record_roster_write(db, before=[roster_entry], after=[{**roster_entry, **assignment}])
     
     # Update request status
-    db.shift_requests.update_one(
+    await db.shift_requests.update_one(
         {"id": request_id},
         {"$set": {
             "status": "approved",
@@ -3185,6 +3600,7 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
             "approved_date": datetime.utcnow()
         }}
     )
+    await publish_shift_request_event({**shift_request, "status": "approved"})
     
     # Create notification for staff
     notification = Notification(
@@ -3196,11 +3612,11 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
         related_id=request_id,
         created_at=datetime.utcnow()
     )
-    db.notifications.insert_one(notification.dict())
+    await create_notification(notification)
     
     # Send email notification to staff member
     try:
-        staff_user = db.users.find_one({"staff_id": shift_request["staff_id"]})
+        staff_user = await db.users.find_one({"staff_id": shift_request["staff_id"]})
         if staff_user and staff_user.get("email"):
             shift_time = f"{roster_entry['start_time']}-{roster_entry['end_time']}"
             html_content, text_content = get_shift_request_approval_email(
@@ -3210,14 +3626,13 @@ async def approve_shift_request(request_id: str, admin_notes: Optional[str] = No
                 admin_notes=admin_notes
             )
             
-            # Schedule email sending (async)
-            import asyncio
-            asyncio.create_task(send_email_notification(
+            # Schedule email sending (queued job)
+            await queue_email_notification(
                 to_email=staff_user["email"],
                 subject="✅ Shift Request Approved - Workforce Management",
                 html_content=html_content,
                 text_content=text_content
-            ))
+            )
     except Exception as e:
         print(f"⚠️ Email notification failed: {str(e)}")
     
@@ -3230,7 +3645,7 @@ async def reject_shift_request(request_id: str, admin_notes: Optional[str] = Non
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Find and update the request
-    result = db.shift_requests.update_one(
+    result = await db.shift_requests.update_one(
         {"id": request_id, "status": "pending"},
         {"$set": {
             "status": "rejected",
@@ -3244,8 +3659,9 @@ async def reject_shift_request(request_id: str, admin_notes: Optional[str] = Non
         raise HTTPException(status_code=404, detail="Shift request not found or not pending")
     
     # Get the request details for notification
-    shift_request = db.shift_requests.find_one({"id": request_id})
-    roster_entry = db.roster.find_one({"id": shift_request["roster_entry_id"]})
+    shift_request = await db.shift_requests.find_one({"id": request_id})
+    await publish_shift_request_event(shift_request)
+    roster_entry = await db.roster.find_one({"id": shift_request["roster_entry_id"]})
     
     # Create notification for staff
     notification = Notification(
@@ -3257,11 +3673,11 @@ async def reject_shift_request(request_id: str, admin_notes: Optional[str] = Non
         related_id=request_id,
         created_at=datetime.utcnow()
     )
-    db.notifications.insert_one(notification.dict())
+    await create_notification(notification)
     
     # Send email notification to staff member
     try:
-        staff_user = db.users.find_one({"staff_id": shift_request["staff_id"]})
+        staff_user = await db.users.find_one({"staff_id": shift_request["staff_id"]})
         if staff_user and staff_user.get("email") and roster_entry:
             shift_time = f"{roster_entry['start_time']}-{roster_entry['end_time']}"
             html_content, text_content = get_shift_request_rejection_email(
@@ -3271,14 +3687,13 @@ async def reject_shift_request(request_id: str, admin_notes: Optional[str] = Non
                 admin_notes=admin_notes
             )
             
-            # Schedule email sending (async)
-            import asyncio
-            asyncio.create_task(send_email_notification(
+            # Schedule email sending (queued job)
+            await queue_email_notification(
                 to_email=staff_user["email"],
                 subject="📋 Shift Request Update - Workforce Management",
                 html_content=html_content,
                 text_content=text_content
-            ))
+            )
     except Exception as e:
         print(f"⚠️ Email notification failed: {str(e)}")
     
@@ -3292,7 +3707,7 @@ async def update_shift_request(request_id: str, request_update: ShiftRequest, cu
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if request exists
-    existing_request = db.shift_requests.find_one({"id": request_id})
+    existing_request = await db.shift_requests.find_one({"id": request_id})
     if not existing_request:
         raise HTTPException(status_code=404, detail="Shift request not found")
     
@@ -3300,13 +3715,14 @@ async def update_shift_request(request_id: str, request_update: ShiftRequest, cu
     update_data = request_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    result = db.shift_requests.update_one(
+    result = await db.shift_requests.update_one(
         {"id": request_id},
         {"$set": update_data}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Shift request not found")
+    await publish_shift_request_event({**existing_request, **update_data})
     
     return {"message": "Shift request updated successfully"}
 
@@ -3317,15 +3733,16 @@ async def delete_shift_request(request_id: str, current_user: dict = Depends(get
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if request exists
-    existing_request = db.shift_requests.find_one({"id": request_id})
+    existing_request = await db.shift_requests.find_one({"id": request_id})
     if not existing_request:
         raise HTTPException(status_code=404, detail="Shift request not found")
     
     # Delete the request
-    result = db.shift_requests.delete_one({"id": request_id})
+    result = await db.shift_requests.delete_one({"id": request_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Shift request not found")
+    await publish_shift_request_event({**existing_request, "status": "deleted"})
     
     return {"message": "Shift request deleted successfully"}
 
@@ -3336,10 +3753,11 @@ async def clear_all_shift_requests(current_user: dict = Depends(get_current_user
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Count existing requests
-    existing_count = db.shift_requests.count_documents({})
+    existing_count = await db.shift_requests.count_documents({})
     
     # Delete all requests
-    result = db.shift_requests.delete_many({})
+    result = await db.shift_requests.delete_many({})
+    await publish(db, "shift_requests", {"cleared": True})
     
     return {
         "message": f"Cleared {result.deleted_count} shift requests successfully",
@@ -3353,7 +3771,7 @@ async def get_staff_availability(current_user: dict = Depends(get_current_user))
     if current_user["role"] == "staff":
         query["staff_id"] = current_user.get("staff_id", current_user["id"])
     
-    availability_records = list(db.staff_availability.find(query, {"_id": 0}))
+    availability_records = await db.staff_availability.find(query, {"_id": 0})
     return sorted(availability_records, key=lambda x: x.get('created_at', datetime.min), reverse=True)
 
 @app.post("/api/staff-availability")
@@ -3372,7 +3790,7 @@ async def create_staff_availability(availability: StaffAvailability, current_use
             )
         
         # Validate that the staff member exists
-        staff_member = db.staff.find_one({"id": availability.staff_id, "active": True})
+        staff_member = await db.staff.find_one({"id": availability.staff_id, "active": True})
         if not staff_member:
             raise HTTPException(
                 status_code=404, 
@@ -3389,14 +3807,14 @@ async def create_staff_availability(availability: StaffAvailability, current_use
     availability.id = str(uuid.uuid4())
     availability.created_at = datetime.utcnow()
     
-    db.staff_availability.insert_one(availability.dict())
+    await db.staff_availability.insert_one(availability.dict())
     return availability
 
 @app.put("/api/staff-availability/{availability_id}")
 async def update_staff_availability(availability_id: str, availability: StaffAvailability, current_user: dict = Depends(get_current_user)):
     """Update staff availability record"""
     # Check if record exists and user has permission
-    existing_record = db.staff_availability.find_one({"id": availability_id})
+    existing_record = await db.staff_availability.find_one({"id": availability_id})
     if not existing_record:
         raise HTTPException(status_code=404, detail="Availability record not found")
     
@@ -3404,7 +3822,7 @@ async def update_staff_availability(availability_id: str, availability: StaffAva
     if current_user["role"] == "staff" and existing_record["staff_id"] != current_user.get("staff_id", current_user["id"]):
         raise HTTPException(status_code=403, detail="You can only update your own availability")
     
-    result = db.staff_availability.update_one(
+    result = await db.staff_availability.update_one(
         {"id": availability_id},
         {"$set": availability.dict()}
     )
@@ -3417,7 +3835,7 @@ async def update_staff_availability(availability_id: str, availability: StaffAva
 @app.delete("/api/staff-availability/{availability_id}")
 async def delete_staff_availability(availability_id: str, current_user: dict = Depends(get_current_user)):
     """Delete staff availability record"""
-    existing_record = db.staff_availability.find_one({"id": availability_id})
+    existing_record = await db.staff_availability.find_one({"id": availability_id})
     if not existing_record:
         raise HTTPException(status_code=404, detail="Availability record not found")
     
@@ -3425,7 +3843,7 @@ async def delete_staff_availability(availability_id: str, current_user: dict = D
     if current_user["role"] == "staff" and existing_record["staff_id"] != current_user.get("staff_id", current_user["id"]):
         raise HTTPException(status_code=403, detail="You can only delete your own availability")
     
-    result = db.staff_availability.update_one(
+    result = await db.staff_availability.update_one(
         {"id": availability_id},
         {"$set": {"is_active": False}}
     )
@@ -3439,10 +3857,10 @@ async def clear_all_staff_availability(current_user: dict = Depends(get_current_
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Count existing active records
-    existing_count = db.staff_availability.count_documents({"is_active": True})
+    existing_count = await db.staff_availability.count_documents({"is_active": True})
     
     # Soft delete all availability records
-    result = db.staff_availability.update_many(
+    result = await db.staff_availability.update_many(
         {"is_active": True},
         {"$set": {"is_active": False, "deleted_at": datetime.utcnow()}}
     )
@@ -3452,14 +3870,13 @@ async def clear_all_staff_availability(current_user: dict = Depends(get_current_
         "cleared_count": result.modified_count
     }
 
-@app.post("/api/admin/sync_staff_users")
-async def sync_staff_users(current_user: dict = Depends(get_current_user)):
-    """Create missing user accounts for all active staff members (Admin only)"""
-    if current_user["role"] != "admin":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
+SYNC_STAFF_USERS_JOB = "sync_staff_users"
+
+async def run_sync_staff_users_job(ctx: JobContext):
+    """Create missing user accounts for all active staff members"""
     # Get all active staff members
-    staff_members = list(db.staff.find({"active": True}))
+    staff_members = await db.staff.find({"active": True})
+    await ctx.progress(0, total=len(staff_members))
     
     created_users = []
     existing_users = []
@@ -3476,7 +3893,7 @@ async def sync_staff_users(current_user: dict = Depends(get_current_user)):
         username = staff_name.lower().replace(' ', '')
         
         # Check if user already exists
-        existing_user = db.users.find_one({"username": username})
+        existing_user = await db.users.find_one({"username": username})
         if existing_user:
             existing_users.append(f"{staff_name} -> {username}")
             continue
@@ -3501,18 +3918,20 @@ async def sync_staff_users(current_user: dict = Depends(get_current_user)):
                 created_at=datetime.utcnow()
             )
             
-            db.users.insert_one(new_user.dict())
+            await db.users.insert_one(new_user.dict())
             created_users.append(f"{staff_name} -> {username} (PIN: {default_pin})")
             
         except Exception as e:
             errors.append(f"Failed to create user for {staff_name}: {str(e)}")
+    await ctx.progress(len(staff_members))
     
     # Clean up staff with empty names
-    empty_name_staff = list(db.staff.find({"$or": [{"name": ""}, {"name": None}]}))
+    empty_name_staff = await db.staff.find({"$or": [{"name": ""}, {"name": None}]})
     cleaned_up = []
     for empty_staff in empty_name_staff:
-        db.staff.update_one({"id": empty_staff["id"]}, {"$set": {"active": False}})
+        await db.staff.update_one({"id": empty_staff["id"]}, {"$set": {"active": False}})
         cleaned_up.append(empty_staff["id"])
+    await reference_data_changed("staff", "login_users")
     
     result = {
         "message": f"Staff user synchronization completed",
@@ -3530,19 +3949,35 @@ async def sync_staff_users(current_user: dict = Depends(get_current_user)):
     
     return result
 
+job_runner.register(SYNC_STAFF_USERS_JOB, run_sync_staff_users_job, concurrency=1)
+
+@app.post("/api/admin/sync_staff_users")
+async def sync_staff_users(current_user: dict = Depends(get_current_user)):
+    """Queue creation of missing staff user accounts (Admin only); poll /api/jobs/{job_id} for the result"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    job = await job_runner.submit(SYNC_STAFF_USERS_JOB, {}, created_by=current_user["id"])
+    return {"message": "Staff user synchronization queued", "job_id": job["id"], "status": job["status"]}
+
+async def create_notification(notification: Notification):
+    """Store a notification and push it to its recipient"""
+    await db.notifications.insert_one(notification.dict())
+    await publish(db, "notifications", jsonable_encoder(notification), audience(staff_ids=[notification.user_id]))
+
 @app.get("/api/notifications")
 async def get_notifications(current_user: dict = Depends(get_current_user)):
     """Get notifications for current user"""
-    notifications = list(db.notifications.find(
+    notifications = await db.notifications.find(
         {"user_id": current_user["id"]},
         {"_id": 0}
-    ))
+    )
     return sorted(notifications, key=lambda x: x.get('created_at', datetime.min), reverse=True)
 
 @app.put("/api/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: dict = Depends(get_current_user)):
     """Mark notification as read"""
-    result = db.notifications.update_one(
+    result = await db.notifications.update_one(
         {"id": notification_id, "user_id": current_user["id"]},
         {"$set": {"is_read": True}}
     )
@@ -3552,7 +3987,57 @@ async def mark_notification_read(notification_id: str, current_user: dict = Depe
     
     return {"message": "Notification marked as read"}
 
-def check_availability_conflicts(staff_id: str, date: str, start_time: str, end_time: str) -> List[Dict]:
+# Push events - a Server-Sent Events stream so clients stop polling notifications, shift requests and unassigned shifts
+EVENT_KEEPALIVE_SECONDS = 25
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+
+def sse_message(event: dict) -> str:
+    return f"id: {event['_id']}\nevent: {event['channel']}\ndata: {json.dumps(jsonable_encoder(event['payload']))}\n\n"
+
+@app.get("/api/events/stream")
+async def stream_events(request: Request, token: str, last_event_id: Optional[str] = Header(None)):
+    """Stream roster, shift request, notification and public holiday events for the user (token in the query, as EventSource can't send headers)"""
+    user = await authenticate_token(token)
+    
+    async def event_stream():
+        # Subscribe before replaying so nothing published in between is lost; replayed events are skipped when they arrive live
+        subscription = event_hub.subscribe(user)
+        replayed = set()
+        try:
+            yield "retry: 5000\n\n"
+            if last_event_id:
+                missed = await event_hub.replay(user, last_event_id)
+                if missed is None:
+                    yield RESYNC_MESSAGE
+                else:
+                    for event in missed:
+                        replayed.add(event["_id"])
+                        yield sse_message(event)
+            
+            while not await request.is_disconnected():
+                event = await subscription.next(EVENT_KEEPALIVE_SECONDS)
+                if subscription.reset_if_overflowed():
+                    yield RESYNC_MESSAGE
+                    continue
+                if event is None:
+                    # End the stream once the session is logged out or expires
+                    try:
+                        await authenticate_token(token)
+                    except HTTPException:
+                        break
+                    yield ": keep-alive\n\n"
+                elif event["_id"] not in replayed:
+                    yield sse_message(event)
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def check_availability_conflicts(staff_id: str, date: str, start_time: str, end_time: str) -> List[Dict]:
     """Check for availability conflicts when assigning a shift"""
     conflicts = []
     
@@ -3567,7 +4052,7 @@ def check_availability_conflicts(staff_id: str, date: str, start_time: str, end_
     day_of_week = shift_date.weekday()
     
     # Check for unavailability or time off requests
-    unavailable_records = list(db.staff_availability.find({
+    unavailable_records = await db.staff_availability.find({
         "staff_id": staff_id,
         "is_active": True,
         "availability_type": {"$in": ["unavailable", "time_off_request"]},
@@ -3579,7 +4064,7 @@ def check_availability_conflicts(staff_id: str, date: str, start_time: str, end_
             # Recurring weekly unavailability
             {"is_recurring": True, "day_of_week": day_of_week}
         ]
-    }))
+    })
     
     for record in unavailable_records:
         conflict_times = []
@@ -3623,7 +4108,7 @@ async def check_assignment_conflicts(data: dict, current_user: dict = Depends(ge
     if not all([staff_id, date, start_time, end_time]):
         raise HTTPException(status_code=400, detail="Missing required fields")
     
-    conflicts = check_availability_conflicts(staff_id, date, start_time, end_time)
+    conflicts = await check_availability_conflicts(staff_id, date, start_time, end_time)
     
     return {
         "has_conflicts": len(conflicts) > 0,
@@ -3636,33 +4121,42 @@ async def check_assignment_conflicts(data: dict, current_user: dict = Depends(ge
 # CLIENT PROFILE MANAGEMENT ENDPOINTS
 # ===========================================
 
+# Client fields staff may see: basic details only, no NDIS plan details
+STAFF_CLIENT_FIELDS = (
+    "id",
+    "full_name",
+    "date_of_birth",
+    "age",
+    "sex",
+    "disability_condition",
+    "mobile",
+    "address",
+    "emergency_contacts",
+    "biography.strengths",
+    "biography.daily_life",
+    "biography.additional_info",
+    "created_at",
+)
+
 @app.get("/api/clients")
-async def get_clients(current_user: dict = Depends(get_current_user)):
+async def get_clients(fields: Optional[str] = None, response_format: Optional[str] = Query(None, alias="format"),
+                      current_user: dict = Depends(get_current_user)):
     """Get all client profiles with role-based filtering"""
+    fields, response_format = list_options(fields, response_format)
     
     # For staff, return limited information (basic details only, no NDIS plan details)
     if current_user["role"] == "staff":
-        clients = list(db.clients.find({}, {
-            "_id": 0,
-            "id": 1,
-            "full_name": 1,
-            "date_of_birth": 1,
-            "age": 1,
-            "sex": 1,
-            "disability_condition": 1,
-            "mobile": 1,
-            "address": 1,
-            "emergency_contacts": 1,
-            "biography.strengths": 1,
-            "biography.daily_life": 1,
-            "biography.additional_info": 1,
-            "created_at": 1
-        }))
+        visible = [
+            field for field in STAFF_CLIENT_FIELDS
+            if fields is None or field in fields or field.split(".")[0] in fields
+        ]
+        clients = await db.clients.find({}, projection(visible, required=["full_name"]))
     else:
         # Admin and Supervisor get full access
-        clients = list(db.clients.find({}, {"_id": 0}))
+        clients = await db.clients.find({}, projection(fields, required=["full_name"]))
     
-    return sorted(clients, key=lambda x: x.get('full_name', ''))
+    clients.sort(key=lambda x: x.get('full_name', ''))
+    return list_response(clients, fields, response_format)
 
 @app.get("/api/clients/{client_id}")
 async def get_client_profile(client_id: str, current_user: dict = Depends(get_current_user)):
@@ -3670,7 +4164,7 @@ async def get_client_profile(client_id: str, current_user: dict = Depends(get_cu
     
     if current_user["role"] == "staff":
         # Staff get limited view (no NDIS plan financial details, limited biography)
-        client = db.clients.find_one({"id": client_id}, {
+        client = await db.clients.find_one({"id": client_id}, {
             "_id": 0,
             "id": 1,
             "full_name": 1,
@@ -3692,7 +4186,7 @@ async def get_client_profile(client_id: str, current_user: dict = Depends(get_cu
         })
     else:
         # Full access for Admin and Supervisor
-        client = db.clients.find_one({"id": client_id}, {"_id": 0})
+        client = await db.clients.find_one({"id": client_id}, {"_id": 0})
     
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
@@ -3722,7 +4216,7 @@ async def create_client_profile(client: ClientProfile, current_user: dict = Depe
             pass
     
     # Insert client profile
-    db.clients.insert_one(client.dict())
+    await db.clients.insert_one(client.dict())
     return client
 
 @app.put("/api/clients/{client_id}")
@@ -3732,7 +4226,7 @@ async def update_client_profile(client_id: str, client_update: ClientProfile, cu
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if client exists
-    existing_client = db.clients.find_one({"id": client_id})
+    existing_client = await db.clients.find_one({"id": client_id})
     if not existing_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -3749,7 +4243,7 @@ async def update_client_profile(client_id: str, client_update: ClientProfile, cu
         except ValueError:
             pass
     
-    result = db.clients.update_one(
+    result = await db.clients.update_one(
         {"id": client_id},
         {"$set": update_data}
     )
@@ -3766,12 +4260,12 @@ async def delete_client_profile(client_id: str, current_user: dict = Depends(get
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if client exists
-    existing_client = db.clients.find_one({"id": client_id})
+    existing_client = await db.clients.find_one({"id": client_id})
     if not existing_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Soft delete (mark as inactive instead of removing)
-    result = db.clients.update_one(
+    result = await db.clients.update_one(
         {"id": client_id},
         {"$set": {"is_active": False, "deleted_at": datetime.utcnow()}}
     )
@@ -3785,7 +4279,7 @@ async def update_ndis_plan(client_id: str, ndis_plan: NDISPlan, current_user: di
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if client exists
-    existing_client = db.clients.find_one({"id": client_id})
+    existing_client = await db.clients.find_one({"id": client_id})
     if not existing_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -3794,7 +4288,7 @@ async def update_ndis_plan(client_id: str, ndis_plan: NDISPlan, current_user: di
         category.remaining_amount = category.total_amount - category.spent_amount
     
     # Update NDIS plan
-    result = db.clients.update_one(
+    result = await db.clients.update_one(
         {"id": client_id},
         {
             "$set": {
@@ -3815,7 +4309,7 @@ async def get_client_budget_summary(client_id: str, current_user: dict = Depends
     if current_user["role"] == "staff":
         raise HTTPException(status_code=403, detail="Access denied - insufficient permissions")
     
-    client = db.clients.find_one({"id": client_id})
+    client = await db.clients.find_one({"id": client_id})
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -3867,7 +4361,7 @@ async def update_client_biography(client_id: str, biography_update: ClientBiogra
     """Update client biography information with role-based access"""
     
     # Check if client exists
-    existing_client = db.clients.find_one({"id": client_id})
+    existing_client = await db.clients.find_one({"id": client_id})
     if not existing_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -3894,7 +4388,7 @@ async def update_client_biography(client_id: str, biography_update: ClientBiogra
             "updated_at": datetime.utcnow()
         }
     
-    result = db.clients.update_one(
+    result = await db.clients.update_one(
         {"id": client_id},
         {"$set": update_data}
     )
@@ -3905,9 +4399,9 @@ async def update_client_biography(client_id: str, biography_update: ClientBiogra
     return {"message": "Client biography updated successfully"}
 
 # Initialize database with sample client if not exists (for demonstration)
-def initialize_sample_client():
+async def initialize_sample_client():
     """Initialize sample client data if not exists"""
-    sample_client = db.clients.find_one({"full_name": "Jeremy James Tomlinson"})
+    sample_client = await db.clients.find_one({"full_name": "Jeremy James Tomlinson"})
     if not sample_client:
         print("Creating sample client profile...")
         
@@ -4022,7 +4516,7 @@ def initialize_sample_client():
             created_at=datetime.utcnow()
         )
         
-        db.clients.insert_one(sample_client.dict())
+        await db.clients.insert_one(sample_client.dict())
         print("✅ Sample client profile created: Jeremy James Tomlinson")
     else:
         print("✅ Sample client already exists")
@@ -4031,59 +4525,45 @@ def initialize_sample_client():
 # OCR DOCUMENT PROCESSING ENDPOINTS
 # =====================================
 
-@app.post("/api/ocr/process")
-async def process_document(
-    file: UploadFile = File(...),
-    client_id: str = Form(None),
-    extract_client_data: bool = Form(True),
-    current_user: dict = Depends(get_current_user)
-):
-    """Process uploaded document and extract text using OCR"""
-    
-    # Check user permissions (Admin and Supervisor only)
-    if current_user.get("role") not in ["admin", "supervisor"]:
-        raise HTTPException(status_code=403, detail="Not authorized to process documents")
-    
-    # Generate unique task ID
-    task_id = str(uuid.uuid4())
-    
-    logging.info(f"🔄 Starting OCR processing for {file.filename} (task: {task_id}, user: {current_user.get('username')})")
+OCR_JOB = "ocr_document"
+
+async def run_ocr_job(ctx: JobContext):
+    """Run OCR on an uploaded document and parse NDIS plan data from the text"""
+    params = ctx.params
+    task_id = params["task_id"]
+    file_path = Path(params["file_path"])
+    filename = params["filename"]
+    
+    ocr_results[task_id] = {
+        'id': task_id,
+        'client_id': params.get("client_id"),
+        'filename': filename,
+        'file_type': params.get("file_type"),
+        'status': 'processing',
+        'progress': 0,
+        'created_at': params["created_at"],
+        'created_by': params["created_by"]
+    }
     
     try:
-        # Validate and save file
-        file_path = await validate_and_save_file(file)
-        logging.info(f"✅ File saved successfully: {file_path}")
-        
-        # Initialize processing status
-        ocr_results[task_id] = {
-            'id': task_id,
-            'client_id': client_id,
-            'filename': file.filename,
-            'file_type': file.content_type,
-            'status': 'processing',
-            'progress': 0,
-            'created_at': datetime.now().isoformat(),
-            'created_by': current_user["username"]
-        }
-        
-        logging.info(f"🚀 Processing document: {file.filename} (type: {file.content_type})")
+        logging.info(f"🚀 Processing document: {filename} (type: {params.get('file_type')})")
         
         # Process document based on type
-        if file.content_type == 'application/pdf' or file.filename.lower().endswith('.pdf'):
-            logging.info(f"📄 Processing as PDF: {file.filename}")
+        if params.get("file_type") == 'application/pdf' or filename.lower().endswith('.pdf'):
+            logging.info(f"📄 Processing as PDF: {filename}")
             result = await process_pdf_async(file_path, task_id)
         else:
-            logging.info(f"🖼️ Processing as image: {file.filename}")
+            logging.info(f"🖼️ Processing as image: {filename}")
             result = await process_image_async(file_path, task_id)
         
         # Extract text for parsing
         extracted_text = result.get('combined_text', result.get('text', ''))
-        logging.info(f"📝 Extracted {len(extracted_text)} characters of text from {file.filename}")
+        logging.info(f"📝 Extracted {len(extracted_text)} characters of text from {filename}")
         
         # Parse NDIS plan data if requested
         extracted_data = None
-        if extract_client_data and extracted_text:
-            logging.info(f"🔍 Parsing NDIS plan data from {file.filename}")
+        if params.get("extract_client_data") and extracted_text:
+            logging.info(f"🔍 Parsing NDIS plan data from {filename}")
             extracted_data = ocr_processor.parse_ndis_plan_text(extracted_text)
         
         # Update results
@@ -4096,33 +4576,86 @@ async def process_document(
             'progress': 100
         })
         
-        logging.info(f"✅ OCR processing completed successfully for {file.filename}")
+        logging.info(f"✅ OCR processing completed successfully for {filename}")
         
         # Clean up file
         file_path.unlink(missing_ok=True)
-        
-        return JSONResponse({
-            'task_id': task_id,
-            'status': 'completed',
-            'message': 'Document processing completed successfully',
-            'extracted_data': extracted_data.dict() if extracted_data else None
-        })
-        
-    except HTTPException as e:
-        logging.error(f"❌ HTTP Exception during OCR processing: {e.detail}")
-        raise
     except Exception as e:
         error_msg = str(e)
-        logging.error(f"❌ Critical error during OCR processing for {file.filename}: {error_msg}")
-        ocr_results[task_id] = {
-            'id': task_id,
-            'filename': file.filename,
-            'status': 'failed',
-            'error': error_msg,
-            'created_at': datetime.now().isoformat(),
-            'created_by': current_user["username"]
-        }
-        raise HTTPException(status_code=500, detail=f"Processing failed: {error_msg}")
+        logging.error(f"❌ Critical error during OCR processing for {filename}: {error_msg}")
+        ocr_results[task_id].update({'status': 'failed', 'error': error_msg})
+        raise
+    
+    # The job result carries the record to API processes that didn't run the OCR
+    return ocr_results[task_id]
+
+job_runner.register(OCR_JOB, run_ocr_job, concurrency=2)
+
+async def get_ocr_task(task_id: str) -> Optional[Dict[str, Any]]:
+    """OCR task record from this process, else rebuilt from its background job"""
+    if task_id in ocr_results:
+        return ocr_results[task_id]
+    
+    job = await db.jobs.find_one({"type": OCR_JOB, "params.task_id": task_id}, {"_id": 0})
+    if not job:
+        return None
+    if job.get("result"):
+        return job["result"]
+    
+    params = job["params"]
+    task_data = {
+        'id': task_id,
+        'client_id': params.get("client_id"),
+        'filename': params["filename"],
+        'file_type': params.get("file_type"),
+        'status': 'failed' if job["status"] in ("failed", "cancelled") else 'processing',
+        'progress': 0,
+        'created_at': params["created_at"],
+        'created_by': params["created_by"]
+    }
+    if job.get("error"):
+        task_data['error'] = job["error"]
+    return task_data
+
+@app.post("/api/ocr/process")
+async def process_document(
+    file: UploadFile = File(...),
+    client_id: str = Form(None),
+    extract_client_data: bool = Form(True),
+    current_user: dict = Depends(get_current_user)
+):
+    """Validate an uploaded document and queue OCR; poll /api/ocr/result/{task_id} for the outcome"""
+    
+    # Check user permissions (Admin and Supervisor only)
+    if current_user.get("role") not in ["admin", "supervisor"]:
+        raise HTTPException(status_code=403, detail="Not authorized to process documents")
+    
+    # Generate unique task ID
+    task_id = str(uuid.uuid4())
+    
+    logging.info(f"🔄 Queueing OCR processing for {file.filename} (task: {task_id}, user: {current_user.get('username')})")
+    
+    # Validate and save file
+    file_path = await validate_and_save_file(file)
+    logging.info(f"✅ File saved successfully: {file_path}")
+    
+    job = await job_runner.submit(OCR_JOB, {
+        "task_id": task_id,
+        "file_path": str(file_path),
+        "filename": file.filename,
+        "file_type": file.content_type,
+        "client_id": client_id,
+        "extract_client_data": extract_client_data,
+        "created_at": datetime.now().isoformat(),
+        "created_by": current_user["username"]
+    }, created_by=current_user["id"])
+    
+    return JSONResponse({
+        'task_id': task_id,
+        'job_id': job["id"],
+        'status': 'processing',
+        'message': 'Document queued for processing'
+    })
 
 @app.get("/api/ocr/status/{task_id}")
 async def get_processing_status(task_id: str, current_user: dict = Depends(get_current_user)):
@@ -4132,10 +4665,11 @@ async def get_processing_status(task_id: str, current_user: dict = Depends(get_c
     if current_user.get("role") not in ["admin", "supervisor"]:
         raise HTTPException(status_code=403, detail="Not authorized to view OCR results")
     
-    if task_id not in ocr_results:
+    task_data = await get_ocr_task(task_id)
+    if not task_data:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    return ocr_results[task_id]
+    return task_data
 
 @app.get("/api/ocr/result/{task_id}")
 async def get_processing_result(task_id: str, current_user: dict = Depends(get_current_user)):
@@ -4145,11 +4679,10 @@ async def get_processing_result(task_id: str, current_user: dict = Depends(get_c
     if current_user.get("role") not in ["admin", "supervisor"]:
         raise HTTPException(status_code=403, detail="Not authorized to view OCR results")
     
-    if task_id not in ocr_results:
+    task_data = await get_ocr_task(task_id)
+    if not task_data:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task_data = ocr_results[task_id]
-    
     if task_data['status'] == 'processing':
         raise HTTPException(status_code=202, detail="Processing still in progress")
     
@@ -4183,11 +4716,10 @@ async def apply_ocr_to_client(
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to modify client profiles")
     
-    if task_id not in ocr_results:
+    task_data = await get_ocr_task(task_id)
+    if not task_data:
         raise HTTPException(status_code=404, detail="OCR task not found")
     
-    task_data = ocr_results[task_id]
-    
     if task_data['status'] != 'completed':
         raise HTTPException(status_code=400, detail="OCR processing not completed")
     
@@ -4198,7 +4730,7 @@ async def apply_ocr_to_client(
     try:
         if client_id:
             # Update existing client
-            existing_client = db.clients.find_one({"id": client_id})
+            existing_client = await db.clients.find_one({"id": client_id})
             if not existing_client:
                 raise HTTPException(status_code=404, detail="Client not found")
             
@@ -4232,7 +4764,7 @@ async def apply_ocr_to_client(
             
             if update_data:
                 update_data['updated_at'] = datetime.now()
-                db.clients.update_one({"id": client_id}, {"$set": update_data})
+                await db.clients.update_one({"id": client_id}, {"$set": update_data})
                 
                 return {
                     "message": "Client profile updated successfully with OCR data",
@@ -4273,7 +4805,7 @@ async def apply_ocr_to_client(
                 "created_by": current_user["username"]
             }
             
-            db.clients.insert_one(client_data)
+            await db.clients.insert_one(client_data)
             
             return {
                 "message": "New client profile created successfully from OCR data",
@@ -4336,7 +4868,7 @@ async def cleanup_ocr_results(current_user: dict = Depends(get_current_user)):
 # EXPORT FUNCTIONALITY ENDPOINTS
 # =====================================
 
-def get_roster_data_for_export(start_date: str, end_date: str, current_user: dict):
+async def get_roster_data_for_export(start_date: str, end_date: str, current_user: dict):
     """Get roster data for export with date range support"""
     
     # Query roster entries for the date range
@@ -4344,16 +4876,20 @@ def get_roster_data_for_export(start_date: str, end_date: str, current_user: dic
         "date": {"$gte": start_date, "$lt": end_date}
     }
     
-    roster_entries = list(db.roster.find(query, {"_id": 0}).sort("date", 1))
+    # Role-based data filtering: staff can only export their own shifts
+    staff_id = pay_viewer(current_user)
+    if staff_id is not None:
+        query["staff_id"] = staff_id
+    
+    roster_entries = await db.roster.find(query, {"_id": 0}, sort=[("date", 1)])
     
     # Get staff information
     staff_dict = {}
-    for staff in db.staff.find({}, {"_id": 0}):
+    for staff in await db.staff.find({}, {"_id": 0}):
         staff_dict[staff["id"]] = staff
     
     # Get settings for rates
-    settings = db.settings.find_one() or {}
-    rates = settings.get("rates", {})
+    rates = (await get_cached_settings()).rates
     
     # Process entries and add calculated information
     export_data = []
@@ -4361,13 +4897,6 @@ def get_roster_data_for_export(start_date: str, end_date: str, current_user: dic
         staff_info = staff_dict.get(entry.get("staff_id", ""), {})
         staff_name = staff_info.get("name", "Unassigned") if entry.get("staff_id") else "Unassigned"
         
-        # Role-based data filtering
-        if current_user["role"] == "staff":
-            # Staff can only see their own shifts
-            staff_id = current_user.get("staff_id") or current_user.get("id")
-            if entry.get("staff_id") != staff_id:
-                continue
-        
         # Calculate pay information
         hours_worked = entry.get("hours_worked", 0)
         base_pay = entry.get("base_pay", 0)
@@ -4429,7 +4958,7 @@ async def export_csv(month: str, current_user: dict = Depends(get_current_user))
         end_date = f"{end_year}-{end_month:02d}-01"
         
         # Get roster data
-        export_data = get_roster_data_for_export(start_date, end_date, current_user)
+        export_data = await get_roster_data_for_export(start_date, end_date, current_user)
         
         if not export_data:
             raise HTTPException(status_code=404, detail="No roster data found for the specified month")
@@ -4485,7 +5014,7 @@ async def export_excel(month: str, current_user: dict = Depends(get_current_user
         end_date = f"{end_year}-{end_month:02d}-01"
         
         # Get roster data
-        export_data = get_roster_data_for_export(start_date, end_date, current_user)
+        export_data = await get_roster_data_for_export(start_date, end_date, current_user)
         
         if not export_data:
             raise HTTPException(status_code=404, detail="No roster data found for the specified month")
@@ -4572,7 +5101,7 @@ async def export_pdf(month: str, current_user: dict = Depends(get_current_user))
         end_date = f"{end_year}-{end_month:02d}-01"
         
         # Get roster data
-        export_data = get_roster_data_for_export(start_date, end_date, current_user)
+        export_data = await get_roster_data_for_export(start_date, end_date, current_user)
         
         if not export_data:
             raise HTTPException(status_code=404, detail="No roster data found for the specified month")
@@ -4669,7 +5198,7 @@ async def export_csv_range(start_date: str, end_date: str, current_user: dict =
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
         
         # Get roster data
-        export_data = get_roster_data_for_export(start_date, end_date, current_user)
+        export_data = await get_roster_data_for_export(start_date, end_date, current_user)
         
         if not export_data:
             raise HTTPException(status_code=404, detail="No roster data found for the specified date range")
@@ -4713,7 +5242,7 @@ async def export_excel_range(start_date: str, end_date: str, current_user: dict
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
         
         # Get roster data
-        export_data = get_roster_data_for_export(start_date, end_date, current_user)
+        export_data = await get_roster_data_for_export(start_date, end_date, current_user)
         
         if not export_data:
             raise HTTPException(status_code=404, detail="No roster data found for the specified date range")
@@ -4775,7 +5304,7 @@ async def export_pdf_range(start_date: str, end_date: str, current_user: dict =
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
         
         # Get roster data
-        export_data = get_roster_data_for_export(start_date, end_date, current_user)
+        export_data = await get_roster_data_for_export(start_date, end_date, current_user)
         
         if not export_data:
             raise HTTPException(status_code=404, detail="No roster data found for the specified date range")
@@ -4857,9 +5386,9 @@ async def export_pdf_range(start_date: str, end_date: str, current_user: dict =
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
 # Initialize database with default admin user if not exists
-def initialize_admin():
+async def initialize_admin():
     """Initialize default admin user if not exists"""
-    admin_user = db.users.find_one({"username": "Admin"})
+    admin_user = await db.users.find_one({"username": "Admin"})
     if not admin_user:
         print("Creating default admin user...")
         default_admin = User(
@@ -4874,17 +5403,11 @@ def initialize_admin():
             is_active=True,
             is_first_login=False  # Admin doesn't need to change PIN immediately
         )
-        db.users.insert_one(default_admin.dict())
+        await db.users.insert_one(default_admin.dict())
         print("✅ Default admin user created: Username=Admin, PIN=0000")
     else:
         print("✅ Admin user already exists - preserving existing PIN")
 
-# Initialize admin on startup
-initialize_admin()
-
-# Initialize sample client data
-initialize_sample_client()
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
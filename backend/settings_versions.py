@@ -0,0 +1,60 @@
+"""Effective-dated settings versions and the roster filter for recomputing pay after a change"""
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Effective date of the version that covers everything before the first dated change
+BEGINNING_OF_TIME = "0001-01-01"
+
+# Settings fields that feed calculate_pay; changing anything else never needs a recompute
+PAY_SETTING_FIELDS = ("rates", "ndis_charge_rates", "holiday_state")
+
+
+def changed_pay_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    return [field for field in PAY_SETTING_FIELDS if previous.get(field) != current.get(field)]
+
+
+class SettingsTimeline:
+    """Settings versions ordered by effective date; a date resolves to the latest version in effect on it"""
+
+    def __init__(self, versions: Iterable[Tuple[str, Any]]):
+        ordered = sorted(versions, key=lambda version: version[0])
+        if not ordered:
+            raise ValueError("A settings timeline needs at least one version")
+        self._dates: List[str] = [effective_from for effective_from, _ in ordered]
+        self._settings: List[Any] = [settings for _, settings in ordered]
+
+    def for_date(self, date_str: str) -> Any:
+        position = bisect_right(self._dates, date_str) - 1
+        return self._settings[max(position, 0)]
+
+    def next_change_after(self, date_str: str) -> Optional[str]:
+        """Effective date of the first version starting after date_str, if any"""
+        position = bisect_right(self._dates, date_str)
+        return self._dates[position] if position < len(self._dates) else None
+
+    def partition(self, entries: Sequence[Dict[str, Any]]) -> List[Tuple[Any, List[int]]]:
+        """Group entry positions by the settings version in effect on each entry's date"""
+        groups: Dict[int, List[int]] = {}
+        for position, entry in enumerate(entries):
+            version = max(bisect_right(self._dates, entry.get("date") or "") - 1, 0)
+            groups.setdefault(version, []).append(position)
+        return [(self._settings[version], positions) for version, positions in sorted(groups.items())]
+
+
+def recompute_query(effective_from: str, until: Optional[str], changed_fields: Sequence[str]) -> Dict[str, Any]:
+    """Roster filter for entries a settings version change can affect
+
+    Frozen entries are never touched. When only hourly rates changed, entries
+    paid at a manual hourly rate keep their pay, except overnight shifts,
+    whose split-day calculation doesn't use the manual rate.
+    """
+    date_range: Dict[str, str] = {"$gte": effective_from}
+    if until:
+        date_range["$lt"] = until
+    query: Dict[str, Any] = {"date": date_range, "is_frozen": {"$ne": True}}
+    if set(changed_fields) == {"rates"}:
+        query["$or"] = [
+            {"manual_hourly_rate": {"$in": [None, 0]}},
+            {"$expr": {"$lte": ["$end_time", "$start_time"]}},
+        ]
+    return query
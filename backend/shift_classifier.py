@@ -0,0 +1,35 @@
+"""NumPy views of payrules' shift classification tables for the batch pay engine
+
+The tables themselves (and the single-shift lookups) live in payrules.classify;
+this module only wraps them as arrays so whole columns of shifts classify in
+one fancy-indexing pass.
+"""
+import numpy as np
+
+from payrules.classify import (
+    END_BANDS,
+    END_DAYTIME as END_DAYTIME_LIST,
+    MINUTES_PER_DAY,
+    POST_MIDNIGHT_TYPE_TABLE as POST_MIDNIGHT_TYPE_LISTS,
+    SHIFT_TYPE_TABLE as SHIFT_TYPE_LISTS,
+    START_BANDS,
+)
+
+START_BAND = np.array(START_BANDS, dtype=np.int8)
+END_BAND = np.array(END_BANDS, dtype=np.int8)
+END_DAYTIME = np.array(END_DAYTIME_LIST, dtype=np.int8)
+SHIFT_TYPE_TABLE = np.array(SHIFT_TYPE_LISTS, dtype=np.int8)
+POST_MIDNIGHT_TYPE_TABLE = np.array(POST_MIDNIGHT_TYPE_LISTS, dtype=np.int8)
+
+
+def classify(weekday, holiday, start_minute, end_minute):
+    """Shift type code(s) for a span; works on ints or NumPy arrays"""
+    holiday = np.asarray(holiday, dtype=np.int8)
+    end_span = np.where(end_minute <= start_minute, end_minute + MINUTES_PER_DAY, end_minute)
+    return SHIFT_TYPE_TABLE[weekday, holiday, START_BAND[start_minute], END_BAND[end_span], END_DAYTIME[end_minute]]
+
+
+def classify_post_midnight(weekday, holiday, end_minute):
+    """Shift type code(s) for the 00:01-end segment of a cross-midnight shift"""
+    holiday = np.asarray(holiday, dtype=np.int8)
+    return POST_MIDNIGHT_TYPE_TABLE[weekday, holiday, END_DAYTIME[end_minute]]
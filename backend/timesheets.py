@@ -0,0 +1,127 @@
+"""Per-staff pay-period timesheets from one aggregation over the roster
+
+Pay periods are consecutive weeks or fortnights starting on the settings'
+first day of the week. One `$match`/`$group` pass over the (staff_id, date)
+index groups each period's shifts by staff member and by everything shift
+types are worked out from, so the groups stay few however many periods are
+asked for; each group is then typed the same way as the month summaries.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from month_summary import entry_shift_type
+
+PAY_PERIOD_DAYS = {"week": 7, "fortnight": 14}
+MAX_PAY_PERIODS = 52
+FIRST_WEEKDAY = {"monday": 0, "sunday": 6}
+
+# Timesheet field -> roster entry field it totals
+TIMESHEET_TOTALS = {
+    "hours": "hours_worked",
+    "base_pay": "base_pay",
+    "sleepover_allowance": "sleepover_allowance",
+    "total_pay": "total_pay",
+}
+TIMESHEET_FIELDS = tuple(TIMESHEET_TOTALS) + ("count",)
+
+# Roster fields entry_shift_type reads, besides the date
+SHIFT_TYPE_INPUTS = (
+    "start_time", "end_time", "is_sleepover", "manual_sleepover", "manual_shift_type", "is_public_holiday", "calendar_holiday"
+)
+
+PayPeriod = Tuple[str, str]  # First day, and the day after the last (YYYY-MM-DD)
+
+
+def pay_periods(start: str, count: int, period: str = "fortnight", first_day_of_week: str = "monday") -> List[PayPeriod]:
+    """`count` consecutive pay periods, the first being the one containing `start`
+
+    The first period starts on the first day of the week on or before `start`;
+    for fortnights that also fixes which weeks pair up.
+    """
+    if period not in PAY_PERIOD_DAYS:
+        raise ValueError(f"period must be one of: {', '.join(PAY_PERIOD_DAYS)}")
+    if not 1 <= count <= MAX_PAY_PERIODS:
+        raise ValueError(f"periods must be between 1 and {MAX_PAY_PERIODS}")
+    try:
+        first_day = date.fromisoformat(start)
+    except ValueError:
+        raise ValueError(f"Invalid start date '{start}', expected YYYY-MM-DD")
+    first_day -= timedelta(days=(first_day.weekday() - FIRST_WEEKDAY.get(first_day_of_week, 0)) % 7)
+
+    length = timedelta(days=PAY_PERIOD_DAYS[period])
+    return [
+        ((first_day + length * index).isoformat(), (first_day + length * (index + 1)).isoformat())
+        for index in range(count)
+    ]
+
+
+def timesheet_pipeline(periods: List[PayPeriod], staff_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """$match the periods' assigned shifts (or one staff member's) and $group them by period, staff and shift inputs"""
+    first_day = datetime.fromisoformat(periods[0][0])
+    period_ms = (datetime.fromisoformat(periods[0][1]) - first_day) // timedelta(milliseconds=1)
+    day = {"$dateFromString": {"dateString": "$date", "format": "%Y-%m-%d", "onError": None}}
+    return [
+        # A range on both fields of the (staff_id, date) index; "" and null staff ids are unassigned
+        {"$match": {"staff_id": staff_id or {"$gt": ""}, "date": {"$gte": periods[0][0], "$lt": periods[-1][1]}}},
+        {"$group": {
+            "_id": {
+                "period": {"$floor": {"$divide": [{"$subtract": [day, first_day]}, period_ms]}},
+                "staff_id": "$staff_id",
+                "weekday": {"$isoDayOfWeek": day},
+                **{field: f"${field}" for field in SHIFT_TYPE_INPUTS},
+            },
+            "date": {"$min": "$date"},
+            "staff_name": {"$max": "$staff_name"},
+            "count": {"$sum": 1},
+            **{field: {"$sum": f"${source}"} for field, source in TIMESHEET_TOTALS.items()},
+        }},
+    ]
+
+
+def _empty_totals() -> Dict[str, float]:
+    return dict.fromkeys(TIMESHEET_FIELDS, 0)
+
+
+def _rounded(totals: Dict[str, float]) -> Dict[str, float]:
+    return {field: round(value, 2) for field, value in totals.items()}
+
+
+def fold_timesheets(periods: List[PayPeriod], groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-period staff rows (totals and by_shift_type, like the month summary) from the pipeline's groups"""
+    staff_rows: List[Dict[str, Dict[str, Any]]] = [{} for _ in periods]
+    for group in groups:
+        key = group["_id"]
+        if key["period"] is None or not 0 <= key["period"] < len(periods):
+            continue  # Dates that aren't YYYY-MM-DD
+        shift_type = entry_shift_type(dict({field: key.get(field) for field in SHIFT_TYPE_INPUTS}, date=group["date"]))
+        row = staff_rows[int(key["period"])].setdefault(key["staff_id"], dict(
+            {"staff_id": key["staff_id"], "staff_name": None, "by_shift_type": defaultdict(_empty_totals)},
+            **_empty_totals()
+        ))
+        row["staff_name"] = max(filter(None, (row["staff_name"], group.get("staff_name"))), default=None)
+        for field in TIMESHEET_FIELDS:
+            row[field] += group[field]
+            row["by_shift_type"][shift_type][field] += group[field]
+
+    timesheets = []
+    for (first_day, next_day), rows in zip(periods, staff_rows):
+        ordered = sorted(rows.values(), key=lambda row: ((row["staff_name"] or "").lower(), row["staff_id"]))
+        totals = _empty_totals()
+        for row in ordered:
+            for field in TIMESHEET_FIELDS:
+                totals[field] += row[field]
+            row.update(_rounded({field: row[field] for field in TIMESHEET_FIELDS}))
+            row["by_shift_type"] = {shift_type: _rounded(values) for shift_type, values in sorted(row["by_shift_type"].items())}
+        timesheets.append({
+            "start": first_day,
+            "end": (date.fromisoformat(next_day) - timedelta(days=1)).isoformat(),
+            "staff": ordered,
+            "totals": _rounded(totals),
+        })
+    return timesheets
+
+
+async def load_timesheets(db, periods: List[PayPeriod], staff_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Timesheets for consecutive pay periods, for every assigned staff member or just `staff_id`"""
+    return fold_timesheets(periods, await db.roster.aggregate(timesheet_pipeline(periods, staff_id)))
@@ -0,0 +1,229 @@
+"""The benchmarks, grouped by the code path they measure
+
+Each group builds its Benchmarks against a prepared BenchEnvironment. Sized
+groups read a roster month seeded with the given number of entries; the runner
+seeds READ_MONTH for one size at a time and clears it before the next, so a
+size's timings never include scanning another size's entries. Seeding happens
+outside the timed rounds.
+"""
+import calendar
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Sequence
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from environment import BenchEnvironment, synthetic_month
+from harness import Benchmark
+
+# Months far from any real roster data
+READ_MONTH = "2031-01"
+GENERATION_MONTH = "2032-03"
+FORECAST_START = "2034-01-01"
+GENERATION_YEAR = [f"2033-{month:02d}" for month in range(1, 13)]
+EXPORT_FORMATS = ("csv", "excel", "pdf")
+EXPORT_MAX_ENTRIES = 10000  # Beyond a month of real rostering; PDFs that size take minutes
+OVERLAP_CHECKS_PER_ROUND = 50
+PAY_REPEATING_ENTRIES = 5000
+OVERLAP_PROBES = (("06:00", "10:00"), ("12:00", "18:00"), ("21:00", "05:00"), ("10:15", "11:45"))
+
+
+async def seed_month(env: BenchEnvironment, month: str, count: int):
+    """Insert `count` priced roster entries into a month and bring its summaries and versions up to date"""
+    server = env.server
+    staff = await server.get_cached_staff()
+    documents = synthetic_month(month, count, staff)
+    pay_rows, errors = server.calculate_pay_for_documents(documents, await server.get_cached_settings())
+    if errors:
+        raise RuntimeError(f"Synthetic roster for {month} failed to price: {errors[:3]}")
+    for document, pay in zip(documents, pay_rows):
+        document.update(pay)
+    for start in range(0, len(documents), 10000):
+        await server.db.roster.insert_many(documents[start:start + 10000], ordered=False)
+    await server.rebuild_month(server.db, month)
+    await server.invalidate_roster_months(server.db, [month])
+
+
+async def clear_months(env: BenchEnvironment, months: Sequence[str]):
+    for month in months:
+        await env.db.roster.delete_month(month)
+        await env.db.roster_month_summary.delete_many({"month": month})
+
+
+def pay_benchmarks(env: BenchEnvironment) -> List[Benchmark]:
+    server = env.server
+    settings = server.Settings()
+    corpus = server.regression_corpus()
+    corpus_entries = [server.RosterEntry(**document) for document in corpus]
+    # A templated month repeats a few dozen distinct shifts, which is what the pay memo is for
+    repeating_entries = [
+        server.RosterEntry(**document)
+        for document in synthetic_month(READ_MONTH, PAY_REPEATING_ENTRIES, env.call(server.get_cached_staff))
+    ]
+
+    def scalar(entries):
+        return lambda: [server.calculate_pay(entry, settings) for entry in entries]
+
+    return [
+        Benchmark("pay.scalar.corpus", scalar(corpus_entries), setup=server.pay_memo.clear, rounds=5,
+                  operations=len(corpus_entries), params={"entries": len(corpus_entries)}),
+        Benchmark("pay.scalar.repeating", scalar(repeating_entries), rounds=10,
+                  operations=len(repeating_entries), params={"entries": len(repeating_entries)}),
+        Benchmark("pay.batch.corpus", lambda: server.calculate_pay_for_documents(corpus, settings), rounds=10,
+                  operations=len(corpus), params={"entries": len(corpus)}),
+    ]
+
+
+def overlap_benchmarks(env: BenchEnvironment, size: int) -> List[Benchmark]:
+    days = calendar.monthrange(*map(int, READ_MONTH.split("-")))[1]
+    probes = [
+        (f"{READ_MONTH}-{(check % days) + 1:02d}", *OVERLAP_PROBES[check % len(OVERLAP_PROBES)])
+        for check in range(OVERLAP_CHECKS_PER_ROUND)
+    ]
+
+    async def check_all():
+        for date_str, start_time, end_time in probes:
+            await env.server.check_shift_overlap(date_str, start_time, end_time, shift_name="Bench probe")
+
+    return [Benchmark(
+        f"overlap.check[n={size}]", lambda: env.call(check_all), rounds=10,
+        operations=len(probes), params={"month_entries": size, "entries_per_day": size // days},
+    )]
+
+
+def generation_benchmarks(env: BenchEnvironment) -> List[Benchmark]:
+    server = env.server
+    templates = env.call(server.get_cached_shift_templates)
+    template_id = str(uuid.uuid4())
+    template_data: Dict[str, List[Dict]] = {}
+    for template in templates:
+        template_data.setdefault(str(template["day_of_week"]), []).append(
+            {key: template[key] for key in ("name", "start_time", "end_time", "is_sleepover")}
+        )
+    env.call(server.db.roster_templates.insert_one, server.RosterTemplate(
+        id=template_id, name="Bench week", created_at=datetime.utcnow(), template_data=template_data
+    ).dict())
+
+    def clear(months=(GENERATION_MONTH,)):
+        return lambda: env.call(clear_months, env, months)
+
+    async def generate_year():
+        job = {
+            "id": str(uuid.uuid4()),
+            "params": {"source": "shift_templates", "template_id": None, "force_overlaps": False,
+                       "weeks_ahead": None, "date_window": None},
+            "steps": list(GENERATION_YEAR),
+        }
+        await server.run_roster_range_job(server.JobContext(server.db, job, "bench"))
+
+    params = {"templates": len(templates)}
+    return [
+        Benchmark("generate.month.shift_templates",
+                  lambda: env.post(f"/api/generate-roster/{GENERATION_MONTH}"),
+                  setup=clear(), rounds=5, params=params),
+        Benchmark("generate.month.shift_times_payload",
+                  lambda: env.post(f"/api/generate-roster-from-shift-templates/{GENERATION_MONTH}", {"templates": templates}),
+                  setup=clear(), rounds=5, params=params),
+        Benchmark("generate.month.roster_template",
+                  lambda: env.post(f"/api/generate-roster-from-template/{template_id}/{GENERATION_MONTH}"),
+                  setup=clear(), rounds=5, params=params),
+        Benchmark("generate.year.range_job", lambda: env.call(generate_year),
+                  setup=clear(GENERATION_YEAR), rounds=3, operations=len(GENERATION_YEAR), params=params),
+    ]
+
+
+def roster_benchmarks(env: BenchEnvironment, size: int) -> List[Benchmark]:
+    rounds = 10 if size <= 10000 else 3
+    params = {"entries": size}
+    benchmarks = [
+        Benchmark(f"roster.get[n={size}]", lambda: env.get("/api/roster", month=READ_MONTH), rounds=rounds, params=params),
+        Benchmark(f"roster.get.columnar[n={size}]", lambda: env.get("/api/roster", month=READ_MONTH, format="columnar"),
+                  rounds=rounds, params=params),
+    ]
+    if env.backend == "mongod":
+        # Pay masking runs in the aggregation pipeline, which mongomock can't evaluate
+        benchmarks.append(Benchmark(
+            f"roster.get.staff[n={size}]", lambda: env.get("/api/roster", role="staff", month=READ_MONTH),
+            rounds=rounds, params=params,
+        ))
+    return benchmarks
+
+
+def timesheet_benchmarks(env: BenchEnvironment, size: int) -> List[Benchmark]:
+    if env.backend != "mongod":
+        return []  # The period arithmetic uses $dateFromString, which mongomock can't evaluate
+    # 52 fortnights, the last few covering the seeded month
+    start = (datetime.fromisoformat(f"{READ_MONTH}-01") - timedelta(weeks=100)).date().isoformat()
+    return [Benchmark(
+        f"timesheets.52_fortnights[n={size}]",
+        lambda: env.get("/api/timesheets", start=start, periods=52, period="fortnight"),
+        rounds=10, params={"entries": size, "periods": 52},
+    )]
+
+
+def export_benchmarks(env: BenchEnvironment, size: int) -> List[Benchmark]:
+    if size > EXPORT_MAX_ENTRIES:
+        return []
+    year, month_number = map(int, READ_MONTH.split("-"))
+    start_date, end_date = f"{READ_MONTH}-01", f"{READ_MONTH}-{calendar.monthrange(year, month_number)[1]:02d}"
+    params = {"entries": size}
+    benchmarks = []
+    for export_format in EXPORT_FORMATS:
+        benchmarks += [
+            Benchmark(f"export.{export_format}.month[n={size}]",
+                      lambda fmt=export_format: env.get(f"/api/export/{fmt}/{READ_MONTH}"), rounds=5, params=params),
+            Benchmark(f"export.{export_format}.range[n={size}]",
+                      lambda fmt=export_format: env.get(f"/api/export/range/{fmt}", start_date=start_date, end_date=end_date),
+                      rounds=5, params=params),
+        ]
+    return benchmarks
+
+
+def forecast_benchmarks(env: BenchEnvironment) -> List[Benchmark]:
+    benchmarks = []
+    for label, days in (("quarter", 91), ("year", 365)):
+        end_date = (date.fromisoformat(FORECAST_START) + timedelta(days=days - 1)).isoformat()
+        benchmarks.append(Benchmark(
+            f"forecast.cost.{label}", lambda end_date=end_date: env.get("/api/forecast/cost", start_date=FORECAST_START, end_date=end_date),
+            rounds=10, params={"days": days},
+        ))
+    return benchmarks
+
+
+def auth_benchmarks(env: BenchEnvironment) -> List[Benchmark]:
+    server = env.server
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=env.tokens["admin"])
+    calls = 200
+
+    async def authenticate():
+        for _ in range(calls):
+            await server.get_current_user(credentials)
+
+    async def authenticate_uncached():
+        for _ in range(calls):
+            server.session_cache.clear()
+            await server.get_current_user(credentials)
+
+    return [
+        Benchmark("auth.get_current_user.cached", lambda: env.call(authenticate), rounds=10, operations=calls),
+        Benchmark("auth.get_current_user.uncached", lambda: env.call(authenticate_uncached), rounds=10, operations=calls),
+        Benchmark("auth.users_me", lambda: env.get("/api/users/me"), rounds=20),
+    ]
+
+
+GROUPS = {
+    "pay": pay_benchmarks,
+    "auth": auth_benchmarks,
+    "forecast": forecast_benchmarks,
+}
+# Run once per roster size against READ_MONTH seeded with that many entries
+SIZED_GROUPS = {
+    "overlap": overlap_benchmarks,
+    "roster": roster_benchmarks,
+    "timesheets": timesheet_benchmarks,
+    "export": export_benchmarks,
+}
+# Run last, so their writes don't grow the collections the other groups read
+WRITE_GROUPS = {
+    "generate": generation_benchmarks,
+}
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files and flag regressions
+
+    python benchmarks/compare.py benchmarks/results/<baseline>.json benchmarks/results/<candidate>.json
+
+Medians are compared; a benchmark regresses when the candidate is slower by
+more than --threshold (a fraction, default 0.10). Exits 1 if anything regressed.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from harness import format_seconds, load_results
+
+
+def describe(meta) -> str:
+    commit = (meta.get("commit") or "unversioned")[:10]
+    return f"{commit}{' (dirty)' if meta.get('dirty') else ''} on {meta.get('backend')}, Python {meta.get('python')}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load_results(args.baseline), load_results(args.candidate)
+    print(f"📊 Baseline:  {describe(baseline['meta'])}")
+    print(f"📊 Candidate: {describe(candidate['meta'])}")
+    if baseline["meta"].get("backend") != candidate["meta"].get("backend"):
+        print("⚠️ The runs used different database backends; their timings aren't comparable")
+
+    regressions = []
+    for name in sorted(set(baseline["results"]) | set(candidate["results"])):
+        before, after = baseline["results"].get(name), candidate["results"].get(name)
+        if before is None or after is None:
+            print(f"   {name:<40} only in {'candidate' if before is None else 'baseline'}")
+            continue
+        change = after["median"] / before["median"] - 1 if before["median"] else 0.0
+        if change > args.threshold:
+            marker = "🔴"
+            regressions.append(name)
+        elif change < -args.threshold:
+            marker = "🟢"
+        else:
+            marker = "  "
+        print(f"{marker} {name:<40} {format_seconds(before['median']):>10} -> {format_seconds(after['median']):>10}"
+              f"  {change:+.1%}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
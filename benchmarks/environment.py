@@ -0,0 +1,169 @@
+"""A hermetic API process for benchmarks: throwaway database, in-process TestClient, seeded users
+
+The database is a uniquely named one on a local mongod when BENCH_MONGO_URL
+is set, otherwise an in-memory mongomock_motor stand-in (timings against it
+are only comparable with other mongomock runs). The API's startup event isn't
+run, so no background jobs, tailers or schedulers compete with the timings;
+the parts of startup the endpoints rely on (indexes, holiday calendar,
+default staff, shift templates and settings) are run directly instead;
+indexes are only built on mongod.
+"""
+import hashlib
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+import anyio.from_thread
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+BENCH_PIN = "2468"
+WEEKDAY_SHIFTS = (("07:30", "15:30", False), ("15:30", "23:30", False), ("23:30", "07:30", True))
+
+
+class BenchEnvironment:
+    """Owns the event loop, the server module, its database and a TestClient sharing that loop"""
+
+    def __init__(self):
+        self.mongo_url = os.environ.get("BENCH_MONGO_URL")
+        self.backend = "mongod" if self.mongo_url else "mongomock"
+        self.db_name = f"roster_bench_{uuid.uuid4().hex[:12]}"
+        self._portal_context = None
+        self.portal = None
+        self.server = None
+        self.client = None
+        self.tokens: Dict[str, str] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+
+    def __enter__(self) -> "BenchEnvironment":
+        os.environ["MONGO_URL"] = self.mongo_url or "mongodb://mongomock"
+        os.environ["DB_NAME"] = self.db_name
+        if not self.mongo_url:
+            import repository
+            from mongomock_motor import AsyncMongoMockClient
+            repository.AsyncIOMotorClient = AsyncMongoMockClient
+        import server
+        from fastapi.testclient import TestClient
+
+        self.server = server
+        # Motor binds to the first loop it runs on, so direct calls and requests share one portal
+        self._portal_context = anyio.from_thread.start_blocking_portal()
+        self.portal = self._portal_context.__enter__()
+        self.client = TestClient(server.app)
+        self.client.portal = self.portal
+        self.call(self._prepare)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if self.mongo_url:
+                self.call(self.server.client.drop_database, self.db_name)
+        finally:
+            self._portal_context.__exit__(*exc_info)
+
+    def call(self, function: Callable, *args: Any) -> Any:
+        """Run an async function (or plain function) on the environment's event loop"""
+        return self.portal.call(function, *args)
+
+    @property
+    def db(self):
+        return self.server.db
+
+    async def _prepare(self):
+        server = self.server
+        if self.mongo_url:
+            # mongomock plans nothing with indexes, and checks unique ones with a scan per insert
+            await server.reconcile_indexes(server.db)
+        await server.reload_holiday_calendar()
+        await server.initialize_default_data()
+        # The defaults only cover Mondays and Sundays; fill in the rest of the week
+        await server.db.shift_templates.insert_many([
+            {"id": str(uuid.uuid4()), "name": f"Bench Day {day} Shift {number}", "start_time": start_time,
+             "end_time": end_time, "is_sleepover": sleepover, "day_of_week": day, "manual_shift_type": None,
+             "manual_hourly_rate": None, "allow_overlap": False}
+            for day in range(1, 6)
+            for number, (start_time, end_time, sleepover) in enumerate(WEEKDAY_SHIFTS, start=1)
+        ])
+        await server.reference_data_changed("shift_templates")
+        staff = await server.db.staff.find({"active": True}, {"_id": 0}, sort=[("name", 1)])
+        await self._add_user("bench-admin", "admin")
+        await self._add_user("bench-staff", "staff", staff_id=staff[0]["id"])
+
+    async def _add_user(self, username: str, role: str, staff_id: str = None):
+        user = {
+            "id": str(uuid.uuid4()),
+            "username": username,
+            "pin_hash": hashlib.sha256(BENCH_PIN.encode()).hexdigest(),
+            "role": role,
+            "staff_id": staff_id,
+            "first_name": username,
+            "is_first_login": False,
+            "is_active": True,
+            "created_at": datetime.utcnow(),
+        }
+        await self.server.db.users.insert_one(dict(user))
+        token = uuid.uuid4().hex
+        await self.server.db.sessions.insert_one({
+            "id": str(uuid.uuid4()),
+            "user_id": user["id"],
+            "token": token,
+            "is_active": True,
+            "created_at": datetime.utcnow(),
+            "expires_at": datetime.utcnow() + timedelta(days=1),
+        })
+        self.users[role] = user
+        self.tokens[role] = token
+
+    def headers(self, role: str = "admin") -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[role]}"}
+
+    def get(self, path: str, role: str = "admin", **params: Any):
+        """GET an endpoint as the given role, failing the benchmark on anything but 200"""
+        response = self.client.get(path, params=params, headers=self.headers(role))
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def post(self, path: str, json: Any = None, role: str = "admin", **params: Any):
+        response = self.client.post(path, json=json, params=params, headers=self.headers(role))
+        if response.status_code != 200:
+            raise RuntimeError(f"POST {path} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+
+def synthetic_month(month: str, count: int, staff: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """`count` roster documents spread over a month's days, cycling through the pay-relevant shapes"""
+    year, month_number = map(int, month.split("-"))
+    first_day = datetime(year, month_number, 1)
+    days = ((first_day.replace(day=28) + timedelta(days=4)).replace(day=1) - first_day).days
+    shapes = (
+        ("07:30", "15:30", False), ("15:00", "20:00", False), ("15:30", "23:30", False),
+        ("22:00", "06:00", False), ("23:30", "07:30", True), ("09:00", "17:00", False),
+    )
+    documents = []
+    for position in range(count):
+        start_time, end_time, sleepover = shapes[position % len(shapes)]
+        # One slot in every len(staff) + 1 is left unassigned
+        slot = position % (len(staff) + 1)
+        member = staff[slot] if slot < len(staff) else None
+        documents.append({
+            "id": str(uuid.uuid4()),
+            "date": (first_day + timedelta(days=position % days)).strftime("%Y-%m-%d"),
+            "shift_template_id": f"bench-{position % len(shapes)}",
+            "staff_id": member["id"] if member else None,
+            "staff_name": member["name"] if member else None,
+            "start_time": start_time,
+            "end_time": end_time,
+            "is_sleepover": sleepover,
+            "is_public_holiday": False,
+            "manual_shift_type": None,
+            "manual_hourly_rate": None,
+            "manual_sleepover": None,
+            "wake_hours": 3.0 if sleepover and position % 4 == 0 else None,
+            "allow_overlap": True,
+            "is_frozen": False,
+        })
+    return documents
@@ -0,0 +1,122 @@
+"""Timing harness: warmed-up repeated rounds, summary statistics and JSON result files
+
+A benchmark is a callable timed over several rounds after a few untimed
+warmup calls. An optional `setup` runs untimed before every call, so
+benchmarks that write (generators) start each round from the same state.
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+RESULTS_FORMAT_VERSION = 1
+
+
+class Benchmark(NamedTuple):
+    name: str
+    run: Callable[[], Any]
+    setup: Optional[Callable[[], Any]] = None
+    rounds: int = 10
+    warmup: int = 1
+    operations: int = 1  # Calls of the measured thing per round, for per-operation times
+    params: Dict[str, Any] = {}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a sample list"""
+    ordered = sorted(samples)
+    rank = min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1
+    return ordered[rank]
+
+
+def summarise(samples: List[float], operations: int) -> Dict[str, Any]:
+    """Statistics for one benchmark's round times, in seconds"""
+    median = statistics.median(samples)
+    return {
+        "rounds": len(samples),
+        "operations": operations,
+        "min": min(samples),
+        "median": median,
+        "mean": statistics.fmean(samples),
+        "p95": percentile(samples, 0.95),
+        "max": max(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "per_operation": median / operations,
+        "operations_per_second": operations / median if median else None,
+    }
+
+
+def time_benchmark(benchmark: Benchmark, rounds: Optional[int] = None) -> Dict[str, Any]:
+    """Run a benchmark's warmup and timed rounds and summarise them"""
+    for _ in range(benchmark.warmup):
+        if benchmark.setup:
+            benchmark.setup()
+        benchmark.run()
+
+    samples = []
+    for _ in range(rounds or benchmark.rounds):
+        if benchmark.setup:
+            benchmark.setup()
+        started = time.perf_counter()
+        benchmark.run()
+        samples.append(time.perf_counter() - started)
+    return {**summarise(samples, benchmark.operations), "params": dict(benchmark.params)}
+
+
+def git_revision(repo_root: str) -> Dict[str, Any]:
+    """Commit being measured, and whether the working tree had uncommitted changes"""
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=repo_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {
+            "commit": git("rev-parse", "HEAD"),
+            "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        }
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "subject": None, "dirty": None}
+
+
+def run_metadata(repo_root: str, **extra: Any) -> Dict[str, Any]:
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **git_revision(repo_root),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def write_results(path: str, metadata: Dict[str, Any], results: Dict[str, Dict[str, Any]]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": metadata, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("meta", {}).get("format_version") != RESULTS_FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported results format")
+    return document
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}µs"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite against an in-process API and a throwaway database
+
+    pip install -r benchmarks/requirements.txt
+
+    python benchmarks/run.py                                  # everything, mongomock stand-in
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/run.py
+    python benchmarks/run.py --only pay,roster --sizes 1000,10000
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Results are written to benchmarks/results/<commit>.json unless --output says otherwise.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cases import GROUPS, READ_MONTH, SIZED_GROUPS, WRITE_GROUPS, clear_months, seed_month
+from environment import BenchEnvironment
+from harness import format_seconds, git_revision, run_metadata, time_benchmark, write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+DEFAULT_SIZES = {
+    "mongod": (1000, 10000, 100000),
+    # mongomock scans and copies the whole collection for every read, so 100k entries take minutes a request
+    "mongomock": (1000, 10000),
+}
+ALL_GROUPS = [*GROUPS, *SIZED_GROUPS, *WRITE_GROUPS]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help=f"Comma-separated groups to run ({', '.join(ALL_GROUPS)}), or benchmark name prefixes")
+    parser.add_argument("--sizes", help="Roster entries in the month the sized groups read (default 1000,10000,100000; "
+                                        "1000,10000 on mongomock)")
+    parser.add_argument("--rounds", type=int, help="Override every benchmark's number of timed rounds")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<commit>.json)")
+    return parser.parse_args(argv)
+
+
+def selected(name: str, filters) -> bool:
+    return not filters or any(name.startswith(prefix) for prefix in filters)
+
+
+def run_benchmarks(benchmarks, filters, rounds, results):
+    for benchmark in benchmarks:
+        if not selected(benchmark.name, filters):
+            continue
+        result = time_benchmark(benchmark, rounds)
+        results[benchmark.name] = result
+        per_operation = f" ({format_seconds(result['per_operation'])}/op)" if result["operations"] > 1 else ""
+        print(f"⏱️ {benchmark.name:<40} median {format_seconds(result['median']):>10}"
+              f"  p95 {format_seconds(result['p95']):>10}{per_operation}")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    filters = [f.strip() for f in args.only.split(",")] if args.only else []
+    groups = [group for group in ALL_GROUPS if not filters or any(f.split(".")[0] == group for f in filters)]
+    if not groups:
+        print(f"❌ Nothing matches --only {args.only}; groups are {', '.join(ALL_GROUPS)}")
+        return 2
+
+    results = {}
+    with BenchEnvironment() as env:
+        sizes = sorted({int(size) for size in args.sizes.split(",")} if args.sizes else DEFAULT_SIZES[env.backend])
+        print(f"🏁 Benchmarking against {env.backend} (database {env.db_name})")
+        for group in GROUPS:
+            if group in groups:
+                run_benchmarks(GROUPS[group](env), filters, args.rounds, results)
+
+        sized_groups = [group for group in SIZED_GROUPS if group in groups]
+        for size in sizes if sized_groups else ():
+            started = time.perf_counter()
+            env.call(seed_month, env, READ_MONTH, size)
+            print(f"🌱 Seeded {size} roster entries into {READ_MONTH} in {time.perf_counter() - started:.1f}s")
+            for group in sized_groups:
+                run_benchmarks(SIZED_GROUPS[group](env, size), filters, args.rounds, results)
+            env.call(clear_months, env, [READ_MONTH])
+
+        for group in WRITE_GROUPS:
+            if group in groups:
+                run_benchmarks(WRITE_GROUPS[group](env), filters, args.rounds, results)
+
+        metadata = run_metadata(REPO_ROOT, backend=env.backend, sizes=sizes, groups=groups)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{git_revision(REPO_ROOT)['commit'] or 'unversioned'}.json")
+    write_results(output, metadata, results)
+    print(f"💾 Wrote {len(results)} results to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
+import os
+import sys
+
 import requests
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from payrules import SHIFT_TYPE_KEYS, compile_rules, evaluate, rate_segments, time_to_minutes, weekday_of
+
 def test_calculate_pay_endpoint():
     """Test the calculate_pay endpoint directly to debug cross-midnight issues"""
     base_url = "https://shift-master-10.preview.emergentagent.com"
@@ -19,6 +25,9 @@ def test_calculate_pay_endpoint():
         'Authorization': f'Bearer {auth_token}'
     }
     
+    # Price every case locally with the server's own settings and pay rules
+    rules = compile_rules(requests.get(f"{base_url}/api/settings").json())
+    
     # Test cases that failed
     test_cases = [
         {
@@ -57,6 +66,19 @@ def test_calculate_pay_endpoint():
         print(f"\n🎯 Testing: {test_case['name']}")
         print(f"   Input: {test_case['data']}")
         
+        data = test_case['data']
+        local_pay = evaluate(rules, data)
+        print(f"   🧮 Local pay rules:")
+        segments = rate_segments(
+            weekday_of(data['date']), data['is_public_holiday'], False,
+            time_to_minutes(data['start_time']), time_to_minutes(data['end_time'])
+        )
+        for segment in segments:
+            hours = (segment.end_minute - segment.start_minute) / 60.0
+            rate = rules.hourly_rates[segment.shift_type]
+            print(f"      Day +{segment.day_offset} {SHIFT_TYPE_KEYS[segment.shift_type]}: {hours}h × ${rate}/hr = ${hours * rate:.2f}")
+        print(f"      Total pay: ${local_pay['total_pay']:.2f}")
+        
         try:
             response = requests.post(
                 f"{base_url}/api/calculate-pay",
@@ -71,6 +93,9 @@ def test_calculate_pay_endpoint():
                 print(f"      Base pay: ${result.get('base_pay', 'N/A')}")
                 print(f"      Total pay: ${result.get('total_pay', 'N/A')}")
                 
+                if abs(result.get('total_pay', 0) - local_pay['total_pay']) > 0.01:
+                    print(f"   ⚠️  Server differs from local pay rules (${local_pay['total_pay']:.2f}) - is the deployment up to date?")
+                
                 if 'expected_breakdown' in test_case:
                     print(f"   📊 Expected breakdown:")
                     for segment in test_case['expected_breakdown']:
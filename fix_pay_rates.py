@@ -5,8 +5,12 @@ Script to fix staff pay rates to the correct amounts as specified by user
 
 from pymongo import MongoClient
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from payrules import DEFAULT_NDIS_CHARGE_RATES, DEFAULT_RATES, compile_rules, evaluate
+
 # Database setup
 MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.environ.get("DB_NAME", "shift_roster_db")
@@ -96,6 +100,28 @@ def verify_rates():
     
     return all_correct
 
+def preview_pay():
+    """Price a few sample shifts with the updated rates, using the same pay rules as the server"""
+    print('\n💰 Sample Shift Pay at the Updated Rates:')
+    settings = db.settings.find_one() or {}
+    rules = compile_rules({
+        'rates': {**DEFAULT_RATES, **settings.get('rates', {})},
+        'ndis_charge_rates': settings.get('ndis_charge_rates') or DEFAULT_NDIS_CHARGE_RATES
+    })
+    
+    sample_shifts = [
+        ('Monday 9am-5pm', {'date': '2025-01-13', 'start_time': '09:00', 'end_time': '17:00'}),
+        ('Monday 3pm-10pm', {'date': '2025-01-13', 'start_time': '15:00', 'end_time': '22:00'}),
+        ('Monday 10pm-6am', {'date': '2025-01-13', 'start_time': '22:00', 'end_time': '06:00'}),
+        ('Saturday 9am-5pm', {'date': '2025-01-11', 'start_time': '09:00', 'end_time': '17:00'}),
+        ('Sunday 9am-5pm', {'date': '2025-01-12', 'start_time': '09:00', 'end_time': '17:00'}),
+        ('Sleepover with 3 wake hours', {'date': '2025-01-13', 'start_time': '22:00', 'end_time': '06:00',
+                                         'is_sleepover': True, 'wake_hours': 3}),
+    ]
+    for label, shift in sample_shifts:
+        pay = evaluate(rules, shift)
+        print(f'   {label}: {pay["hours_worked"]:.1f}h = ${pay["total_pay"]:.2f}')
+
 if __name__ == "__main__":
     print("🔧 Fixing Staff Pay Rates to Correct Amounts...")
     print("=" * 60)
@@ -103,6 +129,7 @@ if __name__ == "__main__":
     success = fix_pay_rates()
     if success:
         verify_rates()
+        preview_pay()
         print("\n🚀 Pay rates have been corrected and will be reflected in the Shift Times display!")
     else:
         print("❌ Failed to update pay rates")
\ No newline at end of file
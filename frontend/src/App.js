@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Calendar } from './components/ui/calendar';
 import { Button } from './components/ui/button';
@@ -18,6 +18,18 @@ import './App.css';
 
 const API_BASE_URL = process.env.REACT_APP_BACKEND_URL;
 
+// Rebuild row objects from a format=columnar list response
+const decodeColumnar = ({ count, columns, dictionaries }) => {
+  const rows = Array.from({ length: count }, () => ({}));
+  Object.entries(columns).forEach(([name, values]) => {
+    const dictionary = dictionaries[name];
+    values.forEach((value, index) => {
+      rows[index][name] = dictionary && value !== null ? dictionary[value] : value;
+    });
+  });
+  return rows;
+};
+
 // Helper function for timezone-safe date formatting
 const formatDateString = (date) => {
   // Handle both Date objects and date strings
@@ -354,6 +366,24 @@ function App() {
     }
   };
 
+  // Poll a background job until it finishes and return its result
+  const waitForJob = async (jobId, intervalMs = 1000, maxAttempts = 120) => {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+      const response = await axios.get(`${API_BASE_URL}/api/jobs/${jobId}`, {
+        headers: { 'Authorization': `Bearer ${authToken}` }
+      });
+      const job = response.data;
+      if (job.status === 'completed') {
+        return job.result;
+      }
+      if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(job.error || `Job ${job.status}`);
+      }
+      await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+    throw new Error('Timed out waiting for the background job to finish');
+  };
+
   // Sync staff users - Create missing user accounts for staff (Admin only)
   const syncStaffUsers = async () => {
     if (!isAdmin()) {
@@ -372,7 +402,8 @@ function App() {
         headers: { 'Authorization': `Bearer ${authToken}` }
       });
       
-      const result = response.data;
+      // The sync runs as a background job; wait for its result
+      const result = await waitForJob(response.data.job_id);
       
       let message = `✅ ${result.message}\n\n`;
       
@@ -1056,6 +1087,26 @@ function App() {
     }
   }, [isAuthenticated, authToken]);
 
+  // Server push replaces polling; handlers are read through a ref so they always see the latest state
+  const pushHandlers = useRef({});
+  useEffect(() => {
+    if (!isAuthenticated || !authToken) {
+      return undefined;
+    }
+    
+    // EventSource can't send an Authorization header, so the token goes in the query string
+    const source = new EventSource(`${API_BASE_URL}/api/events/stream?token=${encodeURIComponent(authToken)}`);
+    ['roster', 'shift_requests', 'notifications', 'resync'].forEach(eventName => {
+      source.addEventListener(eventName, (event) => {
+        const handler = pushHandlers.current[eventName];
+        if (handler) {
+          handler(event.data ? JSON.parse(event.data) : {});
+        }
+      });
+    });
+    return () => source.close();
+  }, [isAuthenticated, authToken]);
+
   // Helper function to check if current user is admin
   const isAdmin = () => {
     return currentUser && currentUser.role === 'admin';
@@ -2084,6 +2135,44 @@ function App() {
     }
   };
 
+  // Loaded roster months with the change cursor each was synced to, so refreshes after edits only fetch what changed
+  const rosterMonthCache = useRef({ auth: null, months: {} });
+
+  const loadRosterMonth = async (month) => {
+    const response = await axios.get(`${API_BASE_URL}/api/roster`, { params: { month, format: 'columnar' } });
+    return {
+      cursor: response.headers['x-roster-cursor'],
+      entries: new Map(decodeColumnar(response.data).map(entry => [entry.id, entry]))
+    };
+  };
+
+  const syncRosterMonth = async (month, cached) => {
+    if (!cached || !cached.cursor) {
+      return loadRosterMonth(month);
+    }
+    
+    const entries = new Map(cached.entries);
+    let cursor = cached.cursor;
+    let hasMore = true;
+    while (hasMore) {
+      const { data } = await axios.get(`${API_BASE_URL}/api/roster/changes`, { params: { since: cursor, month } });
+      // The cursor can't be continued, or a bulk change asked for the whole month to be reloaded
+      if (data.reset || data.reset_months.length > 0) {
+        return loadRosterMonth(month);
+      }
+      data.changes.forEach(change => {
+        if (change.op === 'delete') {
+          entries.delete(change.id);
+        } else {
+          entries.set(change.id, change.entry);
+        }
+      });
+      cursor = data.cursor;
+      hasMore = data.has_more;
+    }
+    return { cursor, entries };
+  };
+
   const fetchRosterData = async () => {
     try {
       const monthString = currentDate.toISOString().slice(0, 7); // YYYY-MM
@@ -2094,11 +2183,10 @@ function App() {
       startOfWeek.setDate(startOfWeek.getDate() - (firstDay.getDay() + 6) % 7); // Start from Monday
       
       // If the first Monday of the week is from the previous month, fetch that data too
-      const requests = [axios.get(`${API_BASE_URL}/api/roster?month=${monthString}`)];
+      const months = [monthString];
       
       if (startOfWeek.getMonth() !== firstDay.getMonth()) {
-        const prevMonthString = startOfWeek.toISOString().slice(0, 7);
-        requests.push(axios.get(`${API_BASE_URL}/api/roster?month=${prevMonthString}`));
+        months.push(startOfWeek.toISOString().slice(0, 7));
       }
       
       // Also check if we need next month data for the last week
@@ -2107,12 +2195,22 @@ function App() {
       endOfWeek.setDate(endOfWeek.getDate() + (7 - lastDay.getDay()) % 7); // End of Sunday
       
       if (endOfWeek.getMonth() !== lastDay.getMonth()) {
-        const nextMonthString = endOfWeek.toISOString().slice(0, 7);
-        requests.push(axios.get(`${API_BASE_URL}/api/roster?month=${nextMonthString}`));
+        months.push(endOfWeek.toISOString().slice(0, 7));
       }
       
-      const responses = await Promise.all(requests);
-      const allEntries = responses.flatMap(response => response.data);
+      // Pay visibility depends on who is signed in, so a different login starts from full months
+      const cache = rosterMonthCache.current;
+      const auth = axios.defaults.headers.common['Authorization'];
+      if (cache.auth !== auth) {
+        cache.auth = auth;
+        cache.months = {};
+      }
+      
+      const synced = await Promise.all(months.map(month => syncRosterMonth(month, cache.months[month])));
+      months.forEach((month, index) => {
+        cache.months[month] = synced[index];
+      });
+      const allEntries = synced.flatMap(({ entries }) => [...entries.values()]);
       
       setRosterEntries(allEntries);
     } catch (error) {
@@ -2120,6 +2218,29 @@ function App() {
     }
   };
 
+  pushHandlers.current = {
+    roster: (payload) => {
+      if (payload.months.some(month => month in rosterMonthCache.current.months)) {
+        fetchRosterData();
+      }
+      if (payload.unassigned) {
+        fetchUnassignedShifts();
+      }
+    },
+    shift_requests: () => {
+      fetchShiftRequests();
+      fetchUnassignedShifts();
+    },
+    notifications: () => fetchNotifications(),
+    // Events were missed (reconnected too late or fell behind), so reload everything they could have changed
+    resync: () => {
+      fetchRosterData();
+      fetchUnassignedShifts();
+      fetchShiftRequests();
+      fetchNotifications();
+    }
+  };
+
   const generateMonthlyRoster = async () => {
     if (!window.confirm(`Generate roster for ${currentDate.toLocaleString('default', { month: 'long', year: 'numeric' })} using your saved Shift Times templates?`)) {
       return;
@@ -0,0 +1,119 @@
+"""The batch pay engine must be bit-identical to the scalar calculate_pay
+
+pay_corpus.json holds named roster entries covering cross-midnight shifts,
+sleepovers, holidays on either day of a shift, manual rate and shift type
+overrides and the NDIS line items they select. Each is priced by both paths
+and every pay result field compared exactly: floats by their hex form, so a
+difference in the last bit fails. Each case also records the base pay, total
+pay and NDIS charge the scalar calculate_pay gave before the batch engine
+existed (with the calendar's holidays supplied as the holiday flag, since that
+version had no calendar), and both paths must still produce them.
+"""
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+import server  # noqa: E402
+from payrules import PAY_RESULT_FIELDS  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pay_corpus.json")
+
+
+def load_corpus() -> List[Dict[str, Any]]:
+    with open(CORPUS_PATH) as f:
+        return json.load(f)
+
+
+CORPUS = load_corpus()
+
+
+def corpus_entry(case: Dict[str, Any]) -> Dict[str, Any]:
+    return dict({"id": case["name"], "shift_template_id": "pay-corpus"}, **case["entry"])
+
+
+def identical(scalar_value: Any, batch_value: Any) -> bool:
+    if isinstance(scalar_value, float) or isinstance(batch_value, float):
+        return float(scalar_value).hex() == float(batch_value).hex()
+    return scalar_value == batch_value
+
+
+def assert_same_pay(name: str, scalar: Dict[str, Any], batch: Dict[str, Any]):
+    differences = {
+        field: (scalar[field], batch[field])
+        for field in PAY_RESULT_FIELDS
+        if not identical(scalar[field], batch[field])
+    }
+    assert not differences, f"{name}: scalar vs batch {differences}"
+
+
+@pytest.fixture(scope="module")
+def batch_results() -> Dict[str, Dict[str, Any]]:
+    """Batch pay for the whole corpus, one batch per settings variant"""
+    by_settings: Dict[str, List[Dict[str, Any]]] = {}
+    for case in CORPUS:
+        by_settings.setdefault(json.dumps(case.get("settings", {}), sort_keys=True), []).append(case)
+
+    results = {}
+    for settings_json, cases in by_settings.items():
+        rows, errors = server.calculate_pay_for_documents(
+            [corpus_entry(case) for case in cases], server.Settings(**json.loads(settings_json))
+        )
+        assert not errors
+        results.update((case["name"], row) for case, row in zip(cases, rows))
+    return results
+
+
+def test_corpus_names_are_unique():
+    names = [case["name"] for case in CORPUS]
+    assert len(names) == len(set(names))
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_batch_matches_scalar(case, batch_results):
+    server.pay_memo.clear()
+    settings = server.Settings(**case.get("settings", {}))
+    scalar = server.calculate_pay(server.RosterEntry(**corpus_entry(case)), settings).dict()
+    assert_same_pay(case["name"], scalar, batch_results[case["name"]])
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_pay_matches_expected(case, batch_results):
+    """Both paths against pay recorded from the scalar calculate_pay that predates the batch engine"""
+    server.pay_memo.clear()
+    settings = server.Settings(**case.get("settings", {}))
+    scalar = server.calculate_pay(server.RosterEntry(**corpus_entry(case)), settings).dict()
+    for path, result in (("scalar", scalar), ("batch", batch_results[case["name"]])):
+        differences = {
+            field: (expected, result[field])
+            for field, expected in case["expected"].items()
+            if not identical(expected, result[field])
+        }
+        assert not differences, f"{case['name']}: expected vs {path} {differences}"
+
+
+def test_batch_matches_scalar_on_generated_sweep():
+    """Every start time, a rotating set of end times and each override combination, in a week holding a holiday"""
+    settings = server.Settings(holiday_state="QLD")
+    entries = server.regression_corpus(start_date="2025-04-14")
+    rows, errors = server.calculate_pay_for_documents(entries, settings)
+    assert not errors
+
+    server.pay_memo.clear()
+    for entry, batch in zip(entries, rows):
+        scalar = server.calculate_pay(server.RosterEntry(**entry), settings).dict()
+        assert_same_pay(entry["id"], scalar, batch)
+
+
+@pytest.mark.parametrize("start_time,end_time", [("24:00", "08:00"), ("09:00", "24:00"), ("09:60", "17:00"), ("-1:00", "08:00")])
+def test_out_of_range_times_are_rejected_by_both_paths(start_time, end_time):
+    entry = {"id": "bad-time", "date": "2025-01-06", "start_time": start_time, "end_time": end_time}
+    with pytest.raises(ValueError):
+        server.calculate_pay(server.RosterEntry(**corpus_entry({"name": "bad-time", "entry": entry})), server.Settings())
+    rows, errors = server.calculate_pay_for_documents([entry], server.Settings())
+    assert [row for row, _ in errors] == [0]